@@ -20,12 +20,11 @@ export async function getPredicted11(
 }
 
 export async function revaluateTeamSwap(
-  cov_matrix: string,
-  player_stats: string,
+  session_id: string,
   best_team: string[]
 ): Promise<RevaluateTeamApiResponse> {
   try {
-    const obj = { best_team, player_stats, cov_matrix };
+    const obj = { best_team, session_id };
     const response = await axios.post("http://localhost:8080/team_evaluation", obj);
     return response.data;
   } catch (error) {
@@ -3,7 +3,8 @@ import { SquadApiResponse } from "@/app/types/squadApiResponse";
 
 export async function getSquadsByDate(date: string): Promise<SquadApiResponse> {
   try {
-    const response = await axios.post("http://127.0.0.1:5000/squads", { Date: date });
+    // GET, so the browser revalidates its cached copy with If-None-Match and gets a 304
+    const response = await axios.get("http://127.0.0.1:5000/squads", { params: { Date: date } });
     return response.data;
   } catch (error) {
     throw error;
@@ -12,8 +12,8 @@ interface MatchDataContextProps {
   setDate: React.Dispatch<React.SetStateAction<string>>;
   aggregateStats: AggregateApiResponse | null;
   setAggregateStats: React.Dispatch<React.SetStateAction<AggregateApiResponse | null>>;
-  covMatrix: string;
-  setCovMatrix: React.Dispatch<React.SetStateAction<string>>;
+  sessionId: string;
+  setSessionId: React.Dispatch<React.SetStateAction<string>>;
   predictedTeam: string[];
   setPredictedTeam: React.Dispatch<React.SetStateAction<string[]>>;
   playerStats: PlayerStats[];
@@ -51,7 +51,7 @@ export const MatchDataProvider: React.FC<{ children: ReactNode }> = ({ children
   const [matchData, setMatchData] = useState<MatchDetails | null>(null);
   const [date, setDate] = useState<string>("");
   const [aggregateStats, setAggregateStats] = useState<AggregateApiResponse | null>(null);
-  const [covMatrix, setCovMatrix] = useState<string>("");
+  const [sessionId, setSessionId] = useState<string>("");
   const [predictedTeam, setPredictedTeam] = useState<string[]>([]);
   const [playerStats, setPlayerStats] = useState<PlayerStats[]>([]);
   const [selectedPlayersTeamA, setSelectedPlayersTeamA] = useState<string[]>([]);
@@ -76,8 +76,8 @@ export const MatchDataProvider: React.FC<{ children: ReactNode }> = ({ children
         setDate,
         aggregateStats,
         setAggregateStats,
-        covMatrix,
-        setCovMatrix,
+        sessionId,
+        setSessionId,
         predictedTeam,
         setPredictedTeam,
         playerStats,
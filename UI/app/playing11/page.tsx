@@ -19,7 +19,7 @@ function Playing11() {
   const {
     date,
     matchData,
-    setCovMatrix,
+    setSessionId,
     playerStats,
     setPlayerStats,
     predictedTeam,
@@ -115,10 +115,10 @@ function Playing11() {
 
         setTotalScore(total_score);
         setPredictedTeam(response.best_team);
-        setCovMatrix(response.cov_matrix);
+        setSessionId(response.session_id);
         setPlayerStats(player_stats);
 
-        const resp = await revaluateTeamSwap(response.cov_matrix, response.player_stats, response.best_team);
+        const resp = await revaluateTeamSwap(response.session_id, response.best_team);
         setTeamStats(resp);
       } catch (error) {
         console.error(error);
@@ -130,7 +130,7 @@ function Playing11() {
   }, [
     date,
     matchData,
-    setCovMatrix,
+    setSessionId,
     setPlayerStats,
     setPredictedTeam,
     selectedPlayersTeamA,
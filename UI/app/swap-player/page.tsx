@@ -1,14 +1,15 @@
 "use client";
 
+import axios from "axios";
 import { useEffect, useState } from "react";
 import { handleLLMTeam } from "../api/llmApi";
-import { revaluateTeamSwap } from "../api/predictedSquad";
+import { getPredicted11, revaluateTeamSwap } from "../api/predictedSquad";
 import ButtonComponent from "../components/buttonComp";
 import PageTemplateWithoutTop from "../components/pageTemplateNoTop";
 import PitchComponent from "../components/pitchPlayer";
 import PlayerInformationSwap from "../components/playerInformationSwap";
 import { useMatchData } from "../contexts/matchDataContext";
-import { RevaluateTeamApiResponse } from "../types/modelApiResponse";
+import { PlayerInfo, RevaluateTeamApiResponse } from "../types/modelApiResponse";
 import { areStringArraysEqualIgnoreOrder } from "../utils/TeamCompare";
 import BackButtonComponent from "../components/backButton";
 
@@ -19,7 +20,9 @@ export default function SwapPlayer() {
     predictedTeam,
     setPredictedTeam,
     playerStats,
-    covMatrix,
+    sessionId,
+    setSessionId,
+    date,
     matchData,
     selectedPlayersTeamA,
     selectedPlayersTeamB,
@@ -36,9 +39,28 @@ export default function SwapPlayer() {
 
   const nextPage = "/final-playing11";
 
+  // The optimization session expired (or the server restarted): solve the squad again
+  // for a new session
+  async function renewSession(): Promise<string> {
+    const teams = Object.keys(matchData).filter((team) => team !== "Format" && !team.includes("Second_Squad"));
+    const player_info: PlayerInfo = {
+      [teams[0]]: selectedPlayersTeamA.map((player) => player.name),
+      [teams[1]]: selectedPlayersTeamB.map((player) => player.name),
+    };
+    const response = await getPredicted11(date, matchData?.Format as "T20" | "Test" | "ODI", player_info);
+    setSessionId(response.session_id);
+    return response.session_id;
+  }
+
   async function handleTeamRevaluation(newPredictedTeam: string[], flag: boolean) {
     try {
-      const response = await revaluateTeamSwap(covMatrix, JSON.stringify(playerStats), newPredictedTeam);
+      let response: RevaluateTeamApiResponse;
+      try {
+        response = await revaluateTeamSwap(sessionId, newPredictedTeam);
+      } catch (error) {
+        if (!axios.isAxiosError(error) || error.response?.status !== 404) throw error;
+        response = await revaluateTeamSwap(await renewSession(), newPredictedTeam);
+      }
       if (flag) setTeamStats(response);
       else setNewTeamStats(response);
     } catch (error) {
@@ -2,14 +2,24 @@ export type PlayerInfo = {
   [key: string]: string[];
 };
 
+// Covariance sub-matrix of `players`: row-major little-endian float32 values in base64
+export type CompactMatrix = {
+  players: string[];
+  shape: number[];
+  data: string;
+};
+
 export type ModelApiResponse = {
   best_team: string[];
-  cov_matrix: string;
+  session_id: string;
+  cov_matrix: CompactMatrix;
   player_stats: string;
+  data_version: string;
 };
 
 export type RevaluateTeamApiResponse = {
   team_consistency_score: number;
   team_diversity_score: number;
   form_score: number;
+  data_version: string;
 };
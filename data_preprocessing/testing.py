@@ -1,56 +1,58 @@
 import json
-from calculator import calculate_fantasy_points_t20
-from calculate_odi import calculate_fantasy_points_odi
-from calculator_test import calculate_fantasy_points_test
+import math
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from vectorized_calculator import (player_match_frame, calculate_fantasy_points_vectorized,
+                                   match_format, POINT_COLUMNS, IS_INT_COLUMNS)
+from fantasy_data import (load_fantasy_points_store, append_fantasy_points_delta, remove_fantasy_points_delta,
+                          match_date)
 from tqdm import tqdm
 
-def process_match_data(match_data_path, aggregate_data_path, output_path):
+def score_players(player_data):
     """
-    Process match data and calculate fantasy points for all formats
+    Calculate fantasy points for a set of players and attach their match-level stats
+    
+    Career aggregates are not copied into match records; they stay in the per-format
+    *_aggregate_data.json table and are joined by consumers when needed.
     
     Args:
-        match_data_path (str): Path to combined player match data JSON
-        aggregate_data_path (str): Path to aggregate data JSON
-        output_path (str): Path to save output JSON
+        player_data (dict): Player match data, {player: {match_id: stats}}
+    
+    Returns:
+        dict: {player: {match_id: extended_stats}}
     """
-    # Load both data files
-    try:
-        with open(match_data_path, 'r') as file:
-            player_data = json.load(file)
-        
-        with open(aggregate_data_path, 'r') as file:
-            aggregate_data = json.load(file)
-    except Exception as e:
-        print(f"Error loading input files: {str(e)}")
-        return
+    # Score every player-match in one vectorized pass; rows follow player_data order
+    frame = player_match_frame(player_data)
+    points = calculate_fantasy_points_vectorized(frame)
+    # Values the scalar calculators compute as int are written as int
+    points_rows = iter(zip(match_format(frame["match_id"]), *(
+        [int(value) if is_int else value
+         for value, is_int in zip(points[key].tolist(), points[IS_INT_COLUMNS[key]].tolist())]
+        for key in POINT_COLUMNS
+    )))
 
     # Initialize fantasy points dictionary
     fantasy_points = {}
 
     # Loop through each player and their respective match data
-    for player, matches in tqdm(player_data.items(), desc="Processing players"):
+    for player, matches in player_data.items():
         fantasy_points[player] = {}
-        player_aggregate_stats = aggregate_data.get(player, {})
         
         for match_id, stats in matches.items():
-            # Determine format and calculate points
-            if match_id[-3:] == "T20":
-                points = calculate_fantasy_points_t20(stats)
-            elif match_id[-4:] == "Test" or match_id[-3:] == "MDM":
-                points = calculate_fantasy_points_test(stats)
-            elif match_id[-3:] == "ODI" or match_id[-3:] == "ODM":
-                points = calculate_fantasy_points_odi(stats)
-            else:
+            format_name, total_points, batting_points, bowling_points, fielding_points = next(points_rows)
+            if format_name is None:
                 print(f"Unknown format for match_id: {match_id}")
                 continue
 
             # Combine all stats into a single level dictionary
             extended_stats = {
                 # Fantasy points
-                "total_points": points["total_points"],
-                "batting_points": points["batting_points"],
-                "bowling_points": points["bowling_points"],
-                "fielding_points": points["fielding_points"],
+                "total_points": total_points,
+                "batting_points": batting_points,
+                "bowling_points": bowling_points,
+                "fielding_points": fielding_points,
                 
                 # Match Statistics
                 "venue": stats.get("Venue"),
@@ -80,45 +82,307 @@ def process_match_data(match_data_path, aggregate_data_path, output_path):
                 "runs_given": stats.get("Runs Given"),
                 "runs_given_ball_per_inning": stats.get("RunsGiven/Ball Per Inning"),
                 "batting_sr_aa": stats.get("*Batting S/R AA(Above Average)"),
-                
-                # Add all aggregate stats
-                **player_aggregate_stats
             }
             
             fantasy_points[player][match_id] = extended_stats
 
+    return fantasy_points
+
+def process_match_data(match_data_path, output_path):
+    """
+    Process match data and calculate fantasy points for all formats
+    
+    Args:
+        match_data_path (str): Path to combined player match data JSON
+        output_path (str): Path to save output JSON
+    """
+    # Load match data
+    try:
+        with open(match_data_path, 'r') as file:
+            player_data = json.load(file)
+    except Exception as e:
+        print(f"Error loading input files: {str(e)}")
+        return
+
+    fantasy_points = score_players(player_data)
+
     # Write the results to output file
     try:
         with open(output_path, 'w') as outfile:
             json.dump(fantasy_points, outfile, indent=4)
+        remove_fantasy_points_delta(output_path)
         print(f"Successfully saved fantasy points to {output_path}")
     except Exception as e:
         print(f"Error saving output file: {str(e)}")
 
-def main():
-    # Process T20 data
-    print("\nProcessing T20 data...")
-    process_match_data(
-        '../data/interim/T20_player_match_data.json',
-        '../data/processed/T20_aggregate_data.json',
-        '../data/processed/player_fantasy_points_t20.json'
-    )
+def _score_shard(shard_player_data):
+    """
+    Worker entry point: scores one shard of players and returns it as a JSON fragment
+    
+    The fragment is the body of the output object (without the outer braces) formatted
+    exactly like json.dump(..., indent=4) formats it, so shards can be concatenated.
+    """
+    fantasy_points = score_players(shard_player_data)
+    if not fantasy_points:
+        return ""
+    return json.dumps(fantasy_points, indent=4)[2:-2]
+
+def _iter_shards(player_data, shard_size):
+    """Yields player_data shards, releasing each player from the input as it goes"""
+    players = list(player_data.keys())
+    for start in range(0, len(players), shard_size):
+        shard_players = players[start:start + shard_size]
+        yield {player: player_data.pop(player) for player in shard_players}
+
+def process_match_data_sharded(match_data_path, output_path, pool,
+                               shard_size=500, max_pending_shards=8):
+    """
+    Process match data in player shards on a process pool, streaming each shard to disk
+    
+    Produces the same file as process_match_data. The input is loaded whole, so peak
+    memory is that of one format's interim data; at most `max_pending_shards` scored
+    shards wait to be written. The file is written to a temporary path and moved into
+    place when complete.
+    
+    Args:
+        match_data_path (str): Path to combined player match data JSON
+        output_path (str): Path to save output JSON
+        pool (concurrent.futures.Executor): Pool the shards are scored on
+        shard_size (int): Number of players per shard
+        max_pending_shards (int): Maximum number of shards submitted but not yet written
+    """
+    try:
+        with open(match_data_path, 'r') as file:
+            player_data = json.load(file)
+    except Exception as e:
+        print(f"Error loading input files: {str(e)}")
+        return
+
+    num_shards = math.ceil(len(player_data) / shard_size)
+    temp_path = f"{output_path}.tmp"
+    try:
+        with open(temp_path, 'w') as outfile:
+            outfile.write("{")
+            written = 0
+
+            def write_fragment(fragment):
+                nonlocal written
+                if fragment:
+                    outfile.write(("\n" if written == 0 else ",\n") + fragment)
+                    written += 1
+
+            pending = deque()
+            progress = tqdm(total=num_shards, desc=f"Processing {os.path.basename(output_path)}")
+            for shard in _iter_shards(player_data, shard_size):
+                pending.append(pool.submit(_score_shard, shard))
+                if len(pending) >= max_pending_shards:
+                    write_fragment(pending.popleft().result())
+                    progress.update(1)
+            while pending:
+                write_fragment(pending.popleft().result())
+                progress.update(1)
+            progress.close()
+
+            outfile.write("\n}" if written else "}")
+        os.replace(temp_path, output_path)
+        remove_fantasy_points_delta(output_path)
+        print(f"Successfully saved fantasy points to {output_path}")
+    except Exception as e:
+        print(f"Error saving output file: {str(e)}")
+
+def process_all_formats(jobs, workers=None, shard_size=500):
+    """
+    Process several formats one after another, scoring each one's shards on a shared process pool
+    
+    Formats run sequentially so only one format's interim data is in memory at a time.
+    
+    Args:
+        jobs (list): (match_data_path, output_path) per format
+        workers (int): Number of worker processes (defaults to the CPU count)
+        shard_size (int): Number of players per shard
+    """
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for match_data_path, output_path in jobs:
+            process_match_data_sharded(match_data_path, output_path, pool=pool,
+                                       shard_size=shard_size, max_pending_shards=2 * workers)
+            print(f"Finished {output_path}")
+
+MANIFEST_PATH = '../data/processed/fantasy_points_manifest.json'
+
+def _write_json_atomic(data, output_path, indent=None):
+    temp_path = f"{output_path}.tmp"
+    with open(temp_path, 'w') as outfile:
+        json.dump(data, outfile, indent=indent)
+    os.replace(temp_path, output_path)
+
+def _watermark(records):
+    """Watermark of a player's records: the last match, its date and every match on that date"""
+    last_match_id = max(records, key=match_date)
+    date = match_date(last_match_id)
+    return {
+        "match_id": last_match_id,
+        "date": date,
+        "match_ids": [match_id for match_id in records if match_date(match_id) == date],
+    }
+
+def _update_feature_store(store_dir, player_data, players, format_name):
+    """
+    Adds the new matches of `players` to the format's feature store, if one was built
+    
+    The store needs each changed player's complete history, so those players (only) are
+    rescored from the interim data, which gives the same records as the processed store.
+    """
+    if not os.path.exists(os.path.join(store_dir, "manifest.json")):
+        print(f"No feature store at {store_dir}, skipping its update")
+        return 0
+    from fantasy_data import AGGREGATE_STATS_PATHS, load_aggregate_stats
+    from feature_store import FeatureStore
+
+    histories = score_players({player: player_data[player] for player in players})
+    written = FeatureStore(store_dir).update(histories, load_aggregate_stats(AGGREGATE_STATS_PATHS[format_name]))
+    print(f"Feature store {store_dir}: {written} rows updated")
+    return written
+
+def process_match_data_incremental(match_data_path, output_path, format_name,
+                                   manifest_path=MANIFEST_PATH, feature_store_dir=None):
+    """
+    Score only the matches that are not in the processed store yet and append them to its delta log
     
-    # Process ODI/ODM data
-    print("\nProcessing ODI/ODM data...")
-    process_match_data(
-        '../data/interim/ODI_ODM_player_match_data.json',
-        '../data/processed/ODI_ODM_aggregate_data.json',
-        '../data/processed/player_fantasy_points_odi.json'
-    )
+    The manifest keeps, per format and player, the last processed match, its date and
+    the ids of the matches on that date (the watermark). A match is new when it is dated
+    after the player's watermark, or on the watermark date but not among its ids, so the
+    store itself is not read. New records are appended to the store's delta log
+    (fantasy_data.append_fantasy_points_delta) rather than rewriting the store, and the
+    manifest is written after the log, so an interrupted run is simply picked up by the
+    next one. A format without a manifest entry (e.g. after a full run) is bootstrapped
+    from the store once, and a store that doesn't exist yet gets a full run.
     
-    # Process MDM Test data
-    print("\nProcessing MDM Test data...")
-    process_match_data(
-        '../data/interim/Test_MDM_player_match_data.json',
-        '../data/processed/Test_MDM_aggregate_data.json',
-        '../data/processed/player_fantasy_points_test.json'
-    )
+    With `feature_store_dir`, the new matches are also added to that feature store
+    (feature_store.FeatureStore.update), when it has been built.
+    
+    The interim match data is still read in full: it is the only input and holds every
+    match of the format.
+    
+    Args:
+        match_data_path (str): Path to combined player match data JSON
+        output_path (str): Path of the processed fantasy points store to update
+        format_name (str): Format key in the manifest ('T20', 'ODI' or 'Test')
+        manifest_path (str): Path to the watermark manifest JSON
+        feature_store_dir (str): Feature store of the format to update (optional)
+    
+    Returns:
+        dict: The newly scored records, {player: {match_id: extended_stats}}
+    """
+    try:
+        with open(match_data_path, 'r') as file:
+            player_data = json.load(file)
+    except Exception as e:
+        print(f"Error loading input files: {str(e)}")
+        return {}
+
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r') as file:
+            manifest = json.load(file)
+    if not os.path.exists(output_path):
+        # Nothing to append to: every match is new, so write the whole store
+        print(f"No store at {output_path}, scoring every match")
+        fantasy_points = score_players(player_data)
+        try:
+            _write_json_atomic(fantasy_points, output_path, indent=4)
+            remove_fantasy_points_delta(output_path)
+            manifest[format_name] = {
+                player: _watermark(records) for player, records in fantasy_points.items() if records
+            }
+            _write_json_atomic(manifest, manifest_path, indent=4)
+            print(f"Successfully saved fantasy points to {output_path}")
+        except Exception as e:
+            print(f"Error saving output file: {str(e)}")
+        return fantasy_points
+    if format_name not in manifest:
+        fantasy_points = load_fantasy_points_store(output_path)
+        manifest[format_name] = {
+            player: _watermark(records) for player, records in fantasy_points.items() if records
+        }
+        del fantasy_points
+    watermarks = manifest.setdefault(format_name, {})
+
+    # Collect matches past each player's watermark
+    new_player_data = {}
+    for player, matches in player_data.items():
+        watermark = watermarks.get(player, {})
+        date = watermark.get("date", '')
+        seen = set(watermark.get("match_ids", [watermark.get("match_id")]))
+        new_matches = {
+            match_id: stats for match_id, stats in matches.items()
+            if match_date(match_id) > date or (match_date(match_id) == date and match_id not in seen)
+        }
+        if new_matches:
+            new_player_data[player] = new_matches
+
+    if not new_player_data:
+        print(f"No new matches for {output_path}")
+        return {}
+
+    new_fantasy_points = score_players(new_player_data)
+
+    # Append in date order and move the watermarks forward
+    for player, new_records in new_fantasy_points.items():
+        new_fantasy_points[player] = dict(sorted(new_records.items(), key=lambda item: match_date(item[0])))
+        previous = watermarks.get(player)
+        if previous:
+            new_records = {**dict.fromkeys(previous.get("match_ids", [previous["match_id"]])), **new_records}
+        watermarks[player] = _watermark(new_records)
+
+    try:
+        append_fantasy_points_delta(output_path, new_fantasy_points)
+        _write_json_atomic(manifest, manifest_path, indent=4)
+        num_new = sum(len(records) for records in new_fantasy_points.values())
+        print(f"Added {num_new} player-matches for {len(new_fantasy_points)} players to {output_path}")
+    except Exception as e:
+        print(f"Error saving output file: {str(e)}")
+        return new_fantasy_points
+    if feature_store_dir:
+        _update_feature_store(feature_store_dir, player_data, list(new_fantasy_points), format_name)
+    return new_fantasy_points
+
+def main_incremental():
+    # Daily refresh: only matches newer than each player's watermark are scored, and
+    # the feature stores get the same new matches
+    from feature_store import FEATURE_STORE_DIRS
+    for format_name, match_data_path, output_path in [
+        ('T20', '../data/interim/T20_player_match_data.json', '../data/processed/player_fantasy_points_t20.json'),
+        ('ODI', '../data/interim/ODI_ODM_player_match_data.json', '../data/processed/player_fantasy_points_odi.json'),
+        ('Test', '../data/interim/Test_MDM_player_match_data.json', '../data/processed/player_fantasy_points_test.json'),
+    ]:
+        print(f"\nUpdating {format_name} data...")
+        process_match_data_incremental(match_data_path, output_path, format_name,
+                                       feature_store_dir=FEATURE_STORE_DIRS[format_name])
+
+def main():
+    # T20, ODI/ODM and MDM Test data are processed in turn, each on every core
+    print("\nProcessing T20, ODI/ODM and MDM Test data...")
+    process_all_formats([
+        (
+            '../data/interim/T20_player_match_data.json',
+            '../data/processed/player_fantasy_points_t20.json'
+        ),
+        (
+            '../data/interim/ODI_ODM_player_match_data.json',
+            '../data/processed/player_fantasy_points_odi.json'
+        ),
+        (
+            '../data/interim/Test_MDM_player_match_data.json',
+            '../data/processed/player_fantasy_points_test.json'
+        ),
+    ])
+    # The rewritten stores hold every match, so the watermarks are rebuilt from them
+    if os.path.exists(MANIFEST_PATH):
+        os.remove(MANIFEST_PATH)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if "--incremental" in sys.argv:
+        main_incremental()
+    else:
+        main()
\ No newline at end of file
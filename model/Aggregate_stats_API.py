@@ -1,28 +1,19 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response
 from flask_cors import CORS
 import json
-import requests
 import pandas as pd
-
-
-# Path to the JSON file
-T20_aggregate_points = "../data/processed/T20_aggregate_data.json"
-ODI_ODM_aggregate_points = "../data/processed/ODI_ODM_aggregate_data.json"
-Test_MDM_aggregate_points = "../data/processed/Test_MDM_aggregate_data.json"
+from aggregate_stats_store import get_aggregate_stats_store
+from explanations import player_selection_prompt
+from llm_client import LLMError, get_llm_client
 
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "http://localhost:3000"}})
 
-# Load the data from your JSON file
-with open(T20_aggregate_points, "r") as file:
-    player_T20_data = json.load(file)
-
-with open(ODI_ODM_aggregate_points, "r") as file:
-    player_ODI_data = json.load(file)
-
-with open(T20_aggregate_points, "r") as file:
-    player_Test_data = json.load(file)
+# T20/ODI/Test aggregate tables (fantasy_data.AGGREGATE_STATS_PATHS), each loaded on first use
+aggregate_stats_store = get_aggregate_stats_store()
+# Pooled, retrying, cached LLM client shared by the analysis endpoints
+llm_client = get_llm_client()
 
 
 @app.route("/aggregate_stats", methods=["POST"])
@@ -31,34 +22,13 @@ def get_player_stats():
     player_names = data["Players"]
     format = data["Format"]
 
-    stats = {}
-    for player_name in player_names:
-        stats[player_name] = {}
-        stats[player_name][format] = "Not available"
-        # Get the player name from the query string
-        if player_name:
-            # Check if the player exists in the data
-            player_stats = []
-            if format == "ODI":
-                player_stats = player_ODI_data.get(player_name)
-            elif format == "T20":
-                player_stats = player_T20_data.get(player_name)
-            elif format == "Test":
-                player_stats = player_Test_data.get(player_name)
-
-            stats[player_name] = player_stats
-    if stats:
-
-        for player, player_stats in stats.items():
-            if player_stats:
-                for key, value in player_stats.items():
-                    if value == float("inf"):
-                        player_stats[key] = "Infinity"
-
-        print(stats)
-        return jsonify(stats)
-    else:
+    if not player_names:
         return jsonify({"error": "Player name is required"}), 400
+    if aggregate_stats_store.format_name(format) is None:
+        return jsonify({"error": "Please enter format as ODI/Test/T20"}), 400
+
+    body = aggregate_stats_store.players_bytes(format, player_names)
+    return Response(body, mimetype="application/json")
     
 @app.route('/analyze_player', methods=['POST'])
 def analyze_player():
@@ -74,64 +44,22 @@ def analyze_player():
     
     selected_players = data['best_team']
     player_name = data['Player']
-    format = data['format'].lower()
+    format = data['format']
     player_aggregate_stats = None
-    if format == "t20":
-        player_aggregate_stats = player_T20_data.get(player_name, {})
-    elif format == "odi":
-        player_aggregate_stats = player_ODI_data.get(player_name, {})
-    elif format == "test":
-        player_aggregate_stats = player_Test_data.get(player_name, {})
+    if aggregate_stats_store.format_name(format):
+        player_aggregate_stats = aggregate_stats_store.table(format).get(player_name, {})
     
     
     if not player_aggregate_stats:
         return jsonify({'error': f'No aggregate statistics found for {player_name}'}), 400 
     
     selection_status = "selected" if player_name in selected_players else "not selected"
-    
-    prompt = f"""
-Based on the following statistics, explain why {player_name} was {selection_status} for the optimal fantasy cricket team:
-
-Key Aggregate Statistics:
-Batting Statistics:
-- Batting Style: {player_aggregate_stats.get('Batting', 'N/A')}
-- Total Runs: {player_aggregate_stats.get('Runs', 'N/A')}
-- Batting Average: {player_aggregate_stats.get('Batting Avg', 'N/A')}
-- Strike Rate: {player_aggregate_stats.get('Batting S/R', 'N/A')}
-- Boundary Percentage: {player_aggregate_stats.get('Boundary %', 'N/A')}
-- Mean Score: {player_aggregate_stats.get('Mean Score', 'N/A')}
-- Dismissal Rate: {player_aggregate_stats.get('Dismissal Rate', 'N/A')}
-
-Bowling Statistics:
-- Bowling Style: {player_aggregate_stats.get('Bowling', 'N/A')}
-- Wickets: {player_aggregate_stats.get('Wickets', 'N/A')}
-- Economy Rate: {player_aggregate_stats.get('Economy Rate', 'N/A')}
-- Bowling Average: {player_aggregate_stats.get('Bowling Avg', 'N/A')}
-- Bowling Strike Rate: {player_aggregate_stats.get('Bowling S/R', 'N/A')}
-- Dot Ball Bowled %: {player_aggregate_stats.get('Dot Ball Bowled %', 'N/A')}
-- Boundary Given %: {player_aggregate_stats.get('Boundary Given %', 'N/A')}
-
-Fielding Statistics:
-- Catches: {player_aggregate_stats.get('Catches', 'N/A')}
-- Runouts: {player_aggregate_stats.get('Runouts', 'N/A')}
-- Stumpings: {player_aggregate_stats.get('Stumpings', 'N/A')}
-
-A negative value for an aggregate statistic means that value does not exist and is not be to considered in the analysis.
-
-Please provide a concise and brief analysis of why this player was {selection_status}, considering only their overall cricket statistics. Output the best statistics of the player. Be crisp.
-"""
-
-    # Send request to LLM
-    url = "https://8001-01jdya9bpnhj5dqyfzh17zdghv.cloudspaces.litng.ai/predict"
-    headers = {"Content-Type": "application/json"}
-    data = {"input": prompt}
+    prompt = player_selection_prompt(player_name, selection_status, player_aggregate_stats)
 
     try:
-        response = requests.post(url, json=data, headers=headers)
-        response.raise_for_status()
-        analysis = response.json()['output']
+        analysis = llm_client.complete(prompt)
         return jsonify({"analysis": analysis})
-    except requests.exceptions.RequestException as e:
+    except LLMError:
         return jsonify({"error": "Error Querying LLM"}), 404
     
 @app.route('/analyze_team', methods=['POST'])
@@ -149,14 +77,10 @@ def analyze_team():
     selected_players = data['best_team']
     stats_df_json = data['player_stats']
     stats_df = pd.DataFrame(json.loads(stats_df_json))
-    format = data['format'].lower()
-    aggregate_stats = None
-    if format == "t20":
-        aggregate_stats = player_T20_data
-    elif format == "odi":
-        player_aggregate_stats = player_ODI_data
-    elif format == "test":
-        aggregate_stats = player_Test_data
+    format = data['format']
+    if aggregate_stats_store.format_name(format) is None:
+        return jsonify({'error': 'Please enter format as ODI/Test/T20'}), 400
+    aggregate_stats = aggregate_stats_store.table(format)
     
     team_stats = []
     for player in selected_players:
@@ -243,16 +167,10 @@ def analyze_team():
 
         Focus on why this specific combination of players forms the optimal team, considering both individual strengths and team synergy."""
 
-    url = "https://8001-01jdya9bpnhj5dqyfzh17zdghv.cloudspaces.litng.ai/predict"
-    headers = {"Content-Type": "application/json"}
-    data = {"input": prompt}
-
     try:
-        response = requests.post(url, json=data, headers=headers)
-        response.raise_for_status()
-        analysis = response.json()['output']
+        analysis = llm_client.complete(prompt)
         return jsonify({"team analysis": analysis})
-    except requests.exceptions.RequestException as e:
+    except LLMError:
         return jsonify({"error": "Error Querying LLM"}), 404
 
 if __name__ == "__main__":
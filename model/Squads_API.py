@@ -1,40 +1,85 @@
-from flask import Flask, jsonify, request
-import json
+from flask import Flask, jsonify, request, Response
 from flask_cors import CORS
+import datetime
 import re
+from squads_store import SquadsStore
 
 
-# Path to the JSON file
-squads = "../data/processed/datewise_squad.json"
-
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "http://localhost:3000"}})
 
-with open(squads, 'r') as file:
-    squads_data = json.load(file)
-    
+# Date index over ../data/processed/datewise_squad.json, month partitions loaded on demand
+squads_store = SquadsStore()
+
+DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}$')
+
+
+def json_bytes_response(body, etag):
+    # A GET with a matching If-None-Match gets a 304 without the body
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
+def valid_dates(*dates):
+    for date in dates:
+        if date is None:
+            continue
+        if not DATE_PATTERN.match(date):
+            return False
+        try:
+            datetime.date.fromisoformat(date)
+        except ValueError:
+            return False
+    return True
 
-@app.route('/squads', methods=['POST'])
+
+@app.route('/squads', methods=['GET', 'POST'])
 def squads():
-    # Get the player name from the query string
-    data = request.get_json()
-    if 'Date' not in data:
-        return jsonify({'error': 'Missing query parameter'}), 400
-    date = data['Date']
-    
-    # Check if the date is in YYYY-MM-DD format
-    if  re.match(r'\d{4}-\d{2}-\d{2}', date):
-        if date in squads_data:
-            # Check if the player exists in the data
-            leagues = squads_data.get(date)
-            if leagues:
-                return jsonify(leagues)
-            else:
-                return jsonify({"error": "No Leagues Available"}), 404
-        else:
+    # Query from the JSON body (POST) or the query string (GET):
+    #   Date: leagues of that date
+    #   from / to: {date: leagues} of every match date in the range
+    #   next (+ Date, default today): {date: leagues} of the next N match dates
+    #   nearest: {date: leagues} of the match date closest to it
+    data = (request.get_json(silent=True) or {}) if request.method == 'POST' else request.args
+    squads_store.refresh()
+
+    if 'from' in data or 'to' in data:
+        from_date, to_date = data.get('from'), data.get('to')
+        if not valid_dates(from_date, to_date):
+            return jsonify({"error": "Fill Date in YYYY-MM-DD format"}), 400
+        dates = squads_store.dates_between(from_date, to_date)
+    elif 'next' in data:
+        date = data.get('Date') or datetime.date.today().isoformat()
+        if not valid_dates(date):
+            return jsonify({"error": "Fill Date in YYYY-MM-DD format"}), 400
+        try:
+            count = int(data['next'])
+        except (TypeError, ValueError):
+            return jsonify({'error': 'next must be a number of matchdays'}), 400
+        dates = squads_store.next_dates(date, count)
+    elif 'nearest' in data:
+        if not valid_dates(data['nearest']):
+            return jsonify({"error": "Fill Date in YYYY-MM-DD format"}), 400
+        nearest = squads_store.nearest_date(data['nearest'])
+        dates = [nearest] if nearest else []
+    elif 'Date' in data:
+        date = data['Date']
+        # Check if the date is in YYYY-MM-DD format
+        if not valid_dates(date):
+            return jsonify({"error": "Fill Date in YYYY-MM-DD format"}), 400
+        if date not in squads_store:
             return jsonify({"error": "No Data Available"}), 404
+        body, etag = squads_store.leagues_bytes(date)
+        if body in (b'{}', b'null'):
+            return jsonify({"error": "No Leagues Available"}), 404
+        return json_bytes_response(body, etag)
     else:
-        return jsonify({"error": "Fill Date in YYYY-MM-DD format"}), 400
+        return jsonify({'error': 'Missing query parameter'}), 400
+
+    if not dates:
+        return jsonify({"error": "No Data Available"}), 404
+    return json_bytes_response(*squads_store.dates_bytes(dates))
 
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,90 @@
+import json
+import math
+import threading
+from fantasy_data import AGGREGATE_STATS_PATHS, load_aggregate_stats
+
+# Aggregate stats tables for the API, one per format, each loaded on its first request.
+# Non-finite numbers (which json.load accepts but browsers' JSON.parse doesn't) are
+# replaced once at load time, and every player's stats are serialized once and kept as
+# bytes, so a response is just the concatenation of cached fragments.
+
+
+def _sanitize(value):
+    if isinstance(value, float) and not math.isfinite(value):
+        if math.isnan(value):
+            return None
+        return "Infinity" if value > 0 else "-Infinity"
+    if isinstance(value, dict):
+        return {key: _sanitize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_sanitize(item) for item in value]
+    return value
+
+
+class AggregateStatsStore:
+    """
+    Lazily loaded per-format aggregate tables with pre-serialized per-player JSON.
+
+    Args:
+        paths (dict): {format: path of the aggregate table}
+    """
+
+    def __init__(self, paths=AGGREGATE_STATS_PATHS):
+        self.paths = dict(paths)
+        self._format_names = {format_name.lower(): format_name for format_name in self.paths}
+        self._lock = threading.Lock()
+        self._tables = {}
+        self._fragments = {}
+
+    def format_name(self, format_name):
+        """Canonical name of a format given in any case, or None if unknown."""
+        return self._format_names.get(str(format_name).lower())
+
+    def table(self, format_name):
+        """
+        Sanitized aggregate table of a format, loaded on first use.
+
+        Raises:
+            KeyError: If the format is unknown
+        """
+        format_name = self.format_name(format_name)
+        if format_name is None:
+            raise KeyError("Unknown format")
+        if format_name not in self._tables:
+            with self._lock:
+                if format_name not in self._tables:
+                    self._fragments[format_name] = {}
+                    self._tables[format_name] = _sanitize(load_aggregate_stats(self.paths[format_name]))
+        return self._tables[format_name]
+
+    def player_bytes(self, format_name, player):
+        """JSON bytes of a player's stats in a format (null if the player isn't in it)."""
+        table = self.table(format_name)
+        fragments = self._fragments[self.format_name(format_name)]
+        fragment = fragments.get(player)
+        if fragment is None:
+            fragment = json.dumps(table.get(player), allow_nan=False).encode()
+            fragments[player] = fragment
+        return fragment
+
+    def players_bytes(self, format_name, players):
+        """JSON bytes of {player: stats} for the given players."""
+        parts = [
+            json.dumps(player).encode() + b":" + self.player_bytes(format_name, player)
+            for player in dict.fromkeys(players)
+        ]
+        return b"{" + b",".join(parts) + b"}"
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_aggregate_stats_store():
+    """The process-wide AggregateStatsStore, created on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = AggregateStatsStore()
+    return _store
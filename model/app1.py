@@ -19,6 +19,9 @@ from heuristic_solver import (
 import datetime
 from utils import get_past_match_performance, extract_date_from_match_key, plot_team_distribution, calculate_team_metrics
 from get_snapshot import get_team_selection_snapshot
+from fantasy_data import load_fantasy_points_store
+from fantasy_dataset import dataset_version
+from solve_cache import SolveCache
 import pandas as pd
 import numpy as np
 import scipy.stats as stats
@@ -30,31 +33,36 @@ def load_sample_players(json_file):
         return json.load(file)
 
 @st.cache_data()
-def get_optim_file(fantasy_points_path):
+def get_optim_file(fantasy_points_path, data_version=None):
+    # data_version is only part of the cache key, so changed files are loaded again
     return load_player_fantasy_points_for_optimization(fantasy_points_path)
 
+@st.cache_resource()
+def get_solve_cache():
+    # Team selections shared with the backtests, keyed on the data version
+    return SolveCache()
+
 @st.cache_data()
 def load_player_fantasy_points(json_file):
-    with open(json_file, "r") as file:
-        data = json.load(file)
-        sorted_data = {}
-        for player, matches in data.items():
-            match_list = list(matches.items())
-            def extract_date_from_match_key(match_key):
-                date_pattern = r'(\d{4}-\d{2}-\d{2})'
-                match = re.search(date_pattern, match_key)
-                if match:
-                    date_str = match.group(1)
-                    try:
-                        date = datetime.datetime.strptime(date_str, '%Y-%m-%d')
-                    except ValueError:
-                        date = datetime.datetime.min
-                else:
+    data = load_fantasy_points_store(json_file)
+    sorted_data = {}
+    for player, matches in data.items():
+        match_list = list(matches.items())
+        def extract_date_from_match_key(match_key):
+            date_pattern = r'(\d{4}-\d{2}-\d{2})'
+            match = re.search(date_pattern, match_key)
+            if match:
+                date_str = match.group(1)
+                try:
+                    date = datetime.datetime.strptime(date_str, '%Y-%m-%d')
+                except ValueError:
                     date = datetime.datetime.min
-                return date
-            match_list_sorted = sorted(match_list, key=lambda x: extract_date_from_match_key(x[0]))
-            sorted_data[player] = match_list_sorted
-        return sorted_data
+            else:
+                date = datetime.datetime.min
+            return date
+        match_list_sorted = sorted(match_list, key=lambda x: extract_date_from_match_key(x[0]))
+        sorted_data[player] = match_list_sorted
+    return sorted_data
 
 def filter_match_keys(match_keys, format_selected):
     filtered_keys = []
@@ -278,6 +286,7 @@ if get_team_snapshot:
     if st.button("Generate Team Selection Analysis", key="generate_analysis") or st.session_state.analysis_generated:
         st.session_state.analysis_generated = True
         all_paths = [f"../data/processed/player_fantasy_points_{format_lower}.json" for format_lower in ["t20", "odi", "test"]]
+        data_version = dataset_version(dict(zip(["T20", "ODI", "Test"], all_paths)))
         
         # Show loading message while processing
         if date_filter != st.session_state.last_date_filter:
@@ -286,12 +295,14 @@ if get_team_snapshot:
                     match_keys,
                     match_data,
                     fantasy_points,
-                    get_optim_file(all_paths[0]),
-                    get_optim_file(all_paths[1]),
-                    get_optim_file(all_paths[2]),
+                    get_optim_file(all_paths[0], data_version),
+                    get_optim_file(all_paths[1], data_version),
+                    get_optim_file(all_paths[2], data_version),
                     input_date=date_filter,
                     quantile_form=40,
-                    num_matches=65
+                    num_matches=65,
+                    solve_cache=get_solve_cache(),
+                    data_version=data_version
                 )
                 st.session_state.last_date_filter = date_filter
 
@@ -0,0 +1,112 @@
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from solver_pool import PoolSaturated, history_window, solve_best_team
+from solve_cache import problem_key
+
+# Optimization of many matches at once (e.g. every match on a date). Materialized and
+# cached results are returned first; the other matches are solved in parallel on the
+# solver pool, each player's history window is computed once per (format, date) and
+# shared by every match the player is in, and results are yielded in completion order.
+
+# Seconds to wait before retrying when the pool is full with other requests' solves
+SATURATED_RETRY = 0.1
+
+
+def _squad_names(player_info):
+    names = []
+    for players in player_info.values():
+        for player in players:
+            name = player.split(":")[0].strip()
+            if name not in names:
+                names.append(name)
+    return names
+
+
+def solve_batch(matches, pool, snapshot, solve_cache, params, timeout, materialized=None):
+    """
+    Solves a batch of matches and yields each result as soon as it is ready.
+
+    Args:
+        matches (list): Dicts with 'match', 'format', 'date' and 'player_info' (see
+            match_squads.py); a match with an 'error' is passed through
+        pool (SolverPool): Worker pool
+        snapshot (DatasetSnapshot): Data to solve on
+        solve_cache (SolveCache): Cache consulted first and filled with new results
+        params (dict): Solver parameters (num_matches, risk_aversion, solver, points_source)
+        timeout (float): Seconds the whole batch may take
+        materialized (MaterializedTeams): Precomputed teams, consulted before the cache
+
+    Yields:
+        tuple: (match, result) with result as returned by solver_pool.solve_best_team
+    """
+    deadline = time.monotonic() + timeout
+    queue = deque()
+    for match in matches:
+        if "error" in match:
+            yield match, {"error": match["error"]}
+            continue
+        if snapshot.get(match["format"]) is None:
+            yield match, {"error": f"No fantasy points data for format {match['format']}"}
+            continue
+        key = problem_key(match["player_info"], match["date"], match["format"], params)
+        result = materialized.get(snapshot.version, key) if materialized is not None else None
+        if result is None:
+            result = solve_cache.get(snapshot.version, key)
+        if result is not None:
+            yield match, result
+        else:
+            queue.append((match, key))
+
+    windows = {}
+    for match, _ in queue:
+        fantasy_points = snapshot.get(match["format"])
+        shared = windows.setdefault((match["format"], match["date"]), {})
+        for name in _squad_names(match["player_info"]):
+            if name not in shared:
+                shared[name] = history_window(fantasy_points.get(name), match["date"])
+
+    futures = {}
+    while queue or futures:
+        # Submit while the pool takes more; the rest waits for our own solves to finish
+        while queue:
+            match, key = queue[0]
+            shared = windows[(match["format"], match["date"])]
+            try:
+                future = pool.submit(
+                    solve_best_team,
+                    player_info=match["player_info"],
+                    date_of_match=match["date"],
+                    format_name=match["format"],
+                    fantasy_points_data={name: shared[name] for name in _squad_names(match["player_info"])},
+                    data_version=snapshot.version,
+                    **params
+                )
+            except PoolSaturated:
+                break
+            queue.popleft()
+            futures[future] = (match, key)
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        if not futures:
+            # The pool is full with other requests' solves
+            time.sleep(min(SATURATED_RETRY, remaining))
+            continue
+        done, _ = wait(futures, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            match, key = futures.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"error": f"Team optimization failed: {e}"}
+            if "error" not in result:
+                solve_cache.put(key, result)
+            yield match, result
+
+    for future, (match, _) in futures.items():
+        future.cancel()
+        yield match, {"error": "Team optimization timed out"}
+    for match, _ in queue:
+        yield match, {"error": "Team optimization timed out"}
@@ -0,0 +1,98 @@
+import sys
+from aggregate_stats_store import AggregateStatsStore
+from llm_client import LLMError, get_llm_client
+
+# Prompts of the player explanations, shared by the analysis API, pipeline and
+# llm_inference so a given player, selection status and stats always render the same
+# prompt (and hit the same llm_cache entry). prewarm_explanations() fills the cache for
+# every player of the materialized squads, so the analyses of upcoming matches are
+# served without waiting for the LLM.
+
+
+def player_selection_prompt(player_name, selection_status, player_aggregate_stats):
+    """
+    Builds the LLM prompt explaining a player's selection.
+
+    Args:
+        player_name (str): Name of the player to analyze
+        selection_status (str): "selected" or "not selected"
+        player_aggregate_stats (dict): The player's aggregate stats
+
+    Returns:
+        str: Prompt text
+    """
+    return f"""
+Based on the following statistics, explain why {player_name} was {selection_status} for the optimal fantasy cricket team:
+
+Key Aggregate Statistics:
+Batting Statistics:
+- Batting Style: {player_aggregate_stats.get('Batting', 'N/A')}
+- Total Runs: {player_aggregate_stats.get('Runs', 'N/A')}
+- Batting Average: {player_aggregate_stats.get('Batting Avg', 'N/A')}
+- Strike Rate: {player_aggregate_stats.get('Batting S/R', 'N/A')}
+- Boundary Percentage: {player_aggregate_stats.get('Boundary %', 'N/A')}
+- Mean Score: {player_aggregate_stats.get('Mean Score', 'N/A')}
+- Dismissal Rate: {player_aggregate_stats.get('Dismissal Rate', 'N/A')}
+
+Bowling Statistics:
+- Bowling Style: {player_aggregate_stats.get('Bowling', 'N/A')}
+- Wickets: {player_aggregate_stats.get('Wickets', 'N/A')}
+- Economy Rate: {player_aggregate_stats.get('Economy Rate', 'N/A')}
+- Bowling Average: {player_aggregate_stats.get('Bowling Avg', 'N/A')}
+- Bowling Strike Rate: {player_aggregate_stats.get('Bowling S/R', 'N/A')}
+- Dot Ball Bowled %: {player_aggregate_stats.get('Dot Ball Bowled %', 'N/A')}
+- Boundary Given %: {player_aggregate_stats.get('Boundary Given %', 'N/A')}
+
+Fielding Statistics:
+- Catches: {player_aggregate_stats.get('Catches', 'N/A')}
+- Runouts: {player_aggregate_stats.get('Runouts', 'N/A')}
+- Stumpings: {player_aggregate_stats.get('Stumpings', 'N/A')}
+
+A negative value for an aggregate statistic means that value does not exist and is not be to considered in the analysis.
+
+Please provide a concise and brief analysis of why this player was {selection_status}, considering only their overall cricket statistics. Output the best statistics of the player. Be crisp.
+"""
+
+
+def prewarm_explanations(artifact_dir=None, store=None, client=None, max_concurrency=None):
+    """
+    Asks the LLM (through its cache) for the explanation of every player of the materialized squads.
+
+    Args:
+        artifact_dir (str): Directory written by materialized_teams.materialize_teams
+        store (AggregateStatsStore): Aggregate tables the prompts are rendered from
+        client (LLMClient): Client with an LLMCache (defaults to the shared client)
+        max_concurrency (int): LLM requests in flight at once
+
+    Returns:
+        dict: Number of prompts 'cached' (already or now), 'failed' and players 'skipped'
+            for lack of aggregate stats
+    """
+    # Imported here: the solver stack is only needed by this job, not by the API importing the prompts
+    from materialized_teams import MATERIALIZED_TEAMS_DIR, MaterializedTeams
+    store = store or AggregateStatsStore()
+    client = client or get_llm_client()
+
+    prompts, skipped = {}, 0
+    for entry, result in MaterializedTeams(artifact_dir or MATERIALIZED_TEAMS_DIR).teams():
+        if store.format_name(entry["format"]) is None:
+            continue
+        aggregate_stats = store.table(entry["format"])
+        for player_name in result["stats_df"]["player"]:
+            player_aggregate_stats = aggregate_stats.get(player_name)
+            if not player_aggregate_stats:
+                skipped += 1
+                continue
+            selection_status = "selected" if player_name in result["best_team"] else "not selected"
+            prompt = player_selection_prompt(player_name, selection_status, player_aggregate_stats)
+            prompts[prompt] = None
+
+    outputs = client.complete_many(list(prompts), max_concurrency)
+    failed = sum(isinstance(output, LLMError) for output in outputs)
+    return {"cached": len(outputs) - failed, "failed": failed, "skipped": skipped}
+
+
+if __name__ == "__main__":
+    # Meant to run after the materialized_teams job
+    counts = prewarm_explanations(max_concurrency=int(sys.argv[1]) if len(sys.argv) > 1 else None)
+    print(f"Prewarmed explanations: {counts}")
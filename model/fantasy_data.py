@@ -0,0 +1,219 @@
+import json
+import os
+import re
+from collections.abc import Mapping
+from typing import Dict, Iterator, Optional, Union
+
+MATCH_DATE_PATTERN = re.compile(r"(\d{4}-\d{2}-\d{2})")
+
+
+def match_date(match_id) -> str:
+    """
+    Returns the date of a cricsheet match id like 'Team_A-Team_B-2024-07-10-male-T20'.
+
+    Args:
+        match_id (str): Match identifier
+
+    Returns:
+        str: The YYYY-MM-DD date, or '' when there is none (sorts first)
+    """
+    date_match = MATCH_DATE_PATTERN.search(str(match_id))
+    return date_match.group(1) if date_match else ""
+
+
+# Paths of the per-player career aggregate tables, one per format. Per-match records in
+# player_fantasy_points_*.json only hold match-level fields; consumers that need
+# aggregates look them up per player in these tables, or load the records with
+# with_aggregates=True to get them joined lazily.
+AGGREGATE_STATS_PATHS = {
+    "T20": "../data/processed/T20_aggregate_data.json",
+    "ODI": "../data/processed/ODI_ODM_aggregate_data.json",
+    "Test": "../data/processed/Test_MDM_aggregate_data.json",
+}
+
+
+def load_aggregate_stats(json_file: str) -> Dict:
+    """
+    Loads the per-player aggregate stats table.
+
+    Args:
+        json_file (str): Path to an *_aggregate_data.json file
+
+    Returns:
+        Dict: {player: {aggregate_stat: value}}
+    """
+    with open(json_file, "r") as file:
+        return json.load(file)
+
+
+def aggregate_stats_path(json_file: str) -> str:
+    """
+    Returns the aggregate table of the format of a player_fantasy_points_*.json store.
+
+    Args:
+        json_file (str): Path to a fantasy points store, e.g. player_fantasy_points_t20.json
+
+    Returns:
+        str: Path from AGGREGATE_STATS_PATHS
+    """
+    suffix = os.path.splitext(os.path.basename(json_file))[0].rsplit("_", 1)[-1].lower()
+    for format_name, path in AGGREGATE_STATS_PATHS.items():
+        if format_name.lower() == suffix:
+            return path
+    raise ValueError(f"No aggregate table for {json_file}")
+
+
+class JoinedMatchStats(Mapping):
+    """
+    Read-only view of one match record joined with the player's aggregate stats.
+
+    Keys and precedence are those of the old denormalized records: match-level fields
+    first, aggregate fields after them, and the aggregate value wins on a name clash.
+    Nothing is copied: both sides are looked up on access.
+    """
+
+    __slots__ = ("match_stats", "aggregate_stats")
+
+    def __init__(self, match_stats: Dict, aggregate_stats: Optional[Dict]):
+        self.match_stats = match_stats
+        self.aggregate_stats = aggregate_stats or {}
+
+    def __getitem__(self, key):
+        if key in self.aggregate_stats:
+            return self.aggregate_stats[key]
+        return self.match_stats[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self.aggregate_stats or key in self.match_stats
+
+    def __iter__(self) -> Iterator:
+        yield from self.match_stats
+        for key in self.aggregate_stats:
+            if key not in self.match_stats:
+                yield key
+
+    def __len__(self) -> int:
+        return len(self.match_stats) + sum(
+            1 for key in self.aggregate_stats if key not in self.match_stats
+        )
+
+
+def join_aggregate_stats(fantasy_points: Dict, aggregate_stats: Dict) -> Dict:
+    """
+    Wraps every match record of every player in a JoinedMatchStats view.
+
+    Works with both loader layouts ({player: {match: info}} and
+    {player: [(match, info), ...]}) and keeps the layout it was given.
+
+    Args:
+        fantasy_points (Dict): Fantasy points data as returned by the loaders
+        aggregate_stats (Dict): Per-player aggregate table
+
+    Returns:
+        Dict: Fantasy points data whose match records also expose aggregate stats
+    """
+    joined = {}
+    for player, matches in fantasy_points.items():
+        player_aggregate_stats = aggregate_stats.get(player, {})
+        if isinstance(matches, dict):
+            joined[player] = {
+                match_key: JoinedMatchStats(match_info, player_aggregate_stats)
+                for match_key, match_info in matches.items()
+            }
+        else:
+            joined[player] = [
+                (match_key, JoinedMatchStats(match_info, player_aggregate_stats))
+                for match_key, match_info in matches
+            ]
+    return joined
+
+
+def with_aggregate_stats(fantasy_points: Dict, json_file: str,
+                         with_aggregates: Union[bool, str]) -> Dict:
+    """
+    Applies a loader's with_aggregates option to the data it loaded.
+
+    Args:
+        fantasy_points (Dict): Fantasy points data as returned by the loaders
+        json_file (str): Path of the store the data was loaded from
+        with_aggregates (bool or str): False to return the data as is, True to join the
+            aggregate table of the store's format, or the path of the table to join
+
+    Returns:
+        Dict: The data, joined with the aggregate table when requested
+    """
+    if not with_aggregates:
+        return fantasy_points
+    path = with_aggregates if isinstance(with_aggregates, str) else aggregate_stats_path(json_file)
+    return join_aggregate_stats(fantasy_points, load_aggregate_stats(path))
+
+
+# The incremental fantasy points refresh doesn't rewrite player_fantasy_points_*.json:
+# it appends each player's newly scored records as one JSON line to the store's delta
+# log, and readers apply the lines in order on top of the store. A full run rewrites the
+# store and removes the log.
+DELTA_SUFFIX = ".delta.jsonl"
+
+
+def delta_path(json_file: str) -> str:
+    """Path of the delta log of a fantasy points store."""
+    return json_file + DELTA_SUFFIX
+
+
+def load_fantasy_points_store(json_file: str) -> Dict:
+    """
+    Loads a fantasy points store with its delta log applied.
+
+    Args:
+        json_file (str): Path to a player_fantasy_points_*.json file
+
+    Returns:
+        Dict: {player: {match_id: record}}; records from the log follow the player's
+        stored ones
+    """
+    with open(json_file, "r") as file:
+        fantasy_points = json.load(file)
+    try:
+        with open(delta_path(json_file), "r") as file:
+            for line in file:
+                # A line cut short by an interrupted append is skipped (and rescored)
+                if not line.endswith("\n"):
+                    break
+                delta = json.loads(line)
+                fantasy_points.setdefault(delta["player"], {}).update(delta["matches"])
+    except FileNotFoundError:
+        pass
+    return fantasy_points
+
+
+def append_fantasy_points_delta(json_file: str, fantasy_points_delta: Dict):
+    """
+    Appends newly scored records to the delta log of a fantasy points store.
+
+    Args:
+        json_file (str): Path to the player_fantasy_points_*.json file
+        fantasy_points_delta (Dict): {player: {match_id: record}}
+    """
+    path = delta_path(json_file)
+    with open(path, "a+b") as file:
+        # Drop a line cut short by an interrupted append, so the log stays line-aligned
+        file.seek(0, os.SEEK_END)
+        if file.tell():
+            file.seek(-1, os.SEEK_END)
+            if file.read(1) != b"\n":
+                file.seek(0)
+                content = file.read()
+                file.truncate(content.rfind(b"\n") + 1)
+        file.seek(0, os.SEEK_END)
+        for player, matches in fantasy_points_delta.items():
+            file.write((json.dumps({"player": player, "matches": matches}) + "\n").encode())
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def remove_fantasy_points_delta(json_file: str):
+    """Removes the delta log of a store that was just rewritten in full."""
+    try:
+        os.remove(delta_path(json_file))
+    except FileNotFoundError:
+        pass
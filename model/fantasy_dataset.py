@@ -0,0 +1,234 @@
+import hashlib
+import os
+import threading
+import time
+from types import MappingProxyType
+from fantasy_data import delta_path
+
+# Fantasy points data of the API, loaded once at startup instead of on every request.
+# Each load produces an immutable snapshot tagged with a version derived from the source
+# files; when a file changes on disk a new snapshot is built in the background and
+# swapped in with a single reference assignment, so a request always sees one
+# consistent version from start to end.
+
+FANTASY_POINTS_PATHS = {
+    "T20": "../data/processed/player_fantasy_points_t20.json",
+    "ODI": "../data/processed/player_fantasy_points_odi.json",
+    "Test": "../data/processed/player_fantasy_points_test.json",
+}
+
+# Seconds between checks of the source files for changes
+CHECK_INTERVAL = 5.0
+
+
+def _stat_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _file_signature(path):
+    # An append to the store's delta log changes the data as much as a rewrite does
+    signature = _stat_signature(path)
+    if signature is None:
+        return None
+    return signature + (_stat_signature(delta_path(path)),)
+
+
+def _dataset_version(signatures):
+    digest = hashlib.sha1()
+    for format_name in sorted(signatures):
+        digest.update(f"{format_name}:{signatures[format_name]};".encode())
+    # Prefixed with the newest modification time of the files, so versions can be ordered
+    newest = max(
+        (max(signature[0], signature[2][0] if signature[2] else 0) for signature in signatures.values() if signature),
+        default=0,
+    )
+    return f"{newest:x}-{digest.hexdigest()[:12]}"
+
+
+def version_time(version):
+    """
+    Modification time (ns) of the newest file a data version was loaded from.
+
+    Args:
+        version (str): A version from dataset_version or a FantasyDataset snapshot
+
+    Returns:
+        int: Nanoseconds since the epoch; versions with a larger time hold newer data.
+        None if version isn't a data version
+    """
+    prefix, separator, _ = str(version).partition("-")
+    try:
+        return int(prefix, 16) if separator else None
+    except ValueError:
+        return None
+
+
+def dataset_version(paths=FANTASY_POINTS_PATHS):
+    """
+    Version of the fantasy points files as they are on disk now.
+
+    Equals the version of a FantasyDataset snapshot loaded from the same files, so other
+    processes (the Streamlit app, backtests) can key shared caches on it without loading.
+
+    Args:
+        paths (dict): {format: path of the fantasy points JSON}
+
+    Returns:
+        str: Version digest
+    """
+    return _dataset_version({format_name: _file_signature(path) for format_name, path in paths.items()})
+
+
+def _read_only(fantasy_points):
+    """Freezes the loader output: a mapping proxy of per-player match tuples."""
+    return MappingProxyType({
+        player: tuple(matches.items()) if isinstance(matches, dict) else tuple(matches)
+        for player, matches in fantasy_points.items()
+    })
+
+
+class DatasetSnapshot:
+    """
+    One loaded version of the fantasy points data of every format.
+
+    Attributes:
+        version (str): Digest of the source files' modification times and sizes
+        formats (MappingProxyType): {format: read-only {player: ((match, info), ...)}}
+        loaded_at (float): time.time() of the load
+    """
+
+    __slots__ = ("version", "formats", "signatures", "loaded_at")
+
+    def __init__(self, version, formats, signatures):
+        self.version = version
+        self.formats = MappingProxyType(formats)
+        self.signatures = signatures
+        self.loaded_at = time.time()
+
+    def get(self, format_name):
+        """Fantasy points data of a format, or None if it isn't loaded."""
+        return self.formats.get(format_name)
+
+
+class FantasyDataset:
+    """
+    Read-only handle on the fantasy points data of all formats, reloaded when it changes.
+
+    Args:
+        loader (callable): Reads one fantasy points file (e.g. utils.load_player_fantasy_points)
+        paths (dict): {format: path of the fantasy points JSON}
+        check_interval (float): Seconds between checks of the files for changes
+        background (bool): Reload in a background thread (the current snapshot keeps
+            being served meanwhile) instead of in the request that noticed the change
+    """
+
+    def __init__(self, loader, paths=FANTASY_POINTS_PATHS, check_interval=CHECK_INTERVAL, background=True):
+        self.loader = loader
+        self.paths = dict(paths)
+        self.check_interval = check_interval
+        self.background = background
+        self._lock = threading.Lock()
+        self._reloading = False
+        self._last_check = time.monotonic()
+        self._reload_callbacks = []
+        self._snapshot = self._load()
+
+    def __getstate__(self):
+        # Locks and loaded data aren't pickled: a process receiving the handle loads its own
+        return {"loader": self.loader, "paths": self.paths,
+                "check_interval": self.check_interval, "background": self.background}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _signatures(self):
+        return {format_name: _file_signature(path) for format_name, path in self.paths.items()}
+
+    def _load(self):
+        signatures = self._signatures()
+        formats = {}
+        for format_name, path in self.paths.items():
+            if signatures[format_name] is None:
+                print(f"No fantasy points file for {format_name}: {path}")
+                continue
+            start = time.perf_counter()
+            formats[format_name] = _read_only(self.loader(path))
+            print(f"Loaded {format_name} fantasy points ({len(formats[format_name])} players) "
+                  f"in {time.perf_counter() - start:.2f}s")
+        return DatasetSnapshot(_dataset_version(signatures), formats, signatures)
+
+    def on_reload(self, callback):
+        """
+        Registers callback(snapshot), called after every reload with the new snapshot.
+
+        Callbacks run one reload at a time, in the thread that reloaded: the background
+        reload thread, or the caller of refresh() if background is False.
+
+        Args:
+            callback (callable): Takes the new DatasetSnapshot
+        """
+        self._reload_callbacks.append(callback)
+
+    def _reload(self):
+        try:
+            snapshot = self._load()
+            # Files that changed again while loading are picked up by the next check
+            self._snapshot = snapshot
+        except Exception as e:
+            print(f"Reloading the fantasy points data failed, keeping version {self._snapshot.version}: {e}")
+        else:
+            for callback in self._reload_callbacks:
+                try:
+                    callback(snapshot)
+                except Exception as e:
+                    print(f"Reload callback failed on version {snapshot.version}: {e}")
+        finally:
+            with self._lock:
+                self._reloading = False
+
+    def refresh(self, force=False):
+        """
+        Starts a reload if the source files changed since the current snapshot.
+
+        Args:
+            force (bool): Check the files even if the check interval hasn't elapsed
+
+        Returns:
+            bool: True if a reload was started
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._reloading or (not force and now - self._last_check < self.check_interval):
+                return False
+            self._last_check = now
+            if self._signatures() == self._snapshot.signatures:
+                return False
+            self._reloading = True
+        if self.background:
+            threading.Thread(target=self._reload, daemon=True).start()
+        else:
+            self._reload()
+        return True
+
+    def snapshot(self, refresh=True):
+        """
+        The current snapshot; callers should take it once per request and use only it.
+
+        Args:
+            refresh (bool): Check the files for changes first (processes that are handed a
+                new snapshot instead of reloading, like the solver workers, pass False)
+
+        Returns:
+            DatasetSnapshot: Current data and its version
+        """
+        if refresh:
+            self.refresh()
+        return self._snapshot
+
+    @property
+    def version(self):
+        return self._snapshot.version
@@ -0,0 +1,305 @@
+import numpy as np
+import pandas as pd
+from fantasy_data import match_date
+
+# Feature definitions for the batting/bowling/fielding points models (see model.py)
+
+PAST_FEATURES = [
+    "total_runs",
+    "avg_runs_per_inning",
+    "boundaries",
+    "sixes",
+    "average_sixes_per_inning",
+    "fours",
+    "average_fours_per_inning",
+    "boundary_percent_per_inning",
+    "wickets",
+    "avg_wickets_per_inning",
+    "catches_taken",
+    "stumped_outs_made",
+    "run_outs_made",
+    "balls_faced",
+    "avg_balls_faced_per_inning",
+    "avg_batting_sr_per_inning",
+    "avg_runs_ball_per_inning",
+    "overs_bowled",
+    "bowls_bowled",
+    "average_bowls_bowled_per_inning",
+    "avg_economy_rate_per_inning",
+    "average_consecutive_dot_balls",
+    "runs_given",
+    "runs_given_ball_per_inning",
+    "batting_sr_aa",
+]
+
+BOWLING_FEATURES = [
+    "wickets",
+    "avg_wickets_per_inning",
+    "avg_runs_ball_per_inning",
+    "overs_bowled",
+    "bowls_bowled",
+    "average_bowls_bowled_per_inning",
+    "avg_economy_rate_per_inning",
+    "average_consecutive_dot_balls",
+    "runs_given",
+    "runs_given_ball_per_inning",
+    "batting_sr_aa",
+]
+
+BATTING_FEATURES = [
+    "total_runs",
+    "avg_runs_per_inning",
+    "boundaries",
+    "sixes",
+    "average_sixes_per_inning",
+    "fours",
+    "average_fours_per_inning",
+    "boundary_percent_per_inning",
+    "balls_faced",
+    "avg_balls_faced_per_inning",
+    "avg_batting_sr_per_inning",
+    "avg_runs_ball_per_inning",
+]
+
+AGG_COLS = [
+    "Batting",
+    "Bowling",
+    "Games",
+    "Won",
+    "Drawn",
+    "Win %",
+    "Innings Batted",
+    "Runs",
+    "Singles",
+    "Fours",
+    "Sixes",
+    "Dot Balls",
+    "Balls Faced",
+    "Outs",
+    "Bowled Outs",
+    "LBW Outs",
+    "Hitwicket Outs",
+    "Caught Outs",
+    "Stumped Outs",
+    "Run Outs",
+    "Caught and Bowled Outs",
+    "Dot Ball %",
+    "Strike Turnover %",
+    "Batting S/R",
+    "Batting S/R MeanAD",
+    "Batting Avg",
+    "Mean Score",
+    "Score MeanAD",
+    "Scoring Consistency",
+    "Boundary %",
+    "Runs/Ball",
+    "Mean Balls Faced",
+    "Balls Faced MeanAD",
+    "Survival Consistency",
+    "Avg First Boundary Ball",
+    "Dismissal Rate",
+    "Boundary Rate",
+    "Innings Bowled",
+    "Runsgiven",
+    "Singlesgiven",
+    "Foursgiven",
+    "Sixesgiven",
+    "Wickets",
+    "Balls Bowled",
+    "Extras",
+    "No Balls",
+    "Wides",
+    "Dot Balls Bowled",
+    "Bowleds",
+    "LBWs",
+    "Hitwickets",
+    "Caughts",
+    "Stumpeds",
+    "Caught and Bowleds",
+    "Catches",
+    "Runouts",
+    "Stumpings",
+    "Economy Rate",
+    "Economy Rate MeanAD",
+    "Dot Ball Bowled %",
+    "Boundary Given %",
+    "Bowling Avg",
+    "Bowling Avg MeanAD",
+    "Bowling S/R",
+    "Bowling S/R MeanAD",
+    "Runsgiven/Ball",
+    "Boundary Given Rate",
+    "Strike Turnovergiven %",
+    "Avg Consecutive Dot Balls",
+    "Runs Rate",
+    "Runsgiven/Wicket",
+    "Runs AA",
+    "Runs/Ball AA",
+    "Runsgiven AA",
+    "Runsgiven/Ball AA",
+]
+
+TARGETS = ["batting_points", "bowling_points", "fielding_points"]
+
+# Fantasy points lag columns are named fantasy_{short}_prev_i
+POINTS_LAGS = {"bat": "batting_points", "bowl": "bowling_points", "field": "fielding_points"}
+
+NUM_PREV_MATCHES = 10
+
+ID_COLUMNS = ["player", "match_id", "date"]
+
+
+def matches_to_long_frame(player_data, features=PAST_FEATURES, max_matches_per_player=None):
+    """
+    Flattens {player: {match_id: stats}} into one row per player-match, sorted by (player, date).
+
+    Players keep their order in `player_data` and matches on the same date keep their
+    file order, like the stable per-player sort model.py used to do.
+
+    Args:
+        player_data (dict): Processed fantasy points data
+        features (list): Match-level stats to keep besides the points targets
+        max_matches_per_player (int): Only keep each player's first N matches (file order)
+
+    Returns:
+        pd.DataFrame: 'player', 'match_id', 'date', the targets and `features`
+    """
+    players, match_ids, records = [], [], []
+    for player, matches in player_data.items():
+        items = list(matches.items())
+        if max_matches_per_player is not None:
+            items = items[:max_matches_per_player]
+        for match_id, stats in items:
+            players.append(player)
+            match_ids.append(match_id)
+            records.append(stats)
+
+    frame = {
+        "player": players,
+        "match_id": match_ids,
+        "date": pd.to_datetime([match_date(match_id) for match_id in match_ids], format="%Y-%m-%d"),
+    }
+    for column in TARGETS + list(features):
+        frame[column] = pd.to_numeric(
+            pd.Series([stats.get(column, 0) for stats in records], dtype=object), errors="coerce"
+        )
+    long_df = pd.DataFrame(frame)
+
+    player_codes, _ = pd.factorize(long_df["player"])
+    order = np.lexsort((long_df["date"].to_numpy(), player_codes))
+    return long_df.iloc[order].reset_index(drop=True)
+
+
+def build_lag_features(long_df, features=PAST_FEATURES, num_prev_matches=NUM_PREV_MATCHES,
+                       keep_ids=False):
+    """
+    Builds the fantasy_*_prev_i and {feature}_prev_i columns for every player-match at once.
+
+    `long_df` must be sorted by (player, date). For the match at position t of a player,
+    `*_prev_k` is the value from match t - k; when the player has fewer than k earlier
+    matches the oldest one is repeated (forward-fill padding from the start of the
+    history). A player's first match has no history and produces no row.
+
+    Args:
+        long_df (pd.DataFrame): Output of matches_to_long_frame (or the same layout)
+        features (list): Match-level stats to lag
+        num_prev_matches (int): Number of lags per stat
+        keep_ids (bool): Keep the 'player', 'match_id' and 'date' columns in front
+
+    Returns:
+        pd.DataFrame: One row per player-match with history, with lag columns in the
+        order model.py has always used, followed by the targets
+    """
+    n = len(long_df)
+    rows = np.arange(n)
+    position = long_df.groupby("player", sort=False).cumcount().to_numpy()
+    group_start = rows - position
+    has_history = position > 0
+
+    # sources[k - 1] holds, for every row, the row index of its k-th previous match
+    sources = [np.maximum(rows - k, group_start)[has_history] for k in range(1, num_prev_matches + 1)]
+
+    columns = {}
+    if keep_ids:
+        for column in ID_COLUMNS:
+            columns[column] = long_df[column].to_numpy()[has_history]
+
+    points = {short: long_df[target].to_numpy() for short, target in POINTS_LAGS.items()}
+    for k, source in enumerate(sources, 1):
+        for short, values in points.items():
+            columns[f"fantasy_{short}_prev_{k}"] = values[source]
+
+    for feature in features:
+        values = long_df[feature].to_numpy()
+        for k, source in enumerate(sources, 1):
+            columns[f"{feature}_prev_{k}"] = values[source]
+
+    for target in TARGETS:
+        columns[target] = long_df[target].to_numpy()[has_history]
+
+    return pd.DataFrame(columns)
+
+
+def add_aggregate_features(features_df, aggregate_data, agg_cols=AGG_COLS):
+    """
+    Joins the per-player career aggregates onto feature rows that have a 'player' column.
+
+    Args:
+        features_df (pd.DataFrame): Feature rows, e.g. build_lag_features(..., keep_ids=True)
+        aggregate_data (dict): Per-player aggregate table
+        agg_cols (list): Aggregate stats to use as features
+
+    Returns:
+        pd.DataFrame: `features_df` with the aggregate columns appended
+    """
+    players = pd.unique(features_df["player"])
+    aggregate_df = pd.DataFrame.from_dict(
+        {player: aggregate_data.get(player, {}) for player in players}, orient="index"
+    )
+    aggregate_df = aggregate_df[[column for column in aggregate_df.columns if column in agg_cols]]
+    joined = aggregate_df.reindex(features_df["player"].to_numpy())
+    joined.index = features_df.index
+    return pd.concat([features_df, joined], axis=1)
+
+
+def _as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def latest_lag_features(histories, features=PAST_FEATURES, num_prev_matches=NUM_PREV_MATCHES):
+    """
+    Builds the lag columns for each player's next, not yet played, match.
+
+    Same values build_lag_features would give a row appended after the history: `*_prev_k`
+    is the k-th most recent match, and the oldest match is repeated when there are fewer
+    than k. Used at serving time, where only the latest row per player is needed.
+
+    Args:
+        histories (list): Per player, the list of match stats dicts sorted oldest first
+        features (list): Match-level stats to lag
+        num_prev_matches (int): Number of lags per stat
+
+    Returns:
+        np.ndarray: (len(histories), n_lag_columns) in build_lag_features column order;
+        all NaN for players without history
+    """
+    stats = list(POINTS_LAGS.values()) + list(features)
+    values = np.full((len(histories), num_prev_matches, len(stats)), np.nan)
+    for i, history in enumerate(histories):
+        if not history:
+            continue
+        rows = {}
+        for k in range(1, num_prev_matches + 1):
+            position = max(len(history) - k, 0)
+            if position not in rows:
+                record = history[position]
+                rows[position] = [_as_float(record.get(stat, 0)) for stat in stats]
+            values[i, k - 1] = rows[position]
+
+    n_points = len(POINTS_LAGS)
+    points_lags = values[:, :, :n_points].reshape(len(histories), -1)
+    feature_lags = values[:, :, n_points:].transpose(0, 2, 1).reshape(len(histories), -1)
+    return np.concatenate([points_lags, feature_lags], axis=1)
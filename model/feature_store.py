@@ -0,0 +1,372 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from fantasy_data import match_date
+from feature_builder import (
+    PAST_FEATURES, AGG_COLS, NUM_PREV_MATCHES, TARGETS,
+    matches_to_long_frame, build_lag_features, add_aggregate_features, latest_lag_features,
+)
+from training_data import (
+    SHARD_DTYPE, feature_schema, categorical_vocabulary, encode_features, iter_feature_chunks,
+    write_shard, load_manifest, _shard_path,
+)
+
+# Persistent per-(player, match) feature store, shared by training and serving.
+#
+# The store directory is a shard directory (see training_data.py), so training reads it
+# with load_feature_frame / ShardDataIter / run_walk_forward like any other. Updates
+# append a new shard holding only the rows that changed: the new matches of a player and
+# any later matches whose lags they shift. Rows replaced by a later shard are masked out
+# with a live_<shard>.npy file, so every (player, match) is read once.
+#
+# For serving, next_X.npy holds one row per player with the lag features of the player's
+# next, not yet played, match. Together with the stored match rows this answers "features
+# of this player's next match as of a date" with a lookup.
+
+FEATURE_STORE_DIRS = {
+    "T20": "../data/features/store/T20",
+    "ODI": "../data/features/store/ODI",
+    "Test": "../data/features/store/Test",
+}
+
+
+class FeatureStore:
+    """
+    Memory-mapped view of a feature store directory.
+
+    Args:
+        store_dir (str): Directory created by FeatureStore.build
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self.manifest = load_manifest(store_dir)
+        self.feature_names = self.manifest["feature_names"]
+        self.categories = self.manifest["categories"]
+        self._open()
+
+    def _open(self):
+        """
+        Memory-maps the shards and indexes the live row of every (player, match).
+
+        The live rows of all shards are sorted by (player, date) once with array ops, and
+        per-player offsets into that order (CSR style) locate a player's stored matches.
+        """
+        self._X = {}
+        shard_names = [shard["name"] for shard in self.manifest["shards"]]
+        players, matches, dates, shard_codes, rows = [], [], [], [], []
+        for code, shard in enumerate(self.manifest["shards"]):
+            name = shard["name"]
+            self._X[name] = np.load(_shard_path(self.store_dir, "X", name), mmap_mode="r")
+            shard_rows = np.arange(shard["rows"])
+            if shard.get("live"):
+                # Rows replaced by a later shard are not indexed
+                shard_rows = shard_rows[np.load(_shard_path(self.store_dir, "live", name))]
+            players.append(np.load(_shard_path(self.store_dir, "players", name))[shard_rows])
+            matches.append(np.load(_shard_path(self.store_dir, "matches", name))[shard_rows])
+            dates.append(np.load(_shard_path(self.store_dir, "dates", name))[shard_rows])
+            shard_codes.append(np.full(len(shard_rows), code))
+            rows.append(shard_rows)
+
+        def concat(blocks, dtype):
+            return np.concatenate(blocks) if blocks else np.empty(0, dtype=dtype)
+
+        players, matches = concat(players, str), concat(matches, str)
+        dates = concat(dates, "datetime64[D]")
+        order = np.lexsort((dates, players))
+        self._players, starts = np.unique(players[order], return_index=True)
+        self._offsets = np.append(starts, len(order))
+        self._matches = matches[order]
+        self._dates = dates[order]
+        self._shard_names = shard_names
+        self._shard_codes = concat(shard_codes, np.int64)[order]
+        self._rows = concat(rows, np.int64)[order]
+
+        next_players = np.load(os.path.join(self.store_dir, "next_players.npy"))
+        self._next_X = np.load(os.path.join(self.store_dir, "next_X.npy"), mmap_mode="r")
+        self._next_row = {str(player): row for row, player in enumerate(next_players)}
+        self._first_matches = np.load(os.path.join(self.store_dir, "next_first_matches.npy")).astype(str)
+        self._first_dates = np.load(os.path.join(self.store_dir, "next_first_dates.npy")).astype(str)
+        self._last_dates = np.load(os.path.join(self.store_dir, "next_last_dates.npy")).astype(str)
+
+    def _player_span(self, player):
+        """(start, end) of a player's stored matches in the (player, date) order; empty if none."""
+        i = np.searchsorted(self._players, player)
+        if i == len(self._players) or self._players[i] != player:
+            return 0, 0
+        return self._offsets[i], self._offsets[i + 1]
+
+    def _locate(self, player, match_id):
+        """(shard name, row) of a stored player-match, or None."""
+        start, end = self._player_span(player)
+        found = np.flatnonzero(self._matches[start:end] == match_id)
+        if not len(found):
+            return None
+        position = start + found[-1]
+        return self._shard_names[self._shard_codes[position]], self._rows[position]
+
+    def __contains__(self, key):
+        return self._locate(*key) is not None
+
+    def __len__(self):
+        return len(self._matches)
+
+    def __iter__(self):
+        """Yields the stored (player, match_id) pairs, by player then date."""
+        for i, player in enumerate(self._players):
+            for match_id in self._matches[self._offsets[i]:self._offsets[i + 1]]:
+                yield str(player), str(match_id)
+
+    def get(self, player, match_id):
+        """
+        Returns the stored feature vector of a player-match.
+
+        Args:
+            player (str): Player name
+            match_id (str): Match identifier
+
+        Returns:
+            np.ndarray: Feature vector, or None if the pair is not stored (e.g. the
+            player's first match, which has no history)
+        """
+        location = self._locate(player, match_id)
+        if location is None:
+            return None
+        name, row = location
+        return np.asarray(self._X[name][row])
+
+    def next_match_features(self, players, date_of_match=None):
+        """
+        Returns the features of each player's next match as of a date.
+
+        Args:
+            players (list): Player names
+            date_of_match (str): Only matches before this date (YYYY-MM-DD) count as
+                history (defaults to all stored matches)
+
+        Returns:
+            tuple: (np.ndarray of shape (len(players), n_features) with NaN rows for
+            players without history, boolean mask of players with history)
+        """
+        X = np.full((len(players), len(self.feature_names)), np.nan, dtype=SHARD_DTYPE)
+        has_history = np.zeros(len(players), dtype=bool)
+        for i, player in enumerate(players):
+            next_row = self._next_row.get(player)
+            if next_row is None:
+                continue
+            if date_of_match is None or self._last_dates[next_row] < date_of_match:
+                X[i] = self._next_X[next_row]
+                has_history[i] = True
+                continue
+            if self._first_dates[next_row] >= date_of_match:
+                continue
+            # The first stored match on or after the date has exactly the earlier matches as lags
+            start, end = self._player_span(player)
+            position = start + np.searchsorted(self._dates[start:end], np.datetime64(date_of_match))
+            X[i] = self._X[self._shard_names[self._shard_codes[position]]][self._rows[position]]
+            has_history[i] = True
+        return X, has_history
+
+    @classmethod
+    def build(cls, store_dir, player_data, aggregate_data, format_name=None, players_per_chunk=500,
+              features=PAST_FEATURES, num_prev_matches=NUM_PREV_MATCHES, agg_cols=AGG_COLS):
+        """
+        Builds a store from scratch, one chunk of players at a time.
+
+        Args:
+            store_dir (str): Output directory (an existing store there is replaced)
+            player_data (dict): Processed fantasy points data
+            aggregate_data (dict): Per-player aggregate table
+            format_name (str): Format recorded in the manifest
+            players_per_chunk (int): Players per shard
+            features (list): Match-level stats to lag
+            num_prev_matches (int): Number of lags per stat
+            agg_cols (list): Aggregate stats used as features
+
+        Returns:
+            FeatureStore: The new store
+        """
+        os.makedirs(store_dir, exist_ok=True)
+        manifest_path = os.path.join(store_dir, "manifest.json")
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        manifest = {
+            "format": format_name,
+            "feature_names": feature_schema(features, num_prev_matches, agg_cols),
+            "target_names": list(TARGETS),
+            "categories": categorical_vocabulary(aggregate_data, agg_cols),
+            "dtype": np.dtype(SHARD_DTYPE).name,
+            "features": list(features),
+            "num_prev_matches": num_prev_matches,
+            "agg_cols": list(agg_cols),
+            "shards": [],
+        }
+        chunks = iter_feature_chunks(player_data, aggregate_data, players_per_chunk,
+                                     features, num_prev_matches, agg_cols)
+        for i, chunk in enumerate(chunks):
+            manifest["shards"].append(write_shard(
+                store_dir, f"{i:05d}", chunk, manifest["feature_names"], manifest["categories"]
+            ))
+        _write_next_rows(store_dir, manifest, player_data, aggregate_data, list(player_data), {})
+        _write_manifest(store_dir, manifest)
+        return cls(store_dir)
+
+    def update(self, player_data, aggregate_data):
+        """
+        Adds the matches in player_data that are not in the store yet.
+
+        Only players with new matches are recomputed, and only their rows from the
+        earliest new match onwards are written. Changes to the aggregate table itself are
+        not detected; rebuild the store after re-running the aggregate stats.
+
+        Args:
+            player_data (dict): Processed fantasy points data (full or a superset of the
+                players' histories; a player's history must be complete)
+            aggregate_data (dict): Per-player aggregate table
+
+        Returns:
+            int: Number of rows written
+        """
+        manifest = self.manifest
+        # player -> date of the earliest match the store has not seen; a player's first
+        # match has no stored row, so it is recognized through the next-match rows
+        changed = {}
+        for player, matches in player_data.items():
+            next_row = self._next_row.get(player)
+            first_match = self._first_matches[next_row] if next_row is not None else None
+            start, end = self._player_span(player)
+            stored = set(self._matches[start:end].tolist())
+            new_dates = [
+                match_date(match_id) for match_id in matches
+                if match_id != first_match and match_id not in stored
+            ]
+            if new_dates:
+                changed[player] = min(new_dates)
+        if not changed:
+            return 0
+
+        changed_data = {player: player_data[player] for player in changed}
+        long_df = matches_to_long_frame(changed_data, manifest["features"])
+        rows = build_lag_features(long_df, manifest["features"], manifest["num_prev_matches"], keep_ids=True)
+        cutoffs = pd.to_datetime(rows["player"].map(changed), format="%Y-%m-%d")
+        is_new = [(player, match_id) not in self
+                  for player, match_id in zip(rows["player"], rows["match_id"])]
+        rows = rows[(rows["date"] >= cutoffs).to_numpy() | np.array(is_new, dtype=bool)]
+        rows = add_aggregate_features(rows.reset_index(drop=True), aggregate_data, manifest["agg_cols"])
+
+        written = 0
+        if len(rows):
+            name = f"{len(manifest['shards']):05d}"
+            replaced = {}
+            for player, match_id in zip(rows["player"], rows["match_id"]):
+                location = self._locate(player, match_id)
+                if location is not None:
+                    replaced.setdefault(location[0], []).append(location[1])
+            for shard in manifest["shards"]:
+                if shard["name"] in replaced:
+                    live_path = _shard_path(self.store_dir, "live", shard["name"])
+                    live = np.load(live_path) if shard.get("live") else np.ones(shard["rows"], dtype=bool)
+                    live[replaced[shard["name"]]] = False
+                    np.save(live_path, live)
+                    shard["live"] = True
+            manifest["shards"].append(write_shard(
+                self.store_dir, name, rows, manifest["feature_names"], manifest["categories"]
+            ))
+            written = len(rows)
+
+        _write_next_rows(self.store_dir, manifest, player_data, aggregate_data, list(changed), self._next_rows())
+        _write_manifest(self.store_dir, manifest)
+        self._open()
+        return written
+
+    def _next_rows(self):
+        """Current next-match rows as {player: (features, first match, first date, last date)}."""
+        return {
+            player: (np.asarray(self._next_X[row]), self._first_matches[row],
+                     self._first_dates[row], self._last_dates[row])
+            for player, row in self._next_row.items()
+        }
+
+
+def _write_next_rows(store_dir, manifest, player_data, aggregate_data, players, next_rows):
+    """Recomputes the next-match rows of `players` and rewrites the next_* arrays."""
+    next_rows = dict(next_rows)
+    histories, firsts, kept = [], [], []
+    for player in players:
+        matches = player_data.get(player) or {}
+        dated = sorted(
+            ((match_date(match_id), match_id, stats) for match_id, stats in matches.items()),
+            key=lambda item: item[0]
+        )
+        if not dated:
+            continue
+        histories.append([stats for _, _, stats in dated[-manifest["num_prev_matches"]:]])
+        firsts.append((dated[0][1], dated[0][0], dated[-1][0]))
+        kept.append(player)
+
+    if kept:
+        lags = latest_lag_features(histories, manifest["features"], manifest["num_prev_matches"])
+        frame = pd.DataFrame(lags, columns=manifest["feature_names"][:lags.shape[1]])
+        frame["player"] = kept
+        frame = add_aggregate_features(frame, aggregate_data, manifest["agg_cols"])
+        X = encode_features(frame, manifest["feature_names"], manifest["categories"])
+        for i, player in enumerate(kept):
+            next_rows[player] = (X[i], *firsts[i])
+
+    players = list(next_rows)
+    X = np.stack([next_rows[player][0] for player in players]) if players else \
+        np.empty((0, len(manifest["feature_names"])), dtype=SHARD_DTYPE)
+    np.save(os.path.join(store_dir, "next_X.npy"), X.astype(SHARD_DTYPE))
+    np.save(os.path.join(store_dir, "next_players.npy"), np.array(players, dtype=str))
+    for i, name in enumerate(("first_matches", "first_dates", "last_dates"), 1):
+        np.save(os.path.join(store_dir, f"next_{name}.npy"),
+                np.array([next_rows[player][i] for player in players], dtype=str))
+
+
+def _write_manifest(store_dir, manifest):
+    manifest["num_rows"] = sum(shard["rows"] for shard in manifest["shards"])
+    tmp_path = os.path.join(store_dir, "manifest.json.tmp")
+    with open(tmp_path, "w") as file:
+        json.dump(manifest, file, indent=4)
+    os.replace(tmp_path, os.path.join(store_dir, "manifest.json"))
+
+
+def open_or_build_store(store_dir, player_data, aggregate_data, format_name=None, players_per_chunk=500):
+    """
+    Opens the store in store_dir and adds any new matches, or builds it if there is none.
+
+    Args:
+        store_dir (str): Store directory
+        player_data (dict): Processed fantasy points data
+        aggregate_data (dict): Per-player aggregate table
+        format_name (str): Format recorded in the manifest
+        players_per_chunk (int): Players per shard for a full build
+
+    Returns:
+        FeatureStore: Up-to-date store
+    """
+    if os.path.exists(os.path.join(store_dir, "manifest.json")):
+        store = FeatureStore(store_dir)
+        written = store.update(player_data, aggregate_data)
+        print(f"Feature store {store_dir}: {written} rows updated")
+        return store
+    store = FeatureStore.build(store_dir, player_data, aggregate_data, format_name, players_per_chunk)
+    print(f"Feature store {store_dir}: built with {len(store)} rows")
+    return store
+
+
+def update_all_formats(players_per_chunk=500):
+    """Opens or builds the feature store of every format from its processed fantasy points."""
+    from fantasy_data import AGGREGATE_STATS_PATHS, load_aggregate_stats, load_fantasy_points_store
+    from fantasy_dataset import FANTASY_POINTS_PATHS
+
+    for format_name, store_dir in FEATURE_STORE_DIRS.items():
+        player_data = load_fantasy_points_store(FANTASY_POINTS_PATHS[format_name])
+        aggregate_data = load_aggregate_stats(AGGREGATE_STATS_PATHS[format_name])
+        open_or_build_store(store_dir, player_data, aggregate_data, format_name, players_per_chunk)
+        del player_data, aggregate_data
+
+
+if __name__ == "__main__":
+    update_all_formats()
@@ -1,5 +1,6 @@
 import numpy as np
 import pandas as pd
+from fantasy_data import load_fantasy_points_store, with_aggregate_stats
 import json
 import re
 import datetime
@@ -9,7 +10,8 @@ from scipy.stats import entropy
 from typing import List, Dict, Tuple, Union
 from utils import get_past_match_performance
 
-def load_player_fantasy_points_for_optimization(json_file: str) -> Dict:
+def load_player_fantasy_points_for_optimization(json_file: str,
+                                                with_aggregates: Union[bool, str] = False) -> Dict:
     """
     Loads and sorts player fantasy points data chronologically.
     
@@ -17,28 +19,31 @@ def load_player_fantasy_points_for_optimization(json_file: str) -> Dict:
     1. Reads JSON file containing player match data
     2. For each player's matches, extracts dates using regex
     3. Sorts matches chronologically using datetime parsing
-    4. Returns reconstructed dictionary with sorted matches
+    4. Optionally joins the per-player aggregate table lazily onto each match record
+    5. Returns reconstructed dictionary with sorted matches
     
     Args:
         json_file (str): Path to JSON file with player fantasy points
+        with_aggregates (bool or str, optional): Join the aggregate table of the file's
+            format (True) or the table at the given path
     
     Returns:
         Dict: Player data with chronologically sorted matches
     """
-    with open(json_file, "r") as file:
-        data = json.load(file)
-        sorted_data = {}
-        for player, matches in data.items():
-            match_list = list(matches.items())
-            match_list_sorted = sorted(
-                match_list,
-                key=lambda x: datetime.datetime.strptime(
-                    re.search(r'(\d{4}-\d{2}-\d{2})', x[0]).group(1),
-                    '%Y-%m-%d'
-                ) if re.search(r'(\d{4}-\d{2}-\d{2})', x[0]) else datetime.datetime.min
-            )
-            sorted_data[player] = dict(match_list_sorted)
-        return sorted_data
+    # Store plus the records appended by incremental refreshes
+    data = load_fantasy_points_store(json_file)
+    sorted_data = {}
+    for player, matches in data.items():
+        match_list = list(matches.items())
+        match_list_sorted = sorted(
+            match_list,
+            key=lambda x: datetime.datetime.strptime(
+                re.search(r'(\d{4}-\d{2}-\d{2})', x[0]).group(1),
+                '%Y-%m-%d'
+            ) if re.search(r'(\d{4}-\d{2}-\d{2})', x[0]) else datetime.datetime.min
+        )
+        sorted_data[player] = dict(match_list_sorted)
+    return with_aggregate_stats(sorted_data, json_file, with_aggregates)
 
 def compute_player_stats(fantasy_points: Dict, players: List[str], 
                         num_matches: int = 65, date_of_match: str = None, 
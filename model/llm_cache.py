@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Content-addressed memo of LLM outputs. The player and team prompts are deterministic
+# renderings of aggregate stats, selection status and format, so an output is identified
+# by a hash of the rendered prompt and the model that answered it. Outputs are kept in an
+# in-memory LRU in front of a directory of JSON files shared by every process on the
+# machine; entries expire after TTL seconds and the directory is capped at MAX_ENTRIES
+# files (the oldest go first).
+
+LLM_CACHE_DIR = "../data/llm_cache"
+# Outputs kept in memory per process
+MEMORY_ENTRIES = 512
+# Seconds an output stays valid (aggregate stats change when the data is reprocessed)
+TTL = 7 * 24 * 3600
+# Files kept on disk
+MAX_ENTRIES = 20000
+
+
+def prompt_key(prompt, model_id):
+    """
+    Hash identifying the output of a prompt on a model.
+
+    Args:
+        prompt (str): Rendered prompt
+        model_id (str): Identifier of the model answering it
+
+    Returns:
+        str: Hex digest
+    """
+    return hashlib.sha256(f"{model_id}\0{prompt}".encode()).hexdigest()
+
+
+class LLMCache:
+    """
+    LLM outputs by prompt_key, in memory and on disk.
+
+    Args:
+        cache_dir (str): Directory shared by every process using the cache
+        memory_entries (int): Outputs kept in this process's LRU
+        ttl (float): Seconds an output stays valid
+        max_entries (int): Files kept on disk
+    """
+
+    def __init__(self, cache_dir=LLM_CACHE_DIR, memory_entries=MEMORY_ENTRIES, ttl=TTL, max_entries=MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.memory_entries = memory_entries
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        # Files on disk, counted on the first put
+        self._disk_entries = None
+        self.hits = self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _remember(self, key, created, output):
+        self._memory[key] = (created, output)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """
+        Cached output of a prompt.
+
+        Args:
+            key (str): prompt_key of the prompt
+
+        Returns:
+            str: The output, or None if not cached or expired
+        """
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                if now - cached[0] < self.ttl:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return cached[1]
+                del self._memory[key]
+        try:
+            with open(self._path(key), "r") as file:
+                cached = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            cached = None
+        with self._lock:
+            if cached is None or now - cached["created"] >= self.ttl:
+                self.misses += 1
+                return None
+            self._remember(key, cached["created"], cached["output"])
+            self.hits += 1
+        return cached["output"]
+
+    def put(self, key, output, model_id=None):
+        """
+        Stores the output of a prompt.
+
+        Args:
+            key (str): prompt_key of the prompt
+            output (str): The model's output
+            model_id (str): Model that produced it (kept in the file for inspection)
+        """
+        created = time.time()
+        with self._lock:
+            self._remember(key, created, output)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        is_new = not os.path.exists(path)
+        # Unique tmp name, several processes may write the same key at once
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"created": created, "model_id": model_id, "output": output}, file)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._disk_entries is None:
+                self._disk_entries = len(self._files())
+            elif is_new:
+                self._disk_entries += 1
+            over_cap = self._disk_entries > self.max_entries
+        if over_cap:
+            self.prune()
+
+    def _files(self):
+        if not os.path.isdir(self.cache_dir):
+            return []
+        return [
+            entry.path
+            for shard in os.scandir(self.cache_dir) if shard.is_dir()
+            for entry in os.scandir(shard.path) if entry.name.endswith(".json")
+        ]
+
+    def prune(self):
+        """Deletes expired files, then the oldest ones until the directory is 10% under the cap."""
+        now = time.time()
+        files = []
+        for path in self._files():
+            try:
+                files.append((os.stat(path).st_mtime, path))
+            except FileNotFoundError:
+                continue
+        files.sort()
+        expired = [path for mtime, path in files if now - mtime >= self.ttl]
+        kept = len(files) - len(expired)
+        excess = kept - int(self.max_entries * 0.9) if kept > self.max_entries else 0
+        for path in expired + [path for _, path in files[len(expired):len(expired) + excess]]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._disk_entries = kept - excess
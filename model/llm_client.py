@@ -0,0 +1,152 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from llm_cache import LLMCache, prompt_key
+
+# Shared client of the LLM service used for the player and team analyses. One
+# requests.Session keeps connections alive across calls, every call has connect/read
+# timeouts, and connection errors, timeouts, 429s and 5xx responses are retried with
+# exponential backoff. complete_many() fans a list of prompts out over threads, at most
+# max_concurrency at a time. The endpoint comes from the LLM_URL environment variable,
+# so it can be pointed at a local stand-in server. With an LLMCache, outputs are looked
+# up by prompt and model before any request is made.
+
+LLM_URL = os.getenv("LLM_URL", "https://8001-01jdya9bpnhj5dqyfzh17zdghv.cloudspaces.litng.ai/predict")
+# Identifies the model in cache keys; the service doesn't report it, so set LLM_MODEL_ID
+# when the deployed model changes behind the same endpoint
+MODEL_ID = os.getenv("LLM_MODEL_ID", LLM_URL)
+# Seconds to connect / to wait for the generated text
+CONNECT_TIMEOUT = 5.0
+READ_TIMEOUT = 120.0
+# Retries after the first attempt, and the base of the exponential backoff in seconds
+MAX_RETRIES = 3
+BACKOFF = 0.5
+# Prompts in flight at once in complete_many
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class LLMError(requests.exceptions.RequestException):
+    """Raised when the LLM service can't produce an answer after all retries."""
+
+
+class LLMClient:
+    """
+    Pooled, retrying client of the LLM service.
+
+    Args:
+        url (str): Endpoint taking {"input": prompt} and answering {"output": text}
+        connect_timeout (float): Seconds to establish a connection
+        read_timeout (float): Seconds to wait for the answer
+        max_retries (int): Retries after the first attempt
+        backoff (float): First retry delay in seconds, doubled on every retry
+        max_concurrency (int): Default limit of concurrent prompts in complete_many
+        model_id (str): Identifier of the model, part of the cache keys
+        cache (LLMCache): Outputs consulted before and filled after each request
+    """
+
+    def __init__(self, url=LLM_URL, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 max_retries=MAX_RETRIES, backoff=BACKOFF, max_concurrency=MAX_CONCURRENCY,
+                 model_id=MODEL_ID, cache=None):
+        self.url = url
+        self.model_id = model_id
+        self.cache = cache
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_concurrency = max_concurrency
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+        # Enough pooled connections for a full fan-out
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(10, max_concurrency))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def complete(self, prompt):
+        """
+        Sends one prompt.
+
+        Args:
+            prompt (str): Prompt text
+
+        Returns:
+            str: The model's output
+
+        Raises:
+            LLMError: If every attempt failed
+        """
+        key = None
+        if self.cache is not None:
+            key = prompt_key(prompt, self.model_id)
+            output = self.cache.get(key)
+            if output is not None:
+                return output
+        output = self._request(prompt)
+        if key is not None:
+            self.cache.put(key, output, self.model_id)
+        return output
+
+    def _request(self, prompt):
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                # Exponential backoff with jitter, so concurrent retries don't line up
+                time.sleep(self.backoff * 2 ** (attempt - 1) * (0.5 + random.random() / 2))
+            try:
+                response = self.session.post(self.url, json={"input": prompt}, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = e
+                continue
+            if response.status_code in RETRY_STATUSES:
+                error = requests.exceptions.HTTPError(f"{response.status_code} from {self.url}", response=response)
+                continue
+            try:
+                response.raise_for_status()
+                return response.json()["output"]
+            except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+                raise LLMError(f"Invalid LLM response: {e}") from e
+        raise LLMError(f"LLM request failed after {self.max_retries + 1} attempts: {error}") from error
+
+    def complete_many(self, prompts, max_concurrency=None):
+        """
+        Sends prompts concurrently.
+
+        Args:
+            prompts (list): Prompt texts
+            max_concurrency (int): Prompts in flight at once (defaults to the client's limit)
+
+        Returns:
+            list: Output of each prompt in order, or the LLMError it failed with
+        """
+        prompts = list(prompts)
+        if not prompts:
+            return []
+        workers = min(len(prompts), max_concurrency or self.max_concurrency)
+
+        def complete_or_error(prompt):
+            try:
+                return self.complete(prompt)
+            except LLMError as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(complete_or_error, prompts))
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    """The process-wide LLMClient (with the on-disk LLMCache), created on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = LLMClient(cache=LLMCache())
+    return _client
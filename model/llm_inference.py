@@ -1,18 +1,34 @@
-import json
-import requests
 import pandas as pd
 
+from aggregate_stats_store import get_aggregate_stats_store
+from explanations import player_selection_prompt
+from llm_client import LLMError, get_llm_client
 from pipeline import calculate_optimal_team
 from utils import load_player_fantasy_points, calculate_team_metrics
 
 
 
+def load_format_aggregate_stats(format_lower='t20'):
+    """
+    Loads the aggregate stats table of a format, the same one the aggregate stats API serves.
+
+    Args:
+        format_lower (str): Cricket format (t20, odi, test)
+
+    Returns:
+        dict: {player: aggregate stats}, or None if the format or its table doesn't exist
+    """
+    try:
+        return get_aggregate_stats_store().table(format_lower)
+    except (KeyError, FileNotFoundError):
+        return None
+
+
 def analyze_player_selection(selected_players, player_name, format_lower='t20'):
     """
     Analyzes why a player was selected or not selected for the optimal team using LLM.
     
     Args:
-        stats_df (pd.DataFrame): DataFrame containing player statistics
         selected_players (list): List of selected players for optimal team
         player_name (str): Name of the player to analyze
         format_lower (str): Cricket format (t20, odi, test)
@@ -20,67 +36,40 @@ def analyze_player_selection(selected_players, player_name, format_lower='t20'):
     Returns:
         str: LLM analysis of player selection
     """
-    # Load aggregate stats
-    try:
-        aggregate_stats_path = f"../data/aggregate_cricket_stats_{format_lower}.json"
-        with open(aggregate_stats_path, 'r') as f:
-            aggregate_stats = json.load(f)
-    except FileNotFoundError:
-        return f"Error: Could not load aggregate statistics for {format_lower} format"
-    
-    
+    return analyze_players(selected_players, [player_name], format_lower)[player_name]
 
-    player_aggregate_stats = aggregate_stats.get(player_name, {})
-    if not player_aggregate_stats:
-        return f"Error: No aggregate statistics found for {player_name}"
-    
-    # Prepare prompt for LLM
-    selection_status = "selected" if player_name in selected_players else "not selected"
-    
-    prompt = f"""
-Based on the following statistics, explain why {player_name} was {selection_status} for the optimal fantasy cricket team:
-
-Key Aggregate Statistics:
-Batting Statistics:
-- Batting Style: {player_aggregate_stats.get('Batting', 'N/A')}
-- Total Runs: {player_aggregate_stats.get('Runs', 'N/A')}
-- Batting Average: {player_aggregate_stats.get('Batting Avg', 'N/A')}
-- Strike Rate: {player_aggregate_stats.get('Batting S/R', 'N/A')}
-- Boundary Percentage: {player_aggregate_stats.get('Boundary %', 'N/A')}
-- Mean Score: {player_aggregate_stats.get('Mean Score', 'N/A')}
-- Dismissal Rate: {player_aggregate_stats.get('Dismissal Rate', 'N/A')}
-
-Bowling Statistics:
-- Bowling Style: {player_aggregate_stats.get('Bowling', 'N/A')}
-- Wickets: {player_aggregate_stats.get('Wickets', 'N/A')}
-- Economy Rate: {player_aggregate_stats.get('Economy Rate', 'N/A')}
-- Bowling Average: {player_aggregate_stats.get('Bowling Avg', 'N/A')}
-- Bowling Strike Rate: {player_aggregate_stats.get('Bowling S/R', 'N/A')}
-- Dot Ball Bowled %: {player_aggregate_stats.get('Dot Ball Bowled %', 'N/A')}
-- Boundary Given %: {player_aggregate_stats.get('Boundary Given %', 'N/A')}
-
-Fielding Statistics:
-- Catches: {player_aggregate_stats.get('Catches', 'N/A')}
-- Runouts: {player_aggregate_stats.get('Runouts', 'N/A')}
-- Stumpings: {player_aggregate_stats.get('Stumpings', 'N/A')}
-
-A negative value for an aggregate statistic means that value does not exist and is not be to considered in the analysis.
-
-Please provide a concise and brief analysis of why this player was {selection_status}, considering only their overall cricket statistics. Output the best statistics of the player. Be crisp.
-"""
-
-    # Send request to LLM
-    url = "https://8001-01jdya9bpnhj5dqyfzh17zdghv.cloudspaces.litng.ai/predict"
-    headers = {"Content-Type": "application/json"}
-    data = {"input": prompt}
 
-    try:
-        response = requests.post(url, json=data, headers=headers)
-        response.raise_for_status()
-        analysis = response.json()['output']
-        return analysis
-    except requests.exceptions.RequestException as e:
-        return f"Error querying LLM: {str(e)}"
+def analyze_players(selected_players, player_names, format_lower='t20', max_concurrency=None):
+    """
+    Analyzes the selection of several players (e.g. a whole squad) with concurrent LLM requests.
+
+    Args:
+        selected_players (list): List of selected players for optimal team
+        player_names (list): Names of the players to analyze
+        format_lower (str): Cricket format (t20, odi, test)
+        max_concurrency (int): LLM requests in flight at once (defaults to llm_client.MAX_CONCURRENCY)
+
+    Returns:
+        dict: {player: LLM analysis or error message}
+    """
+    aggregate_stats = load_format_aggregate_stats(format_lower)
+    if aggregate_stats is None:
+        return {player_name: f"Error: Could not load aggregate statistics for {format_lower} format"
+                for player_name in player_names}
+
+    analyses, prompts = {}, {}
+    for player_name in player_names:
+        player_aggregate_stats = aggregate_stats.get(player_name, {})
+        if not player_aggregate_stats:
+            analyses[player_name] = f"Error: No aggregate statistics found for {player_name}"
+            continue
+        selection_status = "selected" if player_name in selected_players else "not selected"
+        prompts[player_name] = player_selection_prompt(player_name, selection_status, player_aggregate_stats)
+
+    outputs = get_llm_client().complete_many(list(prompts.values()), max_concurrency)
+    for player_name, output in zip(prompts, outputs):
+        analyses[player_name] = f"Error querying LLM: {str(output)}" if isinstance(output, LLMError) else output
+    return {player_name: analyses[player_name] for player_name in player_names}
 
 
 
@@ -98,12 +87,8 @@ def analyze_team_selection(stats_df, selected_players, format_lower='t20'):
     Returns:
         str: Detailed analysis of the team selection
     """
-    try:
-        # Load aggregate stats
-        aggregate_stats_path = f"../data/aggregate_cricket_stats_{format_lower}.json"
-        with open(aggregate_stats_path, 'r') as f:
-            aggregate_stats = json.load(f)
-    except FileNotFoundError:
+    aggregate_stats = load_format_aggregate_stats(format_lower)
+    if aggregate_stats is None:
         return f"Error: Could not load aggregate statistics for {format_lower} format"
     
     # Prepare team composition analysis
@@ -181,16 +166,9 @@ def analyze_team_selection(stats_df, selected_players, format_lower='t20'):
         Make sure that you output for each player only his most dominant statistic. For example if batting statistics are better than the bowling statistics output only the batting statistics. Try to determine before whether a player is a batsman bowler or an all-rounder.
         """
 
-    url = "https://8001-01jdya9bpnhj5dqyfzh17zdghv.cloudspaces.litng.ai/predict"
-    headers = {"Content-Type": "application/json"}
-    data = {"input": prompt}
-
     try:
-        response = requests.post(url, json=data, headers=headers)
-        response.raise_for_status()
-        analysis = response.json()['output']
-        return analysis
-    except requests.exceptions.RequestException as e:
+        return get_llm_client().complete(prompt)
+    except LLMError as e:
         return f"Error querying LLM: {str(e)}"
 
 # Example usage:
@@ -240,14 +218,6 @@ def main():
         print("Failed to calculate optimal team")
         return
 
-    print("\nSelected Players:")
-    for player in selected_players:
-        print(f"\n{player}:")
-        # Analyze each selected player
-        analysis = analyze_player_selection( selected_players, player, format_lower='odi')
-        print(analysis)
-
-    print("\nNon-Selected Players Analysis:")
     # Get all players who weren't selected
     all_players = []
     for team_players in player_info.values():
@@ -257,12 +227,19 @@ def main():
                 all_players.append(player_name)
 
     non_selected = [p for p in all_players if p not in selected_players]
-    
+
+    # Analyze the whole squad at once
+    analyses = analyze_players(selected_players, list(selected_players) + non_selected, format_lower='odi')
+
+    print("\nSelected Players:")
+    for player in selected_players:
+        print(f"\n{player}:")
+        print(analyses[player])
+
+    print("\nNon-Selected Players Analysis:")
     for player in non_selected:
         print(f"\n{player}:")
-        # Analyze each non-selected player
-        analysis = analyze_player_selection(selected_players, player, format_lower='odi')
-        print(analysis)
+        print(analyses[player])
 
     team_analysis = analyze_team_selection(stats_df, selected_players, format_lower='odi')
     print(team_analysis)
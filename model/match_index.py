@@ -0,0 +1,241 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+
+def _iter_player_matches(fantasy_points: Dict):
+    """
+    Yields (player, match_key, match_info) from either loader layout.
+
+    `load_player_fantasy_points_for_optimization` returns {player: {match: info}}
+    while `utils.load_player_fantasy_points` returns {player: [(match, info), ...]}.
+    """
+    for player, matches in fantasy_points.items():
+        items = matches.items() if isinstance(matches, dict) else matches
+        for match_key, match_info in items:
+            yield player, match_key, match_info
+
+
+class MatchPointsIndex:
+    """
+    Inverted index from match key to the players who played it and their points.
+
+    Entries are stored CSR style: the players and points of the match in row `r`
+    are `players[offsets[r]:offsets[r + 1]]` and `points[offsets[r]:offsets[r + 1]]`.
+    Lookups of a single (match, player) pair are O(1) and whole-dataset scoring
+    (actual score, hindsight top-k, performance ratio) is done with array ops.
+    """
+
+    def __init__(self, match_ids: np.ndarray, offsets: np.ndarray,
+                 players: np.ndarray, points: np.ndarray):
+        self.match_ids = match_ids
+        self.offsets = offsets
+        self.players = players
+        self.points = points
+        self._row = {match_id: r for r, match_id in enumerate(match_ids)}
+        # Trailing 0 so that a missing entry (position -1) scores 0 points
+        self._points_or_zero = np.append(points, 0.0)
+        self._entry_rows = np.repeat(np.arange(len(match_ids)), np.diff(offsets))
+        self._entry = {
+            (match_ids[r], player): j
+            for j, (r, player) in enumerate(zip(self._entry_rows, players))
+        }
+        self._top_k_cache = {}
+
+    def __len__(self) -> int:
+        return len(self.match_ids)
+
+    def __contains__(self, match_key: str) -> bool:
+        return match_key in self._row
+
+    def match_entries(self, match_key: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the players recorded for a match and their points.
+
+        Args:
+            match_key (str): Match identifier
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Player names and points (empty if unknown)
+        """
+        r = self._row.get(match_key)
+        if r is None:
+            return np.array([], dtype=object), np.array([], dtype=float)
+        start, end = self.offsets[r], self.offsets[r + 1]
+        return self.players[start:end], self.points[start:end]
+
+    def lookup(self, match_key: str, players: Sequence[str]) -> np.ndarray:
+        """
+        Returns the points of the given players in a match, 0 for players who did not play.
+
+        Args:
+            match_key (str): Match identifier
+            players (Sequence[str]): Player names
+
+        Returns:
+            np.ndarray: Points aligned with `players`
+        """
+        positions = np.fromiter(
+            (self._entry.get((match_key, player), -1) for player in players),
+            dtype=np.int64, count=len(players)
+        )
+        return self._points_or_zero[positions]
+
+    def top_k(self, k: int = 11) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Materializes the hindsight-optimal k players of every match in one pass.
+
+        Players are ranked by points within each match; ties keep the order in which
+        players were indexed, like `DataFrame.nlargest(keep='first')`. The result is
+        cached on the index so repeated backtests reuse it.
+
+        Args:
+            k (int): Number of players per match
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (n_matches, k) arrays of player names and
+            points, padded with None / NaN for matches with fewer than k players
+        """
+        if k not in self._top_k_cache:
+            order = np.lexsort((-self.points, self._entry_rows))
+            rows = self._entry_rows[order]
+            rank = np.arange(len(order)) - self.offsets[rows]
+            keep = rank < k
+
+            top_players = np.full((len(self), k), None, dtype=object)
+            top_points = np.full((len(self), k), np.nan)
+            top_players[rows[keep], rank[keep]] = self.players[order[keep]]
+            top_points[rows[keep], rank[keep]] = self.points[order[keep]]
+            self._top_k_cache[k] = (top_players, top_points)
+        return self._top_k_cache[k]
+
+    def match_top_k(self, match_key: str, k: int = 11,
+                    candidates: Optional[Sequence[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Returns the hindsight-optimal k players of one match.
+
+        Without candidates the materialized top-k over every indexed player is used. With
+        candidates (e.g. the match squad) only they are ranked, players without a record
+        scoring 0 and ties keeping the candidates' order, like `DataFrame.nlargest`.
+
+        Args:
+            match_key (str): Match identifier
+            k (int): Number of players
+            candidates (Sequence[str], optional): Players eligible for the top-k
+
+        Returns:
+            List[Tuple[str, float]]: (player, points) pairs, best first
+        """
+        if candidates is not None:
+            candidates = list(candidates)
+            points = self.lookup(match_key, candidates)
+            order = np.argsort(-points, kind='stable')[:k]
+            return [(candidates[i], points[i]) for i in order]
+        r = self._row.get(match_key)
+        if r is None:
+            return []
+        top_players, top_points = self.top_k(k)
+        return [(player, points) for player, points in zip(top_players[r], top_points[r])
+                if player is not None]
+
+    def _positions(self, match_keys: List[str], players: Mapping[str, Sequence[str]]):
+        """Flattened entry positions of each match's players, and the match row of each."""
+        sizes = np.fromiter((len(players[m]) for m in match_keys),
+                            dtype=np.int64, count=len(match_keys))
+        rows = np.repeat(np.arange(len(match_keys)), sizes)
+        positions = np.fromiter(
+            (self._entry.get((match_key, player), -1)
+             for match_key in match_keys for player in players[match_key]),
+            dtype=np.int64, count=int(sizes.sum())
+        )
+        return rows, positions, sizes
+
+    def score_selections(self, selections: Mapping[str, Sequence[str]],
+                         k: int = 11,
+                         candidates: Optional[Mapping[str, Sequence[str]]] = None) -> pd.DataFrame:
+        """
+        Scores selected teams against what actually happened, for all matches at once.
+
+        Args:
+            selections (Mapping[str, Sequence[str]]): Match key -> selected players
+            k (int): Size of the hindsight-optimal team
+            candidates (Mapping[str, Sequence[str]], optional): Match key -> players
+                eligible for the hindsight-optimal team (see `match_top_k`); every
+                indexed player of the match when not given
+
+        Returns:
+            pd.DataFrame: Indexed by match key with 'actual_score', 'optimal_score'
+            and 'performance_ratio' columns
+        """
+        match_keys = list(selections.keys())
+        selection_rows, positions, _ = self._positions(match_keys, selections)
+        actual = np.bincount(selection_rows, weights=self._points_or_zero[positions],
+                             minlength=len(match_keys))
+
+        if candidates is None:
+            _, top_points = self.top_k(k)
+            rows = np.fromiter((self._row.get(m, -1) for m in match_keys),
+                               dtype=np.int64, count=len(match_keys))
+            optimal = np.where(rows >= 0, np.nansum(top_points, axis=1)[rows], 0.0)
+        else:
+            candidate_rows, positions, sizes = self._positions(match_keys, candidates)
+            candidate_points = self._points_or_zero[positions]
+            # Stable sort: ties keep the candidates' order within each match
+            order = np.lexsort((-candidate_points, candidate_rows))
+            starts = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+            rank = np.arange(len(order)) - starts[candidate_rows[order]]
+            keep = rank < k
+            optimal = np.bincount(candidate_rows[order][keep],
+                                  weights=candidate_points[order][keep],
+                                  minlength=len(match_keys))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(optimal > 0, actual / optimal, 0.0)
+
+        return pd.DataFrame({
+            'actual_score': actual,
+            'optimal_score': optimal,
+            'performance_ratio': ratio
+        }, index=pd.Index(match_keys, name='match_name'))
+
+
+def _from_entries(match_keys, players, points) -> MatchPointsIndex:
+    """Groups flat (match, player, points) entries into a CSR MatchPointsIndex."""
+    codes, match_ids = pd.factorize(pd.Series(match_keys, dtype=object))
+    order = np.argsort(codes, kind='stable')
+    counts = np.bincount(codes, minlength=len(match_ids))
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    return MatchPointsIndex(
+        match_ids=np.asarray(match_ids, dtype=object),
+        offsets=offsets,
+        players=np.asarray(players, dtype=object)[order],
+        points=np.asarray(points, dtype=float)[order]
+    )
+
+
+def build_match_index(*fantasy_points_sources: Dict,
+                      key: str = 'total_points') -> MatchPointsIndex:
+    """
+    Builds a MatchPointsIndex from one or more per-player fantasy points dicts.
+
+    Match keys carry their format suffix, so the T20, ODI and Test data can share
+    a single index.
+
+    Args:
+        *fantasy_points_sources (Dict): Fantasy points data as returned by the loaders
+        key (str): Key for points data in match info
+
+    Returns:
+        MatchPointsIndex: Index over every (match, player) entry
+    """
+    match_keys, players, points = [], [], []
+    for fantasy_points in fantasy_points_sources:
+        if not fantasy_points:
+            continue
+        for player, match_key, match_info in _iter_player_matches(fantasy_points):
+            match_keys.append(match_key)
+            players.append(player)
+            points.append(match_info.get(key, 0) or 0)
+
+    return _from_entries(match_keys, players, points)
@@ -0,0 +1,85 @@
+import json
+import re
+
+# Squads of scheduled matches, as optimization problems: each match becomes
+# (match name, format, date, player_info) with player_info = {team: [players]}.
+# datewise_squad.json is {date: {series: {match: {"Format": ..., team: [players],
+# "<team>_Second_Squad": [players]}}}}; combined_squad.json is {match_key: {team: [players]}}
+# with the date and format in the match key.
+
+DATEWISE_SQUADS_PATH = "../data/processed/datewise_squad.json"
+COMBINED_SQUADS_PATH = "../data/processed/combined_squad.json"
+
+# Match type suffix of a match key -> format of its fantasy points data
+FORMAT_SUFFIXES = {"T20": "T20", "ODI": "ODI", "ODM": "ODI", "Test": "Test", "MDM": "Test"}
+
+
+def load_squads(json_file):
+    with open(json_file, "r") as file:
+        return json.load(file)
+
+
+def match_format(match_key):
+    """Format of a match key such as 'A-B-2024-01-01-male-T20', or None if unknown."""
+    for suffix, format_name in FORMAT_SUFFIXES.items():
+        if match_key.endswith(suffix):
+            return format_name
+    return None
+
+
+def playing_squads(match_details):
+    """{team: [players]} of a datewise_squad.json match, without the format and second squads."""
+    return {
+        team: players for team, players in match_details.items()
+        if team != "Format" and "Second_Squad" not in team
+    }
+
+
+def matches_on_date(datewise_squads, date):
+    """
+    Optimization problems of every match on a date.
+
+    Args:
+        datewise_squads (dict): Contents of datewise_squad.json
+        date (str): YYYY-MM-DD
+
+    Returns:
+        list: Dicts with 'match', 'series', 'format', 'date' and 'player_info'
+    """
+    matches = []
+    for series, series_matches in (datewise_squads.get(date) or {}).items():
+        for match, match_details in series_matches.items():
+            matches.append({
+                "match": match,
+                "series": series,
+                "format": match_details.get("Format"),
+                "date": date,
+                "player_info": playing_squads(match_details),
+            })
+    return matches
+
+
+def matches_by_key(combined_squads, match_keys):
+    """
+    Optimization problems of the given combined_squad.json match keys.
+
+    Args:
+        combined_squads (dict): Contents of combined_squad.json
+        match_keys (list): Match keys; unknown keys get an 'error' instead of a squad
+
+    Returns:
+        list: Dicts with 'match', 'format', 'date' and 'player_info', or 'match' and 'error'
+    """
+    matches = []
+    for match_key in match_keys:
+        date = re.search(r'\d{4}-\d{2}-\d{2}', match_key)
+        if match_key not in combined_squads or date is None:
+            matches.append({"match": match_key, "error": "Match not found"})
+            continue
+        matches.append({
+            "match": match_key,
+            "format": match_format(match_key),
+            "date": date.group(),
+            "player_info": combined_squads[match_key],
+        })
+    return matches
@@ -0,0 +1,249 @@
+import datetime
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from fantasy_dataset import FANTASY_POINTS_PATHS, FantasyDataset
+from match_squads import (DATEWISE_SQUADS_PATH, COMBINED_SQUADS_PATH, load_squads,
+                          matches_on_date, matches_by_key)
+from solve_cache import problem_key, result_to_json, result_from_json
+from solver_pool import SOLVE_PARAMS, history_window, solve_best_team
+from pipeline import evaluate_team
+
+# Best teams of every scheduled match, computed ahead of time with the API's default
+# parameters. The job writes one JSON file per match and an index.json mapping each
+# problem key to its file and to a digest of its inputs (squad, date, parameters and the
+# players' history windows); a re-run only solves matches whose digest changed. model_API
+# serves a request whose problem key is in the index straight from the file, as long as
+# the index was built on the data version the API has loaded.
+
+MATERIALIZED_TEAMS_DIR = "../data/materialized_teams"
+
+
+def _input_digest(key, windows):
+    digest = hashlib.sha1(key.encode())
+    for name in sorted(windows):
+        payload = json.dumps([name, windows[name]], sort_keys=True, default=lambda value: dict(value))
+        digest.update(payload.encode())
+    return digest.hexdigest()
+
+
+def _write_json(payload, path):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(payload, file)
+    os.replace(tmp_path, path)
+
+
+def _load_index(artifact_dir):
+    try:
+        with open(os.path.join(artifact_dir, "index.json"), "r") as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"data_version": None, "matches": {}}
+
+
+def scheduled_matches(datewise_path=DATEWISE_SQUADS_PATH, combined_path=COMBINED_SQUADS_PATH, from_date=None):
+    """
+    Every match on or after from_date in the squad files.
+
+    Args:
+        datewise_path (str): datewise_squad.json
+        combined_path (str): combined_squad.json
+        from_date (str): First date (YYYY-MM-DD), defaults to today
+
+    Returns:
+        list: Matches as in match_squads.py
+    """
+    from_date = from_date or datetime.date.today().isoformat()
+    matches = []
+    if os.path.exists(datewise_path):
+        datewise_squads = load_squads(datewise_path)
+        for date in sorted(datewise_squads):
+            if date >= from_date:
+                matches.extend(matches_on_date(datewise_squads, date))
+    if os.path.exists(combined_path):
+        combined_squads = load_squads(combined_path)
+        matches.extend(
+            match for match in matches_by_key(combined_squads, list(combined_squads))
+            if "error" not in match and match["date"] >= from_date
+        )
+    return [match for match in matches if match["format"]]
+
+
+def materialize_teams(dataset, matches, artifact_dir=MATERIALIZED_TEAMS_DIR, workers=None, evaluate=evaluate_team):
+    """
+    Solves the scheduled matches whose inputs changed since the last run and rewrites the index.
+
+    Args:
+        dataset (FantasyDataset): Fantasy points data to solve on
+        matches (list): Matches as returned by scheduled_matches
+        artifact_dir (str): Output directory
+        workers (int): Worker processes (defaults to one per core)
+        evaluate (callable): Computes the stored metrics from (best_team, stats_df, cov_matrix)
+
+    Returns:
+        dict: Number of matches 'solved', 'unchanged' and 'failed'
+    """
+    os.makedirs(artifact_dir, exist_ok=True)
+    snapshot = dataset.snapshot()
+    params = {**SOLVE_PARAMS, "points_source": None}
+    previous = _load_index(artifact_dir)["matches"]
+
+    entries, to_solve, windows = {}, {}, {}
+    for match in matches:
+        fantasy_points = snapshot.get(match["format"])
+        if fantasy_points is None:
+            continue
+        key = problem_key(match["player_info"], match["date"], match["format"], params)
+        if key in entries or key in to_solve:
+            continue
+        shared = windows.setdefault((match["format"], match["date"]), {})
+        squad_windows = {}
+        for players in match["player_info"].values():
+            for player in players:
+                name = player.split(":")[0].strip()
+                if name not in shared:
+                    shared[name] = history_window(fantasy_points.get(name), match["date"])
+                squad_windows[name] = shared[name]
+        entry = {
+            **{field: match[field] for field in ("match", "series", "format", "date") if field in match},
+            "input_digest": _input_digest(key, squad_windows),
+            "file": f"{key}.json",
+        }
+        old = previous.get(key)
+        if old and old["input_digest"] == entry["input_digest"] \
+                and os.path.exists(os.path.join(artifact_dir, old["file"])):
+            entries[key] = entry
+        else:
+            to_solve[key] = (match, entry, squad_windows)
+
+    counts = {"solved": 0, "unchanged": len(entries), "failed": 0}
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        futures = {
+            pool.submit(
+                solve_best_team,
+                player_info=match["player_info"],
+                date_of_match=match["date"],
+                format_name=match["format"],
+                fantasy_points_data=squad_windows,
+                data_version=snapshot.version,
+                **params
+            ): key
+            for key, (match, _, squad_windows) in to_solve.items()
+        }
+        for future in as_completed(futures):
+            key = futures[future]
+            match, entry, _ = to_solve[key]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"error": str(e)}
+            if "error" in result or not result["best_team"]:
+                print(f"Could not materialize {match['match']}: {result.get('error', 'no team selected')}")
+                counts["failed"] += 1
+                continue
+            payload = result_to_json(result)
+            consistency, diversity, form = evaluate(result["best_team"], result["stats_df"], result["cov_matrix"])
+            payload["metrics"] = {
+                "team_consistency_score": consistency,
+                "team_diversity_score": diversity,
+                "form_score": form,
+            }
+            _write_json(payload, os.path.join(artifact_dir, entry["file"]))
+            entries[key] = entry
+            counts["solved"] += 1
+
+    # Unchanged entries were solved on identical inputs, so they hold for this version too
+    _write_json({
+        "data_version": snapshot.version,
+        "built_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "params": params,
+        "matches": entries,
+    }, os.path.join(artifact_dir, "index.json"))
+
+    # Matches that left the schedule
+    kept = {entry["file"] for entry in entries.values()} | {"index.json"}
+    for name in os.listdir(artifact_dir):
+        if name not in kept:
+            os.remove(os.path.join(artifact_dir, name))
+    return counts
+
+
+class MaterializedTeams:
+    """
+    Read side of the materialized teams, reloaded when the job rewrites the index.
+
+    Args:
+        artifact_dir (str): Directory written by materialize_teams
+    """
+
+    def __init__(self, artifact_dir=MATERIALIZED_TEAMS_DIR):
+        self.artifact_dir = artifact_dir
+        self._lock = threading.Lock()
+        self._index_mtime = None
+        self._index = {"data_version": None, "matches": {}}
+        self._payloads = {}
+        self.hits = 0
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(os.path.join(self.artifact_dir, "index.json")).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime != self._index_mtime:
+            with self._lock:
+                self._index = _load_index(self.artifact_dir)
+                self._index_mtime = mtime
+                self._payloads = {}
+
+    def get(self, data_version, key):
+        """
+        Materialized result of a problem, if it was built on data_version.
+
+        Returns:
+            dict: Like a solve result, plus 'metrics'; None if not materialized
+        """
+        self._refresh()
+        index = self._index
+        entry = index["matches"].get(key)
+        if entry is None or index["data_version"] != data_version:
+            return None
+        payload = self._payloads.get(key)
+        if payload is None:
+            try:
+                with open(os.path.join(self.artifact_dir, entry["file"]), "r") as file:
+                    payload = json.load(file)
+            except (FileNotFoundError, json.JSONDecodeError):
+                return None
+            self._payloads[key] = payload
+        self.hits += 1
+        result = result_from_json(payload)
+        result["data_version"] = data_version
+        result["metrics"] = payload.get("metrics")
+        return result
+
+    def teams(self):
+        """
+        Every materialized match of the current index.
+
+        Yields:
+            tuple: (index entry with 'match', 'format', 'date', ..., result as in get)
+        """
+        self._refresh()
+        index = self._index
+        for key, entry in index["matches"].items():
+            result = self.get(index["data_version"], key)
+            if result is not None:
+                yield entry, result
+
+
+if __name__ == "__main__":
+    # Meant to run on a schedule (e.g. cron) after the squad and fantasy points files update
+    from utils import load_player_fantasy_points
+    counts = materialize_teams(
+        FantasyDataset(load_player_fantasy_points, FANTASY_POINTS_PATHS, background=False),
+        scheduled_matches(),
+    )
+    print(f"Materialized teams: {counts}")
@@ -1,20 +1,108 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response, stream_with_context
 from flask_cors import CORS
 import json
+import os
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 import pandas as pd
-from pipeline import calculate_optimal_team, evaluate_team
+from pipeline import evaluate_team
 from utils import load_player_fantasy_points, calculate_team_metrics
+from points_inference import load_points_predictors
+from fantasy_dataset import FANTASY_POINTS_PATHS, FantasyDataset
+from optimization_sessions import SessionStore, encode_matrix
+from solver_pool import SOLVE_PARAMS, SolverPool, PoolSaturated, solve_best_team
+from solve_cache import SolveCache, problem_key
+from single_flight import SingleFlight
+from match_squads import DATEWISE_SQUADS_PATH, COMBINED_SQUADS_PATH, load_squads, matches_on_date, matches_by_key
+from batch_optimization import solve_batch
+from materialized_teams import MaterializedTeams
 
-# # Path to the JSON file
-T20_fantasy_points = "../data/processed/player_fantasy_points_t20.json"
-ODI_fantasy_points = "../data/processed/player_fantasy_points_odi.json"
-Test_fantasy_points = "../data/processed/player_fantasy_points_test.json"
+# Fantasy points of all formats, loaded once and reloaded when the files change on disk
+FANTASY_DATA = FantasyDataset(load_player_fantasy_points, FANTASY_POINTS_PATHS)
+
+# Trained points models, loaded once; used when a request asks for "points_source": "model"
+POINTS_PREDICTORS = load_points_predictors()
+
+# Optimization results kept server-side; evaluations and swaps reference them by id
+SESSIONS = SessionStore()
+
+# Solves run in worker processes forked after the data above is loaded
+SOLVER_POOL = SolverPool(FANTASY_DATA, POINTS_PREDICTORS)
+
+# Results of problems already solved on the current data, shared with other processes on disk
+SOLVE_CACHE = SolveCache()
+
+# Teams of scheduled matches precomputed by materialized_teams.py, served as they are
+MATERIALIZED_TEAMS = MaterializedTeams()
+
+# Identical requests arriving while one is being solved wait for its result
+SOLVES_IN_FLIGHT = SingleFlight()
+
+# {path: (mtime, squads)} of the squad files used by /generate_best_teams
+_squads_cache = {}
 
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "http://localhost:3000"}})
  
 
+def solve_or_load(player_info, date, format, params):
+    """Solution of a problem: materialized, from the solve cache, or solved on the worker pool and cached."""
+    key = problem_key(player_info, date, format, params)
+    data_version = FANTASY_DATA.snapshot().version
+    result = MATERIALIZED_TEAMS.get(data_version, key)
+    if result is not None:
+        return result
+
+    def solve():
+        result = SOLVE_CACHE.get(data_version, key)
+        if result is None:
+            result = SOLVER_POOL.run(
+                solve_best_team,
+                player_info=player_info,
+                date_of_match=date,
+                format_name=format,
+                **params
+            )
+            if 'error' not in result:
+                SOLVE_CACHE.put(key, result)
+        return result
+
+    result, _ = SOLVES_IN_FLIGHT.do((data_version, key), solve, timeout=SOLVER_POOL.timeout)
+    return result
+
+
+def load_squads_cached(path):
+    """Squads file contents, re-read only when the file changes."""
+    mtime = os.stat(path).st_mtime_ns
+    cached = _squads_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, load_squads(path))
+        _squads_cache[path] = cached
+    return cached[1]
+
+
+def team_response(result, format, date):
+    """Response body of a solved problem; its stats and covariance go into a new session."""
+    session_id = SESSIONS.create({
+        "stats_df": result['stats_df'],
+        "cov_matrix": result['cov_matrix'],
+        "format": format,
+        "date": date,
+        "data_version": result['data_version']
+    })
+    response = {"best_team": result['best_team'],
+                "session_id": session_id,
+                "player_stats": result['stats_df'].to_json(orient='records'),
+                # Only the selected team's block; the full matrix stays in the session
+                "cov_matrix": encode_matrix(result['cov_matrix'], result['best_team']),
+                "data_version": result['data_version']
+                }
+    if result.get('metrics'):
+        # Materialized teams come with their team_evaluation scores
+        response["team_evaluation"] = result['metrics']
+    return response
+
+
 @app.route('/generate_best_team', methods=['POST'])
 def generate_best_team():
     # Get the player name from the query string
@@ -31,62 +119,98 @@ def generate_best_team():
     
 
     if player_info and date and format:
-        fantasy_points_data = None
-        if format=="T20":
-            fantasy_points_data = load_player_fantasy_points(T20_fantasy_points)
-        elif format=="ODI":
-            fantasy_points_data = load_player_fantasy_points(ODI_fantasy_points)
-        elif format=="Test":
-            fantasy_points_data = load_player_fantasy_points(Test_fantasy_points)
-            
-            
-        selected_players, stats_df, cov_matrix = calculate_optimal_team(
-        player_info=player_info,
-        num_matches=65,
-        date_of_match= date,
-        risk_aversion=0.1,
-        solver='pulp',
-        fantasy_points_data=fantasy_points_data
-        )
-        # Check if the player exists in the data
-        player_stats_json = stats_df.to_json(orient='records')
-        cov_matrix_json = cov_matrix.to_json(orient='records')
-        
-        if selected_players:
-            return jsonify({"best_team": selected_players,
-                            "player_stats": player_stats_json,
-                            "cov_matrix": cov_matrix_json
-                            })
+        params = {**SOLVE_PARAMS, "points_source": data.get('points_source')}
+        try:
+            result = solve_or_load(player_info, date, format, params)
+        except PoolSaturated:
+            return jsonify({'error': 'Server is busy, please retry shortly'}), 503, {'Retry-After': '5'}
+        except FuturesTimeoutError:
+            return jsonify({'error': 'Team optimization timed out'}), 504
+        if 'error' in result:
+            return jsonify({'error': result['error']}), 400
+        if result['best_team']:
+            return jsonify(team_response(result, format, date))
         else:
-            return jsonify({"error": "Team is Not Selected Correctly"}), 404
+            return jsonify({"error": "Team is Not Selected Correctly", "data_version": result['data_version']}), 404
             
     else:
         return jsonify({"error": "Error in Player Info/Date/Foramt"}), 400
     
     
+@app.route('/generate_best_teams', methods=['POST'])
+def generate_best_teams():
+    # Best teams of every match on a date, or of a list of match keys, streamed as
+    # newline-delimited JSON in the order they are solved
+    data = request.get_json()
+    try:
+        if 'date' in data:
+            matches = matches_on_date(load_squads_cached(DATEWISE_SQUADS_PATH), data['date'])
+        elif 'match_keys' in data:
+            matches = matches_by_key(load_squads_cached(COMBINED_SQUADS_PATH), data['match_keys'])
+        else:
+            return jsonify({'error': 'Please Enter the Date in YYYY-MM-DD Format or a list of match_keys'}), 400
+    except FileNotFoundError:
+        return jsonify({'error': 'Squads Not Available'}), 404
+    if not matches:
+        return jsonify({'error': 'No Matches Available'}), 404
+
+    params = {**SOLVE_PARAMS, "points_source": data.get('points_source')}
+    snapshot = FANTASY_DATA.snapshot()
+    timeout = SOLVER_POOL.timeout * max(1, len(matches) / SOLVER_POOL.workers)
+
+    def generate():
+        for match, result in solve_batch(matches, SOLVER_POOL, snapshot, SOLVE_CACHE, params, timeout,
+                                        MATERIALIZED_TEAMS):
+            line = {key: match[key] for key in ("match", "series", "format", "date") if key in match}
+            if 'error' in result:
+                line["error"] = result['error']
+            elif not result['best_team']:
+                line["error"] = "Team is Not Selected Correctly"
+            else:
+                line.update(team_response(result, match['format'], match['date']))
+            yield json.dumps(line) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
 @app.route('/team_evaluation', methods=['POST'])
 def team_evaluation():
-    # Get the player name from the query string
+    # Evaluates a team (e.g. after a swap) against the squad of an optimization session
     data = request.get_json()
     if 'best_team' not in data:
         return jsonify({'error': 'Best Team not loaded correctly'}), 400
-    if 'player_stats' not in data:
-        return jsonify({'error': 'Player Stats not loaded correctly'}), 400
-    if 'cov_matrix' not in data:
-        return jsonify({'error': 'Player Covariance Matrix not loaded correctly'}), 400
     selected_players = data['best_team']
-    stats_df_json = data['player_stats']
-    cov_matrix_json = data['cov_matrix']
-    stats_df = pd.DataFrame(json.loads(stats_df_json))
-    cov_matrix = pd.DataFrame(json.loads(cov_matrix_json))
-    
-    if selected_players and stats_df_json and cov_matrix_json:
+
+    if 'session_id' in data:
+        session = SESSIONS.get(data['session_id'])
+        if session is None:
+            return jsonify({'error': 'Session expired or not found, generate the team again'}), 404
+        stats_df = session['stats_df']
+        cov_matrix = session['cov_matrix']
+        data_version = session['data_version']
+    else:
+        # Older clients post the stats and covariance matrix back
+        if 'player_stats' not in data:
+            return jsonify({'error': 'Player Stats not loaded correctly'}), 400
+        if 'cov_matrix' not in data:
+            return jsonify({'error': 'Player Covariance Matrix not loaded correctly'}), 400
+        stats_df = pd.DataFrame(json.loads(data['player_stats']))
+        cov_matrix = pd.DataFrame(json.loads(data['cov_matrix']))
+        data_version = FANTASY_DATA.version
+
+    # Players without stats (e.g. swapped in from outside the squad) are evaluated with
+    # zero weight, as before sessions existed
+    if selected_players and not stats_df.empty:
         evaluation_tuple = evaluate_team(selected_players,stats_df,cov_matrix)
         if evaluation_tuple:
-            return jsonify({"team_consistency_score": evaluation_tuple[0],
-                            "team_diversity_score": evaluation_tuple[1],
-                            "form_score": evaluation_tuple[2]
-                            })
+            response = {"team_consistency_score": evaluation_tuple[0],
+                        "team_diversity_score": evaluation_tuple[1],
+                        "form_score": evaluation_tuple[2],
+                        "data_version": data_version
+                        }
+            if data.get('include_cov_matrix') and 'session_id' in data:
+                response["cov_matrix"] = encode_matrix(cov_matrix, selected_players)
+            return jsonify(response)
         else:
             return jsonify({"error": "Team Evalaution is not done correctly"}), 404
             
@@ -96,5 +220,19 @@ def team_evaluation():
     
     
 
+@app.route('/stats', methods=['GET'])
+def stats():
+    # Load and caching counters of the optimization path
+    return jsonify({"data_version": FANTASY_DATA.version,
+                    "coalescing": SOLVES_IN_FLIGHT.stats(),
+                    "solve_cache": {"hits": SOLVE_CACHE.hits, "misses": SOLVE_CACHE.misses},
+                    "materialized_hits": MATERIALIZED_TEAMS.hits,
+                    "solver_pool": {"workers": SOLVER_POOL.workers,
+                                    "pending": SOLVER_POOL.pending,
+                                    "max_pending": SOLVER_POOL.max_pending},
+                    "sessions": len(SESSIONS)
+                    })
+
+
 if __name__ == '__main__':
      app.run(host='0.0.0.0', port=8080, debug=True)
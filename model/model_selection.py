@@ -0,0 +1,260 @@
+import hashlib
+import importlib
+import json
+import math
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+
+# Budgeted model selection for the points models, in place of running LazyRegressor on
+# every target. Candidates are compared by successive halving: every round fits the
+# surviving candidates on a larger sample of the training rows, and only the best
+# 1/ETA of each target go on to the next round. A candidate whose next fit is projected
+# to exceed its time budget stops where it is. Fits run in parallel across candidates
+# and targets, and every fit result is cached on disk under a hash of the data, the
+# candidate and the round, so re-running only fits what changed. Only the latest run's
+# copy of the training data, and the fit results on it, are kept on disk.
+
+MODEL_SELECTION_CACHE_DIR = "../data/model_selection"
+
+# name -> (estimator class path, constructor parameters)
+CANDIDATE_MODELS = {
+    "LinearRegression": ("sklearn.linear_model.LinearRegression", {}),
+    "Ridge": ("sklearn.linear_model.Ridge", {"alpha": 1.0}),
+    "Lasso": ("sklearn.linear_model.Lasso", {"alpha": 0.1, "max_iter": 5000}),
+    "ElasticNet": ("sklearn.linear_model.ElasticNet", {"alpha": 0.1, "l1_ratio": 0.5, "max_iter": 5000}),
+    "DecisionTreeRegressor": ("sklearn.tree.DecisionTreeRegressor", {"max_depth": 8, "random_state": 42}),
+    "KNeighborsRegressor": ("sklearn.neighbors.KNeighborsRegressor", {"n_neighbors": 10}),
+    "RandomForestRegressor": ("sklearn.ensemble.RandomForestRegressor",
+                              {"n_estimators": 100, "max_depth": 12, "n_jobs": 1, "random_state": 42}),
+    "ExtraTreesRegressor": ("sklearn.ensemble.ExtraTreesRegressor",
+                            {"n_estimators": 100, "max_depth": 12, "n_jobs": 1, "random_state": 42}),
+    "HistGradientBoostingRegressor": ("sklearn.ensemble.HistGradientBoostingRegressor", {"random_state": 42}),
+    "XGBRegressor": ("xgboost.XGBRegressor",
+                     {"objective": "reg:squarederror", "tree_method": "hist", "n_jobs": 1}),
+}
+
+# Fraction of the training rows used in each round
+RUNG_FRACTIONS = (0.1, 0.3, 1.0)
+# Only the best 1/ETA candidates of a round survive it
+ETA = 3
+# Seconds a single fit of one candidate may take
+TIME_BUDGET = 120.0
+
+_worker_data = {}
+
+
+def _array_digest(*arrays):
+    digest = hashlib.sha1()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(str((array.shape, array.dtype.str)).encode())
+        digest.update(memoryview(array).cast("B"))
+    return digest.hexdigest()[:16]
+
+
+def _fit_key(data_hash, target, name, model_spec, fraction):
+    payload = json.dumps([data_hash, target, name, model_spec, fraction], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def _load_data(data_dir):
+    """Memory-maps the shared training data once per worker process."""
+    if data_dir not in _worker_data:
+        _worker_data.clear()
+        _worker_data[data_dir] = {
+            name: np.load(os.path.join(data_dir, f"{name}.npy"), mmap_mode="r")
+            for name in ("X_train", "y_train", "X_test", "y_test", "order")
+        }
+    return _worker_data[data_dir]
+
+
+def _fit_candidate(data_dir, target_index, model_spec, fraction):
+    """Worker: fits one candidate on a sample of the training rows and scores it on the test rows."""
+    data = _load_data(data_dir)
+    n_rows = max(1, int(len(data["order"]) * fraction))
+    rows = np.sort(data["order"][:n_rows])
+    X_train = np.asarray(data["X_train"][rows])
+    y_train = np.asarray(data["y_train"][rows, target_index])
+    X_test = np.asarray(data["X_test"])
+    y_test = np.asarray(data["y_test"][:, target_index])
+
+    class_path, params = model_spec
+    try:
+        module_name, class_name = class_path.rsplit(".", 1)
+        estimator = getattr(importlib.import_module(module_name), class_name)(**params)
+        start = time.perf_counter()
+        estimator.fit(X_train, y_train)
+        fit_seconds = time.perf_counter() - start
+        predictions = estimator.predict(X_test)
+    except Exception as e:
+        return {"status": "failed", "error": str(e), "rows": n_rows}
+
+    residuals = predictions - y_test
+    total = np.sum((y_test - y_test.mean()) ** 2)
+    return {
+        "status": "ok",
+        "rows": n_rows,
+        "rmse": float(np.sqrt(np.mean(residuals ** 2))),
+        "r2": float(1 - np.sum(residuals ** 2) / total) if total > 0 else float("nan"),
+        "fit_seconds": fit_seconds,
+    }
+
+
+def _load_cache(cache_path, data_hash):
+    """Loads the cached fit results on the data with `data_hash`; results on other data are dropped."""
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, "r") as file:
+            cache = json.load(file)
+    except (json.JSONDecodeError, OSError) as e:
+        print(f"Ignoring unreadable model selection cache {cache_path}: {e}")
+        return {}
+    return {key: result for key, result in cache.items() if result.get("data_hash") == data_hash}
+
+
+def _save_cache(cache, cache_path):
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(cache, file, indent=4)
+    os.replace(tmp_path, cache_path)
+
+
+def _write_data(X_train, y_train, X_test, y_test, data_dir, seed):
+    if os.path.exists(os.path.join(data_dir, "done")):
+        return
+    os.makedirs(data_dir, exist_ok=True)
+    # Row sample of each round: a prefix of one fixed permutation, so rounds are nested
+    order = np.random.default_rng(seed).permutation(len(X_train))
+    arrays = {"X_train": X_train, "y_train": y_train, "X_test": X_test, "y_test": y_test, "order": order}
+    for name, array in arrays.items():
+        np.save(os.path.join(data_dir, f"{name}.npy"), array)
+    open(os.path.join(data_dir, "done"), "w").close()
+
+
+def _prune_data_dirs(cache_dir, keep_dir):
+    """Removes the training data copies of earlier runs; only the current one can be reused."""
+    for entry in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, entry)
+        if entry.startswith("data_") and os.path.isdir(path) and path != keep_dir:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def run_model_selection(X_train, X_test, y_train, y_test, candidates=None,
+                        rung_fractions=RUNG_FRACTIONS, eta=ETA, time_budget=TIME_BUDGET,
+                        workers=None, cache_dir=MODEL_SELECTION_CACHE_DIR, seed=42):
+    """
+    Compares candidate regressors on every target under a time budget.
+
+    Args:
+        X_train (pd.DataFrame or np.ndarray): Training features
+        X_test (pd.DataFrame or np.ndarray): Test features
+        y_train (pd.DataFrame): Training targets, one column per target
+        y_test (pd.DataFrame): Test targets, same columns as y_train
+        candidates (dict): name -> (estimator class path, params) (defaults to CANDIDATE_MODELS)
+        rung_fractions (tuple): Increasing fractions of the training rows used per round
+        eta (int): Keep the best 1/eta candidates of each target after every round
+        time_budget (float): Seconds one fit of a candidate may take
+        workers (int): Worker processes (defaults to one per core)
+        cache_dir (str): Where fit results and the leaderboard are kept
+        seed (int): Seed of the row sampling
+
+    Returns:
+        pd.DataFrame: Leaderboard with one row per target and candidate, best first, with
+        the RMSE/R2 of its last round, the rows it was fitted on, its fit time and its
+        status ('complete', 'dominated', 'over_budget' or 'failed')
+    """
+    candidates = CANDIDATE_MODELS if candidates is None else candidates
+    targets = list(y_train.columns)
+    X_train = np.asarray(X_train, dtype=np.float32)
+    X_test = np.asarray(X_test, dtype=np.float32)
+    y_train_array = np.asarray(y_train, dtype=np.float32)
+    y_test_array = np.asarray(y_test, dtype=np.float32)
+
+    data_hash = _array_digest(X_train, y_train_array, X_test, y_test_array, np.array([seed]))
+    data_dir = os.path.join(cache_dir, f"data_{data_hash}")
+    _write_data(X_train, y_train_array, X_test, y_test_array, data_dir, seed)
+    cache_path = os.path.join(cache_dir, "fit_cache.json")
+    # Like the data copies, fit results of earlier data are pruned: they can't be reused
+    cache = _load_cache(cache_path, data_hash)
+
+    # (target, name) -> latest result, and why a candidate stopped early
+    latest, stopped = {}, {}
+    alive = {(target, name) for target in targets for name in candidates}
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for rung, fraction in enumerate(rung_fractions):
+            futures = {}
+            for target, name in sorted(alive):
+                key = _fit_key(data_hash, target, name, candidates[name], fraction)
+                if key in cache:
+                    latest[(target, name)] = cache[key]
+                    continue
+                future = pool.submit(_fit_candidate, data_dir, targets.index(target),
+                                     candidates[name], fraction)
+                futures[future] = (target, name, key)
+
+            for future in as_completed(futures):
+                target, name, key = futures[future]
+                result = future.result()
+                latest[(target, name)] = result
+                if result["status"] == "ok":
+                    cache[key] = {**result, "data_hash": data_hash}
+                else:
+                    # Failures are not cached, so fixing the environment re-runs them
+                    print(f"{name} failed on {target}: {result['error']}")
+            if futures:
+                _save_cache(cache, cache_path)
+
+            last_rung = rung == len(rung_fractions) - 1
+            for target in targets:
+                ranked = sorted(
+                    (name for t, name in alive if t == target and latest[(t, name)]["status"] == "ok"),
+                    key=lambda name: latest[(target, name)]["rmse"]
+                )
+                for t, name in list(alive):
+                    if t == target and latest[(t, name)]["status"] != "ok":
+                        alive.discard((t, name))
+                if last_rung:
+                    continue
+                keep = ranked[:max(1, math.ceil(len(ranked) / eta))]
+                growth = rung_fractions[rung + 1] / fraction
+                for name in ranked:
+                    result = latest[(target, name)]
+                    if name not in keep:
+                        stopped[(target, name)] = "dominated"
+                        alive.discard((target, name))
+                    elif result["fit_seconds"] * growth > time_budget:
+                        stopped[(target, name)] = "over_budget"
+                        alive.discard((target, name))
+    # Also written when every fit was cached, so results pruned on load leave the file
+    _save_cache(cache, cache_path)
+    _prune_data_dirs(cache_dir, data_dir)
+
+    rows = []
+    for (target, name), result in latest.items():
+        if result["status"] != "ok":
+            status = "failed"
+        else:
+            status = stopped.get((target, name), "complete")
+        rows.append({
+            "target": target,
+            "model": name,
+            "RMSE": result.get("rmse", np.nan),
+            "R-Squared": result.get("r2", np.nan),
+            "rows": result.get("rows"),
+            "fit_seconds": result.get("fit_seconds", np.nan),
+            "status": status,
+        })
+    leaderboard = pd.DataFrame(rows)
+    if len(leaderboard):
+        # Candidates that reached more rows rank ahead, then by RMSE
+        leaderboard = leaderboard.sort_values(
+            ["target", "rows", "RMSE"], ascending=[True, False, True]
+        ).reset_index(drop=True)
+        leaderboard.to_csv(os.path.join(cache_dir, "leaderboard.csv"), index=False)
+    return leaderboard
@@ -0,0 +1,104 @@
+import base64
+import secrets
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+# Server-side state of an optimization: the squad's stats and covariance matrix stay on
+# the server under a short session id, so /team_evaluation and swaps only send the id and
+# the team instead of posting the matrices back. Sessions are evicted least recently used
+# first once MAX_SESSIONS is reached, and after SESSION_TTL seconds without use.
+
+MAX_SESSIONS = 1000
+SESSION_TTL = 1800.0
+
+
+class SessionStore:
+    """
+    Bounded, thread-safe store of optimization results with TTL eviction.
+
+    Args:
+        max_sessions (int): Sessions kept; the least recently used one is evicted beyond it
+        ttl (float): Seconds a session lives after its last use
+    """
+
+    def __init__(self, max_sessions=MAX_SESSIONS, ttl=SESSION_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict_expired(self, now):
+        # Sessions are kept in order of last use, so expired ones are at the front
+        while self._sessions:
+            session_id, (last_used, _) = next(iter(self._sessions.items()))
+            if now - last_used <= self.ttl:
+                break
+            del self._sessions[session_id]
+
+    def create(self, session):
+        """
+        Stores an optimization result.
+
+        Args:
+            session (dict): What later calls need, e.g. stats_df and cov_matrix
+
+        Returns:
+            str: Session id (11 URL-safe characters)
+        """
+        session_id = secrets.token_urlsafe(8)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            self._sessions[session_id] = (now, session)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session_id
+
+    def get(self, session_id):
+        """
+        Looks a session up and renews its TTL.
+
+        Returns:
+            dict: The stored session, or None if it doesn't exist or expired
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            self._sessions[session_id] = (now, entry[1])
+            self._sessions.move_to_end(session_id)
+            return entry[1]
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+def encode_matrix(cov_matrix, players):
+    """
+    Compact encoding of the covariance sub-matrix of some players.
+
+    Args:
+        cov_matrix (pd.DataFrame): Covariance matrix indexed by player on both axes
+        players (list): Players whose rows and columns are wanted, in this order
+
+    Returns:
+        dict: 'players', 'shape' and 'data', the row-major float32 values (little
+        endian) in base64
+    """
+    players = [player for player in players if player in cov_matrix.index]
+    values = cov_matrix.loc[players, players].to_numpy(dtype="<f4")
+    return {
+        "players": players,
+        "shape": list(values.shape),
+        "data": base64.b64encode(np.ascontiguousarray(values).tobytes()).decode("ascii"),
+    }
+
+
+def decode_matrix(encoded):
+    """Inverse of encode_matrix: returns (players, np.ndarray)."""
+    values = np.frombuffer(base64.b64decode(encoded["data"]), dtype="<f4")
+    return encoded["players"], values.reshape(encoded["shape"])
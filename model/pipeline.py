@@ -5,13 +5,18 @@ import numpy as np
 import datetime
 from heuristic_solver import compute_player_stats, compute_covariance_matrix, optimize_team_advanced, optimize_team_sharpe, optimize_team_advanced_test
 from utils import load_player_fantasy_points, calculate_team_metrics
-import requests
-import json
+from aggregate_stats_store import get_aggregate_stats_store
+from explanations import player_selection_prompt
+from llm_client import LLMError, get_llm_client
 
-def calculate_optimal_team(player_info, num_matches=65, date_of_match=None, risk_aversion=0.1, solver='pulp', fantasy_points_data=None):
+def calculate_optimal_team(player_info, num_matches=65, date_of_match=None, risk_aversion=0.1, solver='pulp', fantasy_points_data=None,
+                           points_predictor=None):
     """
     Given a list of player names (combined squad), calculates the optimal team.
     Returns selected_players and stats_df.
+
+    With a points_predictor (points_inference.PointsPredictor), the expected points of each
+    player come from the trained points models instead of the historical mean.
     """
     # Extract unique player names from player_info
     player_list = []
@@ -60,6 +65,14 @@ def calculate_optimal_team(player_info, num_matches=65, date_of_match=None, risk
     # Remove any potential duplicates
     stats_df = stats_df.drop_duplicates(subset=['player'])
 
+    if points_predictor is not None:
+        predictions = points_predictor.predict(
+            fantasy_points_data, stats_df['player'].tolist(), date_of_match
+        ).set_index('player')
+        for column in ['batting_points', 'bowling_points', 'fielding_points']:
+            stats_df[column] = stats_df['player'].map(predictions[column]).fillna(stats_df[column])
+        stats_df['mean_points'] = stats_df['player'].map(predictions['total_points']).fillna(stats_df['mean_points'])
+
     # Compute covariance matrix
     cov_matrix = compute_covariance_matrix(
         fantasy_points_data,
@@ -122,12 +135,10 @@ def analyze_player_selection(selected_players, player_name, format_lower='t20'):
     Returns:
         str: LLM analysis of player selection
     """
-    # Load aggregate stats
+    # Load aggregate stats (the tables the aggregate stats API serves)
     try:
-        aggregate_stats_path = f"../data/aggregate_cricket_stats_{format_lower}.json"
-        with open(aggregate_stats_path, 'r') as f:
-            aggregate_stats = json.load(f)
-    except FileNotFoundError:
+        aggregate_stats = get_aggregate_stats_store().table(format_lower)
+    except (KeyError, FileNotFoundError):
         return f"Error: Could not load aggregate statistics for {format_lower} format"
     
     
@@ -139,49 +150,11 @@ def analyze_player_selection(selected_players, player_name, format_lower='t20'):
     # Prepare prompt for LLM
     selection_status = "selected" if player_name in selected_players else "not selected"
     
-    prompt = f"""
-Based on the following statistics, explain why {player_name} was {selection_status} for the optimal fantasy cricket team:
-
-Key Aggregate Statistics:
-Batting Statistics:
-- Batting Style: {player_aggregate_stats.get('Batting', 'N/A')}
-- Total Runs: {player_aggregate_stats.get('Runs', 'N/A')}
-- Batting Average: {player_aggregate_stats.get('Batting Avg', 'N/A')}
-- Strike Rate: {player_aggregate_stats.get('Batting S/R', 'N/A')}
-- Boundary Percentage: {player_aggregate_stats.get('Boundary %', 'N/A')}
-- Mean Score: {player_aggregate_stats.get('Mean Score', 'N/A')}
-- Dismissal Rate: {player_aggregate_stats.get('Dismissal Rate', 'N/A')}
-
-Bowling Statistics:
-- Bowling Style: {player_aggregate_stats.get('Bowling', 'N/A')}
-- Wickets: {player_aggregate_stats.get('Wickets', 'N/A')}
-- Economy Rate: {player_aggregate_stats.get('Economy Rate', 'N/A')}
-- Bowling Average: {player_aggregate_stats.get('Bowling Avg', 'N/A')}
-- Bowling Strike Rate: {player_aggregate_stats.get('Bowling S/R', 'N/A')}
-- Dot Ball Bowled %: {player_aggregate_stats.get('Dot Ball Bowled %', 'N/A')}
-- Boundary Given %: {player_aggregate_stats.get('Boundary Given %', 'N/A')}
-
-Fielding Statistics:
-- Catches: {player_aggregate_stats.get('Catches', 'N/A')}
-- Runouts: {player_aggregate_stats.get('Runouts', 'N/A')}
-- Stumpings: {player_aggregate_stats.get('Stumpings', 'N/A')}
-
-A negative value for an aggregate statistic means that value does not exist and is not be to considered in the analysis.
-
-Please provide a concise and brief analysis of why this player was {selection_status}, considering only their overall cricket statistics. Output the best statistics of the player. Be crisp.
-"""
-
-    # Send request to LLM
-    url = "https://8001-01jdya9bpnhj5dqyfzh17zdghv.cloudspaces.litng.ai/predict"
-    headers = {"Content-Type": "application/json"}
-    data = {"input": prompt}
+    prompt = player_selection_prompt(player_name, selection_status, player_aggregate_stats)
 
     try:
-        response = requests.post(url, json=data, headers=headers)
-        response.raise_for_status()
-        analysis = response.json()['output']
-        return analysis
-    except requests.exceptions.RequestException as e:
+        return get_llm_client().complete(prompt)
+    except LLMError as e:
         return f"Error querying LLM: {str(e)}"
 
 # Example usage:
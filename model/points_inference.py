@@ -0,0 +1,264 @@
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from feature_builder import PAST_FEATURES, AGG_COLS, NUM_PREV_MATCHES, latest_lag_features
+from training_data import feature_schema, categorical_vocabulary
+from scoring_rules import RULE_SETS
+from fantasy_data import AGGREGATE_STATS_PATHS, load_aggregate_stats, match_date
+from feature_store import FEATURE_STORE_DIRS, FeatureStore
+
+# Serving side of the batting/bowling/fielding points models. The boosters are loaded
+# once from XGBoost's native format, a whole squad's lag features are built in one call
+# and each booster predicts the squad in a single inplace_predict.
+
+# Directories of the exported points models (see export_points_models), per format. A
+# format is served only once its models have been trained and exported there
+POINTS_MODEL_DIRS = {
+    "T20": "../data/points_models/T20",
+    "ODI": "../data/points_models/ODI",
+    "Test": "../data/points_models/Test",
+}
+
+# Loading the models of a format at service startup should stay under this many seconds
+LOAD_TIME_BUDGET = 1.0
+
+
+class PointsPredictor:
+    """
+    Predicts next-match batting, bowling and fielding points for a squad.
+
+    Args:
+        model_paths (dict): {target: path of a native XGBoost model, or a loaded xgb.Booster}
+        aggregate_data (dict): Per-player aggregate table of the format
+        format_name (str): Format the models were trained on (for the appearance points)
+        features (list): Lagged match stats the models were trained with
+        num_prev_matches (int): Lags per stat the models were trained with
+        agg_cols (list): Aggregate stats the models were trained with
+        categories (dict): Text column vocabularies used in training (defaults to the
+            ones derived from aggregate_data, which is what training does)
+        fill_value (float): Replaces missing features, like model.py's fillna(0)
+        feature_store (FeatureStore): Optional store with precomputed features of the
+            same schema; squad features are then looked up instead of computed
+    """
+
+    def __init__(self, model_paths, aggregate_data, format_name="T20", features=PAST_FEATURES,
+                 num_prev_matches=NUM_PREV_MATCHES, agg_cols=AGG_COLS, categories=None, fill_value=0.0,
+                 feature_store=None):
+        self.boosters = {}
+        for target, path in model_paths.items():
+            booster = path if isinstance(path, xgb.Booster) else xgb.Booster(model_file=path)
+            booster.set_param({"nthread": 1})
+            self.boosters[target] = booster
+        self.aggregate_data = aggregate_data
+        self.features = features
+        self.num_prev_matches = num_prev_matches
+        self.agg_cols = list(agg_cols)
+        self.feature_names = feature_schema(features, num_prev_matches, agg_cols)
+        self.categories = categorical_vocabulary(aggregate_data, agg_cols) if categories is None else categories
+        self._codes = {
+            column: {value: code for code, value in enumerate(values)}
+            for column, values in self.categories.items()
+        }
+        self.appearance_points = RULE_SETS[format_name]["appearance_points"]
+        self.fill_value = fill_value
+        self.load_seconds = None
+        if feature_store is not None and feature_store.feature_names != self.feature_names:
+            print(f"Feature store {feature_store.store_dir} has a different schema, not used")
+            feature_store = None
+        self.feature_store = feature_store
+        self._aggregate_rows = {}
+
+    def _aggregate_row(self, player):
+        """Encoded aggregate features of a player, computed once and cached."""
+        if player not in self._aggregate_rows:
+            stats = self.aggregate_data.get(player, {})
+            row = np.full(len(self.agg_cols), np.nan, dtype=np.float32)
+            for j, column in enumerate(self.agg_cols):
+                value = stats.get(column)
+                if column in self._codes:
+                    value = self._codes[column].get(value)
+                try:
+                    row[j] = float(value)
+                except (TypeError, ValueError):
+                    pass
+            self._aggregate_rows[player] = row
+        return self._aggregate_rows[player]
+
+    def squad_features(self, fantasy_points, players, date_of_match=None):
+        """
+        Builds the feature matrix of a squad for its next match.
+
+        Args:
+            fantasy_points (dict): Fantasy points data in either loader layout
+            players (list): Player names
+            date_of_match (str): Only matches before this date (YYYY-MM-DD) are history
+
+        Returns:
+            tuple: (np.ndarray of shape (len(players), n_features), boolean mask of
+            players with at least one past match)
+        """
+        if self.feature_store is not None:
+            X, has_history = self.feature_store.next_match_features(players, date_of_match)
+            if self.fill_value is not None:
+                X = np.nan_to_num(X, nan=self.fill_value)
+            return X, has_history
+
+        histories = []
+        for player in players:
+            matches = fantasy_points.get(player) or {}
+            items = matches.items() if isinstance(matches, dict) else matches
+            dated = [(match_date(match_key), info) for match_key, info in items]
+            if date_of_match:
+                dated = [(date, info) for date, info in dated if date < date_of_match]
+            dated.sort(key=lambda item: item[0])
+            histories.append([info for _, info in dated[-self.num_prev_matches:]] if dated else [])
+
+        # Only the last num_prev_matches are needed: padding only happens when there are fewer
+        lags = latest_lag_features(histories, self.features, self.num_prev_matches)
+        aggregates = np.stack([self._aggregate_row(player) for player in players]) if players else \
+            np.empty((0, len(self.agg_cols)), dtype=np.float32)
+        X = np.concatenate([lags.astype(np.float32), aggregates], axis=1)
+        if self.fill_value is not None:
+            X = np.nan_to_num(X, nan=self.fill_value)
+        return X, np.array([bool(history) for history in histories], dtype=bool)
+
+    def predict(self, fantasy_points, players, date_of_match=None):
+        """
+        Predicts the points of every player of a squad.
+
+        Args:
+            fantasy_points (dict): Fantasy points data in either loader layout
+            players (list): Player names
+            date_of_match (str): Cutoff date (YYYY-MM-DD)
+
+        Returns:
+            pd.DataFrame: 'player', one column per target and 'total_points' (including
+            the appearance points); NaN for players without history
+        """
+        X, has_history = self.squad_features(fantasy_points, players, date_of_match)
+        predictions = pd.DataFrame({"player": list(players)})
+        for target, booster in self.boosters.items():
+            values = booster.inplace_predict(X) if len(X) else np.empty(0)
+            predictions[target] = np.where(has_history, values, np.nan)
+        predictions["total_points"] = predictions[list(self.boosters)].sum(axis=1, min_count=1) \
+            + self.appearance_points
+        return predictions
+
+
+def export_points_models(boosters, model_dir, format_name, categories, features=PAST_FEATURES,
+                         num_prev_matches=NUM_PREV_MATCHES, agg_cols=AGG_COLS, fill_value=0.0):
+    """
+    Saves the boosters in XGBoost's native binary format with a feature-schema manifest.
+
+    The manifest holds everything needed to rebuild the inputs at serving time (column
+    order, lag settings and the text column vocabularies), so loading needs neither
+    pickle nor the training libraries.
+
+    Args:
+        boosters (dict): {target: xgb.Booster}
+        model_dir (str): Output directory
+        format_name (str): Format the models were trained on
+        categories (dict): Text column vocabularies used in training
+        features (list): Lagged match stats
+        num_prev_matches (int): Lags per stat
+        agg_cols (list): Aggregate stats
+        fill_value (float): Value missing features were filled with in training (None for none)
+
+    Returns:
+        dict: The manifest written to model_dir/manifest.json
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    model_files = {}
+    for target, booster in boosters.items():
+        model_files[target] = f"{target}.ubj"
+        booster.save_model(os.path.join(model_dir, model_files[target]))
+
+    manifest = {
+        "format": format_name,
+        "xgboost_version": xgb.__version__,
+        "model_files": model_files,
+        "features": list(features),
+        "num_prev_matches": num_prev_matches,
+        "agg_cols": list(agg_cols),
+        "feature_names": feature_schema(features, num_prev_matches, agg_cols),
+        "categories": categories,
+        "fill_value": fill_value,
+    }
+    tmp_path = os.path.join(model_dir, "manifest.json.tmp")
+    with open(tmp_path, "w") as file:
+        json.dump(manifest, file)
+    os.replace(tmp_path, os.path.join(model_dir, "manifest.json"))
+    return manifest
+
+
+def load_points_models(model_dir, aggregate_data, load_time_budget=LOAD_TIME_BUDGET, feature_store=None):
+    """
+    Loads exported points models into a PointsPredictor.
+
+    Args:
+        model_dir (str): Directory written by export_points_models
+        aggregate_data (dict): Per-player aggregate table of the format
+        load_time_budget (float): Seconds the load should take; exceeding it is reported
+        feature_store (FeatureStore): Optional store to read squad features from
+
+    Returns:
+        PointsPredictor: Predictor with `load_seconds` set to the measured load time
+    """
+    start = time.perf_counter()
+    with open(os.path.join(model_dir, "manifest.json"), "r") as file:
+        manifest = json.load(file)
+    boosters = {
+        target: xgb.Booster(model_file=os.path.join(model_dir, model_file))
+        for target, model_file in manifest["model_files"].items()
+    }
+    for target, booster in boosters.items():
+        if booster.num_features() != len(manifest["feature_names"]):
+            raise ValueError(
+                f"{target} model expects {booster.num_features()} features, "
+                f"manifest lists {len(manifest['feature_names'])}"
+            )
+    predictor = PointsPredictor(
+        boosters, aggregate_data, manifest["format"], manifest["features"],
+        manifest["num_prev_matches"], manifest["agg_cols"], manifest["categories"],
+        manifest["fill_value"], feature_store
+    )
+    predictor.load_seconds = time.perf_counter() - start
+    if predictor.load_seconds > load_time_budget:
+        print(f"Loading the {manifest['format']} points models took {predictor.load_seconds:.3f}s "
+              f"(budget {load_time_budget:.3f}s)")
+    return predictor
+
+
+def load_points_predictors(model_dirs=POINTS_MODEL_DIRS, aggregate_paths=None,
+                           load_time_budget=LOAD_TIME_BUDGET, store_dirs=FEATURE_STORE_DIRS):
+    """
+    Loads a PointsPredictor for every format whose exported models exist.
+
+    Args:
+        model_dirs (dict): {format: model directory}
+        aggregate_paths (dict): {format: aggregate table path} (defaults to AGGREGATE_STATS_PATHS)
+        load_time_budget (float): Seconds the models of one format should take to load
+        store_dirs (dict): {format: feature store directory}, used when the store exists
+
+    Returns:
+        dict: {format: PointsPredictor}
+    """
+    aggregate_paths = AGGREGATE_STATS_PATHS if aggregate_paths is None else aggregate_paths
+    predictors = {}
+    for format_name, model_dir in model_dirs.items():
+        if not os.path.exists(os.path.join(model_dir, "manifest.json")):
+            continue
+        try:
+            aggregate_data = load_aggregate_stats(aggregate_paths[format_name])
+        except FileNotFoundError:
+            print(f"No aggregate stats for {format_name}, points models not loaded")
+            continue
+        store_dir = store_dirs.get(format_name)
+        feature_store = None
+        if store_dir and os.path.exists(os.path.join(store_dir, "manifest.json")):
+            feature_store = FeatureStore(store_dir)
+        predictors[format_name] = load_points_models(model_dir, aggregate_data, load_time_budget, feature_store)
+    return predictors
@@ -0,0 +1,93 @@
+import os
+import time
+import numpy as np
+import xgboost as xgb
+from training_data import ShardDataIter, load_targets
+
+# Batting, bowling and fielding points are predicted from the same feature matrix, so it
+# is quantized once into a QuantileDMatrix and the three boosters are trained on it by
+# swapping the label; only the first build pays for the histogram cuts.
+
+POINTS_MODEL_PARAMS = {
+    "objective": "reg:squarederror",
+    "tree_method": "hist",
+    "nthread": os.cpu_count(),
+    "learning_rate": 0.3,
+    "max_depth": 6,
+}
+
+NUM_BOOST_ROUND = 100
+
+
+def quantile_dmatrix(data, ref=None, max_bin=256):
+    """
+    Builds the shared quantized matrix, without labels.
+
+    Args:
+        data (pd.DataFrame, np.ndarray or ShardDataIter): Features, in memory or streamed from shards
+        ref (xgb.QuantileDMatrix): Training matrix whose bins to reuse (for validation data)
+        max_bin (int): Number of histogram bins
+
+    Returns:
+        xgb.QuantileDMatrix: Quantized features
+    """
+    return xgb.QuantileDMatrix(data, ref=ref, max_bin=max_bin, nthread=POINTS_MODEL_PARAMS["nthread"])
+
+
+def quantile_dmatrix_from_shards(shard_dirs, row_filter=None, ref=None, max_bin=256, fill_value=None):
+    """
+    Builds the shared quantized matrix and the labels straight from feature shards.
+
+    Only one shard is in memory at a time while the matrix is quantized.
+
+    Args:
+        shard_dirs (str or list): Shard directories, e.g. a feature store (feature_store.py)
+        row_filter (function): Optional shard -> boolean mask selecting the rows to use
+        ref (xgb.QuantileDMatrix): Training matrix whose bins to reuse
+        max_bin (int): Number of histogram bins
+        fill_value (float): Replaces missing features and labels (None keeps NaN)
+
+    Returns:
+        tuple: (xgb.QuantileDMatrix, {target: labels})
+    """
+    data = ShardDataIter(shard_dirs, row_filter=row_filter, fill_value=fill_value)
+    dmatrix = quantile_dmatrix(data, ref, max_bin)
+    return dmatrix, load_targets(shard_dirs, row_filter, fill_value)
+
+
+def train_points_models(dtrain, labels, params=None, num_boost_round=NUM_BOOST_ROUND,
+                        dvalid=None, valid_labels=None):
+    """
+    Trains one booster per target on a single shared quantized matrix.
+
+    Args:
+        dtrain (xgb.QuantileDMatrix): Shared training matrix
+        labels (dict): {target: training labels}
+        params (dict): XGBoost parameters (defaults to POINTS_MODEL_PARAMS)
+        num_boost_round (int): Boosting rounds per target
+        dvalid (xgb.DMatrix): Optional validation matrix, built with ref=dtrain
+        valid_labels (dict): {target: validation labels}, required with dvalid
+
+    Returns:
+        tuple: ({target: xgb.Booster}, {target: wall time in seconds},
+        {target: validation RMSE} (empty without dvalid))
+    """
+    params = {**POINTS_MODEL_PARAMS, **(params or {})}
+    models, timings, rmse = {}, {}, {}
+    for target, y in labels.items():
+        dtrain.set_label(y)
+        evals = [(dtrain, "train")]
+        if dvalid is not None:
+            dvalid.set_label(valid_labels[target])
+            evals.append((dvalid, "valid"))
+
+        start = time.perf_counter()
+        models[target] = xgb.train(params, dtrain, num_boost_round, evals=evals, verbose_eval=False)
+        timings[target] = time.perf_counter() - start
+
+        if dvalid is not None:
+            predictions = models[target].predict(dvalid)
+            rmse[target] = float(np.sqrt(np.mean((predictions - valid_labels[target]) ** 2)))
+        print(f"{target}: trained in {timings[target]:.2f}s"
+              + (f", RMSE {rmse[target]:.3f}" if target in rmse else ""))
+    return models, timings, rmse
@@ -0,0 +1,158 @@
+# Fantasy points rules for each format, expressed as data.
+#
+# The rules mirror calculator.py (T20), calculate_odi.py (ODI) and calculator_test.py
+# (Test) and are compiled into vectorized kernels by vectorized_calculator.compile_rule_set.
+# Changing a threshold or adding a format only needs a new table here.
+#
+# Each rule set has:
+#   match_suffixes:    match-id suffixes scored with this rule set
+#   appearance_points: flat points added to the total for playing
+#   batting / bowling / fielding: ordered lists of rules, applied in sequence
+#
+# Rule types:
+#   per_unit: points * column (columns in a tuple are summed first)
+#   bands:    first matching band wins, like an if/elif ladder. A band is
+#             (low, high, points, closed) where low/high may be None for an open end and
+#             closed is "both", "left", "right" or "neither" (same meaning as pd.Interval).
+#             "min": (column, value) only applies the bands when column >= value.
+#   duck:     points when dismissed for 0 after facing a ball. With per_innings the rule
+#             is checked inning by inning, otherwise once for the match across the innings.
+# A column name containing "{i}" is expanded for each inning listed in "innings".
+
+T20_RULES = {
+    "match_suffixes": ("T20",),
+    "appearance_points": 4,
+    "batting": [
+        {"type": "per_unit", "column": "Total Runs Scored", "points": 1},
+        {"type": "per_unit", "column": "Fours", "points": 1},
+        {"type": "per_unit", "column": "Sixes", "points": 2},
+        {"type": "bands", "column": "Total Runs Scored", "bands": [
+            (100, None, 16, "left"),
+            (50, None, 8, "left"),
+            (30, None, 4, "left"),
+        ]},
+        {"type": "duck", "points": -2, "innings": (1, 2)},
+        {"type": "bands", "column": "Avg Batting S/R Per Inning", "min": ("Balls Faced", 10), "bands": [
+            (170, None, 6, "neither"),
+            (150, 170, 4, "right"),
+            (130, 150, 2, "both"),
+            (60, 70, -2, "left"),
+            (50, 60, -4, "left"),
+            (None, 50, -6, "neither"),
+        ]},
+    ],
+    "bowling": [
+        {"type": "per_unit", "column": "Wickets", "points": 25},
+        {"type": "per_unit", "column": ("Bowled", "LBW"), "points": 8},
+        {"type": "bands", "column": "Wickets", "bands": [
+            (5, None, 16, "left"),
+            (4, 4, 8, "both"),
+            (3, 3, 4, "both"),
+        ]},
+        {"type": "per_unit", "column": "Maiden Overs", "points": 12},
+        {"type": "bands", "column": "Avg Economy Rate per inning", "min": ("Overs Bowled", 2), "bands": [
+            (None, 5, 6, "neither"),
+            (5, 5.99, 4, "both"),
+            (6, 7, 2, "both"),
+            (10, 11, -2, "both"),
+            (11.01, 12, -4, "both"),
+            (12, None, -6, "neither"),
+        ]},
+    ],
+    "fielding": [
+        {"type": "per_unit", "column": "Catches Taken", "points": 8},
+        {"type": "per_unit", "column": "Stumped Outs Made", "points": 12},
+        {"type": "per_unit", "column": "Run Outs Made", "points": 8},
+        {"type": "bands", "column": "Catches Taken", "bands": [(3, None, 4, "left")]},
+    ],
+}
+
+ODI_RULES = {
+    "match_suffixes": ("ODI", "ODM"),
+    "appearance_points": 4,
+    "batting": [
+        {"type": "per_unit", "column": "Total Runs Scored", "points": 1},
+        {"type": "per_unit", "column": "Fours", "points": 1},
+        {"type": "per_unit", "column": "Sixes", "points": 2},
+        {"type": "bands", "column": "Total Runs Scored", "bands": [
+            (100, None, 8, "left"),
+            (50, None, 4, "left"),
+        ]},
+        {"type": "duck", "points": -3, "innings": (1, 2)},
+        {"type": "bands", "column": "Avg Batting S/R Per Inning", "min": ("Balls Faced", 20), "bands": [
+            (140, None, 6, "neither"),
+            (120, 140, 4, "right"),
+            (100, 120, 2, "both"),
+            (40, 50, -2, "left"),
+            (30, 40, -4, "left"),
+            (None, 30, -6, "neither"),
+        ]},
+    ],
+    "bowling": [
+        {"type": "per_unit", "column": "Wickets", "points": 25},
+        {"type": "per_unit", "column": ("Bowled", "LBW"), "points": 8},
+        {"type": "bands", "column": "Wickets", "bands": [
+            (5, None, 8, "left"),
+            (4, 4, 4, "both"),
+        ]},
+        {"type": "per_unit", "column": "Maiden Overs", "points": 4},
+        {"type": "bands", "column": "Avg Economy Rate per inning", "min": ("Overs Bowled", 5), "bands": [
+            (None, 2.5, 6, "neither"),
+            (2.5, 3.5, 4, "left"),
+            (3.5, 4.5, 2, "both"),
+            (7, 8, -2, "both"),
+            (8, 9, -4, "right"),
+            (9, None, -6, "neither"),
+        ]},
+    ],
+    "fielding": [
+        {"type": "per_unit", "column": "Catches Taken", "points": 8},
+        {"type": "per_unit", "column": "Stumped Outs Made", "points": 12},
+        {"type": "per_unit", "column": "Run Outs Made", "points": 8},
+        {"type": "bands", "column": "Catches Taken", "bands": [(3, None, 4, "left")]},
+    ],
+}
+
+TEST_RULES = {
+    "match_suffixes": ("Test", "MDM"),
+    "appearance_points": 4,
+    "batting": [
+        {"type": "per_unit", "column": "Total Runs Scored", "points": 1},
+        {"type": "per_unit", "column": "Fours", "points": 1},
+        {"type": "per_unit", "column": "Sixes", "points": 2},
+        {"type": "bands", "column": "Innings {i} Runs", "innings": (1, 2, 3, 4), "bands": [
+            (100, None, 8, "left"),
+            (50, None, 4, "left"),
+        ]},
+        {"type": "duck", "points": -4, "innings": (1, 2, 3, 4), "per_innings": True},
+    ],
+    "bowling": [
+        {"type": "per_unit", "column": "Wickets", "points": 16},
+        {"type": "per_unit", "column": ("Bowled", "LBW"), "points": 8},
+        {"type": "bands", "column": "Innings {i} Wickets", "innings": (1, 2, 3, 4), "bands": [
+            (5, None, 8, "left"),
+            (4, 4, 4, "both"),
+        ]},
+    ],
+    "fielding": [
+        {"type": "per_unit", "column": "Catches Taken", "points": 8},
+        {"type": "per_unit", "column": "Stumped Outs Made", "points": 12},
+        {"type": "per_unit", "column": "Run Outs Made", "points": 8},
+    ],
+}
+
+RULE_SETS = {
+    "T20": T20_RULES,
+    "ODI": ODI_RULES,
+    "Test": TEST_RULES,
+}
+
+# Columns read with .get(column) (no default) in the scalar calculators; a missing
+# value never falls in a band. Every other column defaults to 0.
+# The scalar calculators compare the None they get for a missing or None value and
+# raise TypeError; the vectorized kernels score the row with no band bonus instead.
+NAN_DEFAULT_COLUMNS = {
+    "Avg Batting S/R Per Inning",
+    *(f"Innings {i} Runs" for i in range(1, 5)),
+    *(f"Innings {i} Wickets" for i in range(1, 5)),
+}
@@ -0,0 +1,89 @@
+import threading
+import time
+from concurrent.futures import Future
+
+# Request coalescing: while a computation for a key is in flight, identical requests wait
+# on its future instead of starting their own, and all of them get the same result (or
+# the same exception).
+
+
+class SingleFlight:
+    """
+    Runs at most one computation per key at a time and shares its result.
+
+    Counters (see stats()): calls, computations started (leaders), calls that joined an
+    in-flight computation (coalesced), computations currently in flight and the peak, and
+    the time coalesced calls spent waiting.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.calls = self.leaders = self.coalesced = 0
+        self.max_in_flight = 0
+        self.wait_seconds = self.max_wait_seconds = 0.0
+
+    def do(self, key, fn, *args, timeout=None, **kwargs):
+        """
+        Returns fn(*args, **kwargs), computed once for all concurrent calls with the same key.
+
+        Args:
+            key (hashable): Identity of the computation
+            fn (callable): Computation, run in the calling thread of the first call
+            timeout (float): Seconds a coalesced call waits for the result
+
+        Returns:
+            tuple: (result, shared) where shared is True if the result was computed by
+            another call
+
+        Raises:
+            Whatever fn raised, in every call that shared it; concurrent.futures.TimeoutError
+            if a coalesced call waited longer than timeout
+        """
+        with self._lock:
+            self.calls += 1
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.leaders += 1
+                self.max_in_flight = max(self.max_in_flight, len(self._in_flight))
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            start = time.perf_counter()
+            try:
+                return future.result(timeout=timeout), True
+            finally:
+                waited = time.perf_counter() - start
+                with self._lock:
+                    self.wait_seconds += waited
+                    self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def stats(self):
+        """Counters as a dict, e.g. for a monitoring endpoint."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._in_flight),
+                "max_in_flight": self.max_in_flight,
+                "wait_seconds": round(self.wait_seconds, 6),
+                "max_wait_seconds": round(self.max_wait_seconds, 6),
+                "mean_wait_seconds": round(self.wait_seconds / self.coalesced, 6) if self.coalesced else 0.0,
+            }
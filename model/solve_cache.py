@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+import pandas as pd
+from fantasy_dataset import version_time
+
+# Memo of optimization results. A problem is identified by a hash of its canonical
+# inputs: the squad (teams and players sorted), the match date, the format, the solver
+# parameters and the version of the fantasy points data. Results are kept in an in-memory
+# LRU in front of a directory of JSON files, one directory per data version, so every
+# process on the machine shares them and a new data version never sees stale results.
+# The API, the Streamlit app and the backtests (get_snapshot, tune_optimizer_config)
+# all go through it; their solver parameters differ, so they don't share entries.
+
+SOLVE_CACHE_DIR = "../data/solve_cache"
+# Results kept in memory per process
+MEMORY_ENTRIES = 256
+
+
+def problem_key(player_info, date_of_match, format_name, params):
+    """
+    Canonical hash of an optimization problem.
+
+    Args:
+        player_info (dict): {team: [player names]}; the order of teams and players is
+            irrelevant, anything after ' : ' in a name is ignored like in the pipeline
+        date_of_match (str): Match date (YYYY-MM-DD)
+        format_name (str): T20/ODI/Test
+        params (dict): Solver parameters (num_matches, risk_aversion, solver, ...)
+
+    Returns:
+        str: Hex digest
+    """
+    squad = {
+        str(team): sorted({player.split(":")[0].strip() for player in players})
+        for team, players in player_info.items()
+    }
+    payload = json.dumps([squad, date_of_match, format_name, params], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def result_to_json(result):
+    """JSON-serializable form of a solve result."""
+    cov_matrix = result["cov_matrix"]
+    return {
+        "best_team": result["best_team"],
+        "stats_df": result["stats_df"].to_dict(orient="list"),
+        "cov_matrix": None if cov_matrix is None else {
+            "players": list(cov_matrix.index),
+            "values": cov_matrix.to_numpy().tolist(),
+        },
+        "data_version": result["data_version"],
+    }
+
+
+def result_from_json(cached):
+    """Solve result from its result_to_json form."""
+    cov_matrix = cached["cov_matrix"]
+    return {
+        "best_team": cached["best_team"],
+        "stats_df": pd.DataFrame(cached["stats_df"]),
+        "cov_matrix": None if cov_matrix is None else pd.DataFrame(
+            cov_matrix["values"], index=cov_matrix["players"], columns=cov_matrix["players"]
+        ),
+        "data_version": cached["data_version"],
+    }
+
+
+class SolveCache:
+    """
+    Optimization results by problem key and data version, in memory and on disk.
+
+    Args:
+        cache_dir (str): Directory shared by every process using the cache
+        memory_entries (int): Results kept in this process's LRU
+    """
+
+    def __init__(self, cache_dir=SOLVE_CACHE_DIR, memory_entries=MEMORY_ENTRIES):
+        self.cache_dir = cache_dir
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+        self._data_version = None
+
+    def _path(self, data_version, key):
+        return os.path.join(self.cache_dir, data_version, f"{key}.json")
+
+    def get(self, data_version, key):
+        """
+        Cached result of a problem on a data version.
+
+        Returns:
+            dict: 'best_team', 'stats_df', 'cov_matrix' and 'data_version', or None
+        """
+        with self._lock:
+            cached = self._memory.get((data_version, key))
+            if cached is not None:
+                self._memory.move_to_end((data_version, key))
+                self.hits += 1
+                return result_from_json(cached)
+        try:
+            with open(self._path(data_version, key), "r") as file:
+                cached = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self._remember(data_version, key, cached)
+            self.hits += 1
+        return result_from_json(cached)
+
+    def _remember(self, data_version, key, cached):
+        self._memory[(data_version, key)] = cached
+        self._memory.move_to_end((data_version, key))
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def put(self, key, result):
+        """
+        Stores a result under its own data version (result['data_version']).
+
+        Args:
+            key (str): problem_key of the problem
+            result (dict): 'best_team', 'stats_df', 'cov_matrix' and 'data_version'
+        """
+        if not result.get("best_team"):
+            return
+        data_version = result["data_version"]
+        if data_version != self._data_version:
+            # First result on a new data version: results of older versions can't be hit again
+            # (other processes may still be on versions as new or newer, those are kept)
+            if self._data_version is not None:
+                self.prune(data_version)
+            self._data_version = data_version
+        cached = result_to_json(result)
+        with self._lock:
+            self._remember(data_version, key, cached)
+        path = self._path(data_version, key)
+        # Unique tmp name, several processes may write the same key at once
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w") as file:
+                json.dump(cached, file)
+            os.replace(tmp_path, path)
+        except FileNotFoundError:
+            # A process on newer data pruned this version meanwhile; the result stays in memory
+            pass
+
+    def get_or_solve(self, data_version, key, solve):
+        """
+        Cached result of a problem, or the result of solve() (stored when it has a team).
+
+        Args:
+            data_version (str): Version of the data solve() runs on
+            key (str): problem_key of the problem
+            solve (callable): Returns 'best_team', 'stats_df' and 'cov_matrix'
+
+        Returns:
+            dict: 'best_team', 'stats_df', 'cov_matrix' and 'data_version'
+        """
+        result = self.get(data_version, key)
+        if result is None:
+            result = {**solve(), "data_version": data_version}
+            self.put(key, result)
+        return result
+
+    def prune(self, data_version):
+        """Deletes the cached results of data versions older than data_version."""
+        current = version_time(data_version)
+        if current is None:
+            return
+
+        def older(version):
+            time = version_time(version)
+            return time is None or time < current
+
+        with self._lock:
+            for cache_key in [cache_key for cache_key in self._memory if older(cache_key[0])]:
+                del self._memory[cache_key]
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if older(name):
+                shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
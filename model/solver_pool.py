@@ -0,0 +1,220 @@
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from pipeline import calculate_optimal_team
+
+# Worker processes for the CPU-bound optimization path (history scans, covariance, the
+# CBC subprocess), so Flask's request threads only wait on a future. The workers are
+# forked once the API has loaded its data, which they inherit instead of loading it
+# again, and are all started up front. Workers never reload: when the API's dataset has
+# reloaded a new version, its reload callback forks a fresh set of workers from the
+# reload thread and swaps them in, and the old ones exit after finishing what was queued
+# on them. Request threads only submit to already started workers and never fork, so a
+# fork can't copy a lock some request thread holds. At most MAX_PENDING solves are
+# queued or running; beyond that submit() refuses, which the API reports as 503.
+
+SOLVER_WORKERS = os.cpu_count() or 1
+# Solves allowed to be queued or running at once, per worker
+PENDING_PER_WORKER = 4
+# Seconds a request waits for its solve
+REQUEST_TIMEOUT = 60.0
+# Optimizer settings of the API's teams
+SOLVE_PARAMS = {"num_matches": 65, "risk_aversion": 0.1, "solver": 'pulp'}
+
+_worker_state = {}
+
+
+class PoolSaturated(Exception):
+    """Raised when the solver queue is full."""
+
+
+def _init_worker(dataset, points_predictors):
+    # The snapshot the pool was started on; the pool is replaced when the data changes
+    _worker_state["snapshot"] = dataset.snapshot(refresh=False)
+    _worker_state["points_predictors"] = points_predictors or {}
+
+
+def _ready():
+    return os.getpid()
+
+
+def history_window(matches, date_of_match):
+    """
+    A player's matches before a date, in loader order.
+
+    The pipeline only ever looks at these, so a batch of matches on one date can compute
+    them once per player and send them to the workers instead of the whole dataset.
+
+    Args:
+        matches (iterable): (match_key, match_info) pairs of the player, or None
+        date_of_match (str): YYYY-MM-DD
+
+    Returns:
+        tuple: The (match_key, match_info) pairs dated before date_of_match
+    """
+    window = []
+    for match_key, match_info in matches or ():
+        date = re.search(r'\d{4}-\d{2}-\d{2}', str(match_key))
+        if date and date.group() < date_of_match:
+            window.append((match_key, match_info))
+    return tuple(window)
+
+
+def solve_best_team(player_info, date_of_match, format_name, num_matches=65, risk_aversion=0.1,
+                    solver='pulp', points_source=None, fantasy_points_data=None, data_version=None):
+    """
+    Worker: runs calculate_optimal_team on the worker's copy of the data.
+
+    Args:
+        player_info (dict): {team: [player names]}
+        date_of_match (str): Match date (YYYY-MM-DD)
+        format_name (str): T20/ODI/Test
+        num_matches (int): Past matches used per player
+        risk_aversion (float): Risk aversion of the optimizer
+        solver (str): 'pulp' or the Sharpe optimizer
+        points_source (str): 'model' to use the trained points models
+        fantasy_points_data (dict): History windows of the squad's players (see
+            history_window) to solve on instead of the worker's data
+        data_version (str): Version of the data the history windows come from
+
+    Returns:
+        dict: 'best_team', 'stats_df', 'cov_matrix' and 'data_version', or 'error'
+    """
+    if fantasy_points_data is None:
+        snapshot = _worker_state["snapshot"]
+        fantasy_points_data = snapshot.get(format_name)
+        data_version = snapshot.version
+        if fantasy_points_data is None:
+            return {"error": f"No fantasy points data for format {format_name}", "data_version": data_version}
+    points_predictor = None
+    if points_source == 'model':
+        points_predictor = _worker_state["points_predictors"].get(format_name)
+        if points_predictor is None:
+            return {"error": f"No trained points models for format {format_name}", "data_version": data_version}
+    selected_players, stats_df, cov_matrix = calculate_optimal_team(
+        player_info=player_info,
+        num_matches=num_matches,
+        date_of_match=date_of_match,
+        risk_aversion=risk_aversion,
+        solver=solver,
+        fantasy_points_data=fantasy_points_data,
+        points_predictor=points_predictor
+    )
+    return {
+        "best_team": selected_players,
+        "stats_df": stats_df,
+        "cov_matrix": cov_matrix,
+        "data_version": data_version,
+    }
+
+
+class SolverPool:
+    """
+    Pre-started process pool with a bounded queue for optimization requests.
+
+    Args:
+        dataset (FantasyDataset): Data handle the workers solve on
+        points_predictors (dict): {format: PointsPredictor} for 'points_source': 'model'
+        workers (int): Worker processes (defaults to SOLVER_WORKERS)
+        max_pending (int): Solves queued or running at once (defaults to
+            PENDING_PER_WORKER per worker)
+        timeout (float): Default seconds run() waits for a result
+    """
+
+    def __init__(self, dataset, points_predictors=None, workers=None, max_pending=None,
+                 timeout=REQUEST_TIMEOUT):
+        self.dataset = dataset
+        self.points_predictors = points_predictors
+        self.workers = workers or SOLVER_WORKERS
+        self.max_pending = max_pending or PENDING_PER_WORKER * self.workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pending_lock = threading.Lock()
+        self._executor_lock = threading.Lock()
+        self._closed = False
+        self.pending = 0
+        self._executor, self.data_version = self._start_executor()
+        dataset.on_reload(self._restart)
+
+    def _start_executor(self):
+        """
+        New workers on the dataset's current snapshot, and that snapshot's version.
+
+        Every worker is started before this returns, so no later submit() forks.
+        """
+        version = self.dataset.version
+        # fork shares the loaded data copy-on-write; elsewhere it is pickled to the workers
+        start_method = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=_init_worker,
+            initargs=(self.dataset, self.points_predictors),
+        )
+        # Start every worker now, so the first requests don't pay for it
+        wait([executor.submit(_ready) for _ in range(self.workers)])
+        return executor, version
+
+    def _restart(self, snapshot):
+        """Dataset reload callback: replaces the workers with ones on the new snapshot."""
+        if self._closed or snapshot.version == self.data_version:
+            return
+        executor, version = self._start_executor()
+        with self._executor_lock:
+            stale = self._executor
+            self._executor, self.data_version = executor, version
+        print(f"Solver workers restarted on data version {version}")
+        # Solves already queued on the old workers still complete
+        stale.shutdown(wait=False)
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queues fn(*args, **kwargs) on the workers.
+
+        Returns:
+            concurrent.futures.Future: Future of the result
+
+        Raises:
+            PoolSaturated: If max_pending solves are already queued or running
+        """
+        if not self._slots.acquire(blocking=False):
+            raise PoolSaturated(f"{self.max_pending} solves already pending")
+        try:
+            # Under the lock, so a restart can't shut the executor down in between
+            with self._executor_lock:
+                future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._pending_lock:
+            self.pending += 1
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _):
+        with self._pending_lock:
+            self.pending -= 1
+        self._slots.release()
+
+    def run(self, fn, *args, timeout=None, **kwargs):
+        """
+        Runs fn on the workers and waits for its result.
+
+        Raises:
+            PoolSaturated: If the queue is full
+            concurrent.futures.TimeoutError: If no result came within the timeout; the solve
+                is cancelled if it hasn't started
+        """
+        future = self.submit(fn, *args, **kwargs)
+        try:
+            return future.result(timeout=self.timeout if timeout is None else timeout)
+        except FuturesTimeoutError:
+            future.cancel()
+            raise
+
+    def shutdown(self):
+        self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
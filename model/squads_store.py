@@ -0,0 +1,156 @@
+import bisect
+import datetime
+import hashlib
+import json
+import os
+import threading
+from match_squads import DATEWISE_SQUADS_PATH
+
+# Date index over datewise_squad.json. The file is split once into month partitions
+# (YYYY-MM.json) next to a sorted list of match dates, and rebuilt only when the source
+# file changes. Partitions are loaded the first time one of their dates is asked for;
+# each date's leagues are serialized once, so a response is a concatenation of cached
+# byte fragments, and its ETag is derived from the fragments' digests.
+
+SQUADS_INDEX_DIR = "../data/processed/squads_index"
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _write_json(payload, path):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(payload, file)
+    os.replace(tmp_path, path)
+
+
+def build_squads_index(source_path=DATEWISE_SQUADS_PATH, index_dir=SQUADS_INDEX_DIR):
+    """
+    Splits datewise_squad.json into month partitions and writes the date index.
+
+    Args:
+        source_path (str): datewise_squad.json
+        index_dir (str): Output directory
+
+    Returns:
+        dict: The index ('source_signature', sorted 'dates', {month: file} 'months')
+    """
+    signature = _signature(source_path)
+    with open(source_path, "r") as file:
+        squads = json.load(file)
+    os.makedirs(index_dir, exist_ok=True)
+    months = {}
+    for date in sorted(squads):
+        months.setdefault(date[:7], {})[date] = squads[date]
+    for month, month_squads in months.items():
+        _write_json(month_squads, os.path.join(index_dir, f"{month}.json"))
+    index = {
+        "source_signature": signature,
+        "dates": sorted(squads),
+        "months": {month: f"{month}.json" for month in months},
+    }
+    # Written last: an index on disk always refers to complete partitions
+    _write_json(index, os.path.join(index_dir, "index.json"))
+    return index
+
+
+class SquadsStore:
+    """
+    Lazily loaded, date-indexed squads with pre-serialized responses.
+
+    Args:
+        source_path (str): datewise_squad.json
+        index_dir (str): Where the month partitions are kept
+    """
+
+    def __init__(self, source_path=DATEWISE_SQUADS_PATH, index_dir=SQUADS_INDEX_DIR):
+        self.source_path = source_path
+        self.index_dir = index_dir
+        self._lock = threading.Lock()
+        self._signature = None
+        self.dates = []
+        self._months = {}
+        # date -> (serialized leagues, digest)
+        self._fragments = {}
+        self.refresh()
+
+    def refresh(self):
+        """Reopens the index (rebuilding it first if needed) when the source file changed."""
+        signature = _signature(self.source_path)
+        if signature == self._signature:
+            return
+        with self._lock:
+            if signature == self._signature:
+                return
+            index = None
+            try:
+                with open(os.path.join(self.index_dir, "index.json"), "r") as file:
+                    index = json.load(file)
+            except (FileNotFoundError, json.JSONDecodeError):
+                pass
+            if index is None or index["source_signature"] != signature:
+                index = build_squads_index(self.source_path, self.index_dir)
+            self._months = index["months"]
+            self.dates = index["dates"]
+            self._fragments = {}
+            self._signature = signature
+
+    def _load_month(self, month):
+        with open(os.path.join(self.index_dir, self._months[month]), "r") as file:
+            month_squads = json.load(file)
+        for date, leagues in month_squads.items():
+            fragment = json.dumps(leagues).encode()
+            self._fragments[date] = (fragment, hashlib.sha1(fragment).hexdigest()[:16])
+
+    def fragment(self, date):
+        """(serialized leagues, digest) of a date, loading its month on first use."""
+        fragment = self._fragments.get(date)
+        if fragment is None:
+            with self._lock:
+                if date not in self._fragments:
+                    self._load_month(date[:7])
+                fragment = self._fragments[date]
+        return fragment
+
+    def __contains__(self, date):
+        i = bisect.bisect_left(self.dates, date)
+        return i < len(self.dates) and self.dates[i] == date
+
+    def dates_between(self, from_date=None, to_date=None):
+        """Match dates in [from_date, to_date]; an open end is unbounded."""
+        start = bisect.bisect_left(self.dates, from_date) if from_date else 0
+        end = bisect.bisect_right(self.dates, to_date) if to_date else len(self.dates)
+        return self.dates[start:end]
+
+    def next_dates(self, date, n):
+        """The first n match dates on or after date."""
+        start = bisect.bisect_left(self.dates, date)
+        return self.dates[start:start + max(0, n)]
+
+    def nearest_date(self, date):
+        """Match date closest to date (the later one on a tie), or None without dates."""
+        i = bisect.bisect_left(self.dates, date)
+        candidates = self.dates[max(0, i - 1):i + 1]
+        if not candidates:
+            return None
+        day = datetime.date.fromisoformat(date).toordinal()
+        return min(
+            reversed(candidates),
+            key=lambda candidate: abs(datetime.date.fromisoformat(candidate).toordinal() - day)
+        )
+
+    def leagues_bytes(self, date):
+        """(JSON bytes of the leagues of one date, ETag)."""
+        return self.fragment(date)
+
+    def dates_bytes(self, dates):
+        """(JSON bytes of {date: leagues} for the dates in order, ETag)."""
+        parts, digest = [], hashlib.sha1()
+        for date in dates:
+            fragment, fragment_digest = self.fragment(date)
+            parts.append(json.dumps(date).encode() + b":" + fragment)
+            digest.update(f"{date}:{fragment_digest};".encode())
+        return b"{" + b",".join(parts) + b"}", digest.hexdigest()[:16]
@@ -0,0 +1,296 @@
+import itertools
+import json
+import os
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from feature_builder import (
+    PAST_FEATURES, AGG_COLS, TARGETS, POINTS_LAGS, NUM_PREV_MATCHES,
+    matches_to_long_frame, build_lag_features, add_aggregate_features,
+)
+
+# Out-of-core training set. Players are processed in chunks (a player's whole history is
+# in one chunk, so lags never cross a chunk boundary) and every chunk is written as a set
+# of .npy shards with fixed dtypes:
+#
+#   X_00000.npy        float32 (rows, n_features), columns in manifest["feature_names"]
+#   y_00000.npy        float32 (rows, 3), columns in manifest["target_names"]
+#   dates_00000.npy    datetime64[D] match date of every row
+#   players_00000.npy  player name of every row
+#   matches_00000.npy  match id of every row
+#
+# manifest.json is written last and lists the shards, so a directory without a manifest
+# is an unfinished run. Shards are read back memory-mapped, one at a time. The feature
+# store (feature_store.py) is the one writer of shard directories.
+
+SHARD_DTYPE = np.float32
+
+def feature_schema(features=PAST_FEATURES, num_prev_matches=NUM_PREV_MATCHES, agg_cols=AGG_COLS):
+    """
+    Returns the fixed feature column order of the shards.
+
+    Args:
+        features (list): Match-level stats that are lagged
+        num_prev_matches (int): Number of lags per stat
+        agg_cols (list): Aggregate stats used as features
+
+    Returns:
+        list: Feature names, lag columns first (build_lag_features order) then aggregates
+    """
+    columns = [
+        f"fantasy_{short}_prev_{k}"
+        for k in range(1, num_prev_matches + 1) for short in POINTS_LAGS
+    ]
+    columns += [f"{feature}_prev_{k}" for feature in features for k in range(1, num_prev_matches + 1)]
+    return columns + list(agg_cols)
+
+
+def categorical_vocabulary(aggregate_data, agg_cols=AGG_COLS):
+    """
+    Collects the values of the text-valued aggregate columns (e.g. batting style).
+
+    Codes are positions in the sorted value list, so every shard encodes them the same way.
+
+    Args:
+        aggregate_data (dict): Per-player aggregate table
+        agg_cols (list): Aggregate stats used as features
+
+    Returns:
+        dict: {column: sorted list of values}
+    """
+    values = {}
+    for stats in aggregate_data.values():
+        for column, value in stats.items():
+            if column in agg_cols and isinstance(value, str):
+                values.setdefault(column, set()).add(value)
+    return {column: sorted(column_values) for column, column_values in values.items()}
+
+
+def encode_features(features_df, feature_names, categories):
+    """
+    Converts a feature frame to a fixed-schema float matrix.
+
+    Missing columns and values become NaN; text columns are replaced by their code in
+    `categories` (NaN when unseen).
+
+    Args:
+        features_df (pd.DataFrame): Feature rows
+        feature_names (list): Column order of the output
+        categories (dict): Output of categorical_vocabulary
+
+    Returns:
+        np.ndarray: (rows, len(feature_names)) array of SHARD_DTYPE
+    """
+    features_df = features_df.reindex(columns=feature_names)
+    for column, column_values in categories.items():
+        if column in features_df:
+            codes = {value: code for code, value in enumerate(column_values)}
+            features_df[column] = features_df[column].map(codes)
+    return features_df.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=SHARD_DTYPE)
+
+
+def iter_feature_chunks(player_data, aggregate_data, players_per_chunk=500,
+                        features=PAST_FEATURES, num_prev_matches=NUM_PREV_MATCHES, agg_cols=AGG_COLS):
+    """
+    Yields lag + aggregate feature frames for successive chunks of players.
+
+    Args:
+        player_data (dict): Processed fantasy points data
+        aggregate_data (dict): Per-player aggregate table
+        players_per_chunk (int): Players per chunk
+        features (list): Match-level stats to lag
+        num_prev_matches (int): Number of lags per stat
+        agg_cols (list): Aggregate stats used as features
+
+    Yields:
+        pd.DataFrame: Feature rows with 'player', 'match_id' and 'date' columns
+    """
+    players = iter(player_data.items())
+    while True:
+        chunk = dict(itertools.islice(players, players_per_chunk))
+        if not chunk:
+            return
+        long_df = matches_to_long_frame(chunk, features)
+        features_df = build_lag_features(long_df, features, num_prev_matches, keep_ids=True)
+        if len(features_df):
+            yield add_aggregate_features(features_df, aggregate_data, agg_cols)
+
+
+def _shard_path(shard_dir, kind, name):
+    return os.path.join(shard_dir, f"{kind}_{name}.npy")
+
+
+def write_shard(shard_dir, name, chunk, feature_names, categories):
+    """
+    Writes one chunk of feature rows as a shard.
+
+    Args:
+        shard_dir (str): Output directory
+        name (str): Shard name
+        chunk (pd.DataFrame): Feature rows with 'player', 'match_id', 'date' and target columns
+        feature_names (list): Feature column order
+        categories (dict): Text column vocabularies
+
+    Returns:
+        dict: Manifest entry of the shard
+    """
+    np.save(_shard_path(shard_dir, "X", name), encode_features(chunk, feature_names, categories))
+    np.save(_shard_path(shard_dir, "y", name), chunk[TARGETS].to_numpy(dtype=SHARD_DTYPE))
+    np.save(_shard_path(shard_dir, "dates", name), chunk["date"].to_numpy(dtype="datetime64[D]"))
+    np.save(_shard_path(shard_dir, "players", name), chunk["player"].to_numpy(dtype=str))
+    np.save(_shard_path(shard_dir, "matches", name), chunk["match_id"].to_numpy(dtype=str))
+    return {"name": name, "rows": len(chunk)}
+
+
+def load_manifest(shard_dir):
+    """
+    Loads the manifest of a shard directory.
+
+    Args:
+        shard_dir (str): Shard directory, e.g. a feature store
+
+    Returns:
+        dict: Manifest
+    """
+    with open(os.path.join(shard_dir, "manifest.json"), "r") as file:
+        return json.load(file)
+
+
+def iter_shards(shard_dirs, with_ids=False):
+    """
+    Yields the shards of one or more shard directories, memory-mapped.
+
+    Args:
+        shard_dirs (str or list): Shard directories (all with the same feature schema)
+        with_ids (bool): Also load the player and match id arrays
+
+    Yields:
+        dict: 'X', 'y' and 'dates' arrays (plus 'players' and 'matches' with with_ids)
+    """
+    if isinstance(shard_dirs, str):
+        shard_dirs = [shard_dirs]
+    for shard_dir in shard_dirs:
+        for shard in load_manifest(shard_dir)["shards"]:
+            name = shard["name"]
+            arrays = {
+                "X": np.load(_shard_path(shard_dir, "X", name), mmap_mode="r"),
+                "y": np.load(_shard_path(shard_dir, "y", name), mmap_mode="r"),
+                "dates": np.load(_shard_path(shard_dir, "dates", name), mmap_mode="r"),
+            }
+            if with_ids:
+                arrays["players"] = np.load(_shard_path(shard_dir, "players", name))
+                arrays["matches"] = np.load(_shard_path(shard_dir, "matches", name))
+            if shard.get("live"):
+                # Rows superseded by a later shard (see feature_store.py) are skipped
+                live = np.load(_shard_path(shard_dir, "live", name))
+                arrays = {key: values[live] for key, values in arrays.items()}
+            yield arrays
+
+
+def load_feature_frame(shard_dirs, columns=None, with_dates=False):
+    """
+    Reads shards into a DataFrame, optionally only some feature columns.
+
+    Args:
+        shard_dirs (str or list): Shard directories
+        columns (list): Feature columns to read (defaults to all)
+        with_dates (bool): Add a 'date' column with the match date of every row
+
+    Returns:
+        pd.DataFrame: Features followed by the target columns (and 'date')
+    """
+    first_dir = shard_dirs if isinstance(shard_dirs, str) else shard_dirs[0]
+    manifest = load_manifest(first_dir)
+    feature_names = manifest["feature_names"]
+    columns = feature_names if columns is None else list(columns)
+    positions = [feature_names.index(column) for column in columns]
+
+    frames = []
+    for shard in iter_shards(shard_dirs):
+        frame = pd.DataFrame(np.asarray(shard["X"][:, positions]), columns=columns)
+        frame[manifest["target_names"]] = np.asarray(shard["y"])
+        if with_dates:
+            frame["date"] = np.asarray(shard["dates"])
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=columns + manifest["target_names"] + (["date"] if with_dates else []))
+    return pd.concat(frames, ignore_index=True)
+
+
+class ShardDataIter(xgb.DataIter):
+    """
+    Feeds shards to XGBoost one at a time, for external-memory or quantized DMatrix builds.
+
+    Args:
+        shard_dirs (str or list): Shard directories
+        target (str): Target column to use as label (None to set labels later)
+        cache_prefix (str): Where XGBoost keeps its external-memory cache (None keeps it in memory)
+        row_filter (function): Optional shard -> boolean mask selecting the rows to use
+        fill_value (float): Replaces missing values, like a DataFrame's fillna (None keeps NaN)
+    """
+
+    def __init__(self, shard_dirs, target=None, cache_prefix=None, row_filter=None, fill_value=None):
+        self.shard_dirs = [shard_dirs] if isinstance(shard_dirs, str) else list(shard_dirs)
+        manifest = load_manifest(self.shard_dirs[0])
+        self.feature_names = manifest["feature_names"]
+        self.target_index = None if target is None else manifest["target_names"].index(target)
+        self.row_filter = row_filter
+        self.fill_value = fill_value
+        self._shards = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        shard = next(self._shards, None)
+        if shard is None:
+            return False
+        X = shard["X"]
+        mask = slice(None) if self.row_filter is None else self.row_filter(shard)
+        batch = {"data": np.asarray(X[mask]), "feature_names": self.feature_names}
+        if self.target_index is not None:
+            batch["label"] = np.asarray(shard["y"][mask, self.target_index])
+        if self.fill_value is not None:
+            batch = {key: np.nan_to_num(value, nan=self.fill_value) if key != "feature_names" else value
+                     for key, value in batch.items()}
+        input_data(**batch)
+        return True
+
+    def reset(self):
+        self._shards = iter_shards(self.shard_dirs)
+
+
+def load_targets(shard_dirs, row_filter=None, fill_value=None):
+    """
+    Reads the target columns of the shards.
+
+    Args:
+        shard_dirs (str or list): Shard directories
+        row_filter (function): Optional shard -> boolean mask, as for ShardDataIter
+        fill_value (float): Replaces missing values (None keeps NaN)
+
+    Returns:
+        dict: {target: np.ndarray} in shard order
+    """
+    first_dir = shard_dirs if isinstance(shard_dirs, str) else shard_dirs[0]
+    target_names = load_manifest(first_dir)["target_names"]
+    blocks = []
+    for shard in iter_shards(shard_dirs):
+        mask = slice(None) if row_filter is None else row_filter(shard)
+        blocks.append(np.asarray(shard["y"][mask]))
+    y = np.concatenate(blocks) if blocks else np.empty((0, len(target_names)), dtype=SHARD_DTYPE)
+    if fill_value is not None:
+        y = np.nan_to_num(y, nan=fill_value)
+    return {target: y[:, i] for i, target in enumerate(target_names)}
+
+
+def load_dates(shard_dirs):
+    """
+    Reads the match date of every row of the shards.
+
+    Args:
+        shard_dirs (str or list): Shard directories
+
+    Returns:
+        np.ndarray: datetime64[D] dates in shard order
+    """
+    blocks = [np.asarray(shard["dates"]) for shard in iter_shards(shard_dirs)]
+    return np.concatenate(blocks) if blocks else np.empty(0, dtype="datetime64[D]")
@@ -9,6 +9,9 @@ import re
 import numpy as np
 import scipy.stats as stats
 from heuristic_solver import compute_player_stats, compute_covariance_matrix, optimize_team_advanced,load_player_fantasy_points_for_optimization
+from match_index import build_match_index
+from solve_cache import SolveCache, problem_key
+from fantasy_dataset import dataset_version
 import pandas as pd
 from tqdm import tqdm
 
@@ -31,7 +34,8 @@ def extract_date_from_match_key(match_key):
 def get_team_selection_snapshot(match_keys, match_data, fantasy_points, 
                            optim_fantasy_points_t20, optim_fantasy_points_odi, 
                            optim_fantasy_points_test, num_matches=50,
-                           from_date=None, to_date=None, consistency_threshold= 0.5, diversity_threshold =0.5, form_threshold =0.3333, quantile_form =75):
+                           from_date=None, to_date=None, consistency_threshold= 0.5, diversity_threshold =0.5, form_threshold =0.3333, quantile_form =75,
+                           match_index=None, solve_cache=None, data_version=None):
     """
     Generate a CSV snapshot of team selections for a specified date range and match count
     
@@ -45,11 +49,23 @@ def get_team_selection_snapshot(match_keys, match_data, fantasy_points,
     num_matches (int): Number of past matches to consider for computing statistics (default: 50)
     from_date (str): Start date in 'YYYY-MM-DD' format (inclusive)
     to_date (str): End date in 'YYYY-MM-DD' format (inclusive)
+    match_index (MatchPointsIndex, optional): Prebuilt match -> player points index;
+        built from the three optim dicts when not given
+    solve_cache (SolveCache, optional): Selections are looked up there before optimizing,
+        so experiments sharing num_matches and thresholds reuse each other's teams
+    data_version (str, optional): dataset_version of the fantasy points files, required
+        with solve_cache
     
     Returns:
     pd.DataFrame: DataFrame containing team selections and scores
     """
     snapshot_data = []
+    selections = {}
+    squad_players = {}
+    if match_index is None:
+        match_index = build_match_index(
+            optim_fantasy_points_t20, optim_fantasy_points_odi, optim_fantasy_points_test
+        )
     
     # Convert date strings to datetime objects if provided
     from_date_dt = None
@@ -112,15 +128,22 @@ def get_team_selection_snapshot(match_keys, match_data, fantasy_points,
         # Remove duplicates while preserving order
         all_players = list(dict.fromkeys(all_players))
         
-        # Get player stats and optimize team using specified number of matches
-        stats_df = compute_player_stats(
-            optim_fantasy_points,
-            list(all_players),
-            num_matches=num_matches,
-            date_of_match=match_date_str
-        )
-        
-        if not stats_df.empty:
+        params = {"pipeline": "snapshot", "optimizer": "optimize_team_advanced", "num_matches": num_matches,
+                  "consistency_threshold": consistency_threshold, "diversity_threshold": diversity_threshold,
+                  "form_threshold": form_threshold}
+        format_name = 'T20' if match_key.endswith('T20') else 'ODI' if match_key.endswith('ODM') or match_key.endswith('ODI') else 'Test'
+
+        def solve():
+            # Get player stats and optimize team using specified number of matches
+            stats_df = compute_player_stats(
+                optim_fantasy_points,
+                list(all_players),
+                num_matches=num_matches,
+                date_of_match=match_date_str
+            )
+            if stats_df.empty:
+                return {"best_team": [], "stats_df": stats_df, "cov_matrix": None}
+
             # Compute covariance matrix using specified number of matches
             cov_matrix = compute_covariance_matrix(
                 optim_fantasy_points,
@@ -128,30 +151,32 @@ def get_team_selection_snapshot(match_keys, match_data, fantasy_points,
                 num_matches=num_matches,
                 date_of_match=match_date_str
             )
-            
+
             # Add team information
             stats_df['team'] = stats_df['player'].map(player_team_mapping)
-            
+
             # Optimize team using advanced optimizer
-            selected_players, weights_df = optimize_team_advanced(
-                stats_df, 
+            selected_players, _ = optimize_team_advanced(
+                stats_df,
                 cov_matrix,
                 boolean=True,
                 consistency_threshold=consistency_threshold,
                 diversity_threshold=diversity_threshold,
                 form_threshold=form_threshold
             )
-            
-            if weights_df is not None and not weights_df.empty:
-                # Merge weights with stats
-                weights_df_display = weights_df.merge(
-                    stats_df[['player', 'mean_points', 'variance']],
-                    on='player',
-                    how='left'
-                )
-                
-                # Calculate team metrics
-                total_expected_score = (weights_df_display['weight'] * weights_df_display['mean_points']).sum()
+            return {"best_team": selected_players, "stats_df": stats_df, "cov_matrix": cov_matrix}
+
+        if solve_cache is None:
+            result = solve()
+        else:
+            key = problem_key(squads, match_date_str, format_name, params)
+            result = solve_cache.get_or_solve(data_version, key, solve)
+        selected_players, stats_df, cov_matrix = result['best_team'], result['stats_df'], result['cov_matrix']
+
+        if not stats_df.empty:
+            if selected_players:
+                # Selected players have weight 1
+                total_expected_score = stats_df.loc[stats_df['player'].isin(selected_players), 'mean_points'].sum()
                 
                 # Calculate team variance and standard deviation
                 selected_indices = [stats_df.index[stats_df['player'] == player].tolist()[0] 
@@ -161,32 +186,20 @@ def get_team_selection_snapshot(match_keys, match_data, fantasy_points,
                 team_variance = weights.dot(selected_cov).dot(weights)
                 team_std = np.sqrt(team_variance)
                 
-                # Calculate actual points for the match
-                actual_points = sum(
-                    optim_fantasy_points.get(player, {}).get(match_key, {}).get('total_points', 0)
-                    for player in selected_players
-                )
-                
-                # Get top 11 players by actual points
-                player_points = {
-                    player: optim_fantasy_points.get(player, {}).get(match_key, {}).get('total_points', 0)
-                    for player in all_players
-                }
-                top_11_by_actual = (pd.DataFrame(list(player_points.items()), 
-                                               columns=['player', 'actual_points'])
-                                  .nlargest(11, 'actual_points'))
-                optimal_score = top_11_by_actual['actual_points'].sum()
+                # Actual and hindsight-optimal scores are computed for all matches at once below
+                selections[match_key] = selected_players
+                squad_players[match_key] = all_players
                 
                 # Create row data
                 row_data = {
                     'match_name': match_key,
                     'match_date': match_date_str,
-                    'format': 'T20' if match_key.endswith('T20') else 'ODI' if match_key.endswith('ODM') else 'Test',
+                    'format': format_name,
                     'predicted_score': total_expected_score,
                     'predicted_std': team_std,
-                    'actual_score': actual_points,
-                    'optimal_score': optimal_score,
-                    'performance_ratio': actual_points / optimal_score if optimal_score > 0 else 0,
+                    'actual_score': None,
+                    'optimal_score': None,
+                    'performance_ratio': None,
                     'num_matches_used': num_matches  # Added for tracking
                 }
                 
@@ -197,13 +210,19 @@ def get_team_selection_snapshot(match_keys, match_data, fantasy_points,
                         row_data[f'Player{i}'] = player
                         row_data[f'Predicted_score{i}'] = player_stats['mean_points'].iloc[0]
                 
-                # Add top performers and their actual scores
-                for i, (_, row) in enumerate(top_11_by_actual.iterrows(), 1):
-                    row_data[f'Top_player{i}'] = row['player']
-                    row_data[f'Top_score{i}'] = row['actual_points']
-                
                 snapshot_data.append(row_data)
     
+    # Score every selected team against the actual and hindsight-optimal XI of its squad in one pass
+    scores = match_index.score_selections(selections, candidates=squad_players)
+    for row_data in snapshot_data:
+        match_key = row_data['match_name']
+        row_data.update(scores.loc[match_key].to_dict())
+        
+        # Add top performers and their actual scores
+        for i, (player, points) in enumerate(match_index.match_top_k(match_key, 11, squad_players[match_key]), 1):
+            row_data[f'Top_player{i}'] = player
+            row_data[f'Top_score{i}'] = points
+    
     # Create final DataFrame and sort by date
     snapshot_df = pd.DataFrame(snapshot_data)
     if not snapshot_df.empty:
@@ -223,7 +242,9 @@ def run_optimization_cv(match_keys: List[str],
                        optim_fantasy_points_t20: Dict,
                        optim_fantasy_points_odi: Dict,
                        optim_fantasy_points_test: Dict,
-                       output_file: str = 'optimization_cv_results.json'):
+                       output_file: str = 'optimization_cv_results.json',
+                       solve_cache: SolveCache = None,
+                       data_version: str = None):
     """
     Run cross-validation style analysis for team optimization parameters.
     
@@ -235,6 +256,8 @@ def run_optimization_cv(match_keys: List[str],
         optim_fantasy_points_odi: Dictionary containing optimized fantasy points for ODI
         optim_fantasy_points_test: Dictionary containing optimized fantasy points for Test
         output_file: Path to store results JSON
+        solve_cache: Optional cache of team selections shared across experiments and runs
+        data_version: dataset_version of the fantasy points files, required with solve_cache
     """
     # Define parameter ranges
     num_matches_range = range(20,81,5)
@@ -278,6 +301,11 @@ def run_optimization_cv(match_keys: List[str],
                        len(diversity_range))
     print(f"Total experiments to run: {total_iterations}")
     
+    # Actual points and hindsight top-11 do not depend on the parameters, index them once
+    match_index = build_match_index(
+        optim_fantasy_points_t20, optim_fantasy_points_odi, optim_fantasy_points_test
+    )
+    
     # Run optimization for each parameter combination
     for nm in tqdm(num_matches_range, desc="Num Matches"):
         for cons in consistency_range:
@@ -307,7 +335,10 @@ def run_optimization_cv(match_keys: List[str],
                             to_date='2024-07-06',
                             consistency_threshold=cons,
                             diversity_threshold= div,
-                            quantile_form=quantile
+                            quantile_form=quantile,
+                            match_index=match_index,
+                            solve_cache=solve_cache,
+                            data_version=data_version
                         )
                         
                         # Calculate metrics
@@ -406,6 +437,8 @@ if __name__ == "__main__":
         optim_fantasy_points_t20=load_player_fantasy_points_for_optimization(all_paths[0]),
         optim_fantasy_points_odi=load_player_fantasy_points_for_optimization(all_paths[1]),
         optim_fantasy_points_test=load_player_fantasy_points_for_optimization(all_paths[2]),
+        solve_cache=SolveCache(),
+        data_version=dataset_version(dict(zip(["T20", "ODI", "Test"], all_paths))),
     )
     print(results)
     # Analyze results
@@ -10,6 +10,7 @@ import numpy as np
 import scipy.stats as stats
 # from heuristic_solver import compute_player_stats, compute_covariance_matrix, optimize_team_advanced
 import pandas as pd
+from fantasy_data import load_fantasy_points_store, with_aggregate_stats
 
 def extract_date_from_match_key(match_key):
   date_pattern = r'(\d{4}-\d{2}-\d{2})'
@@ -272,30 +273,33 @@ def calculate_team_metrics(stats_df, weights_df, cov_matrix, quantile_form=75):
             'diversity_score': 0,
             'form_score': 0
         }
-def load_player_fantasy_points(json_file):
+def load_player_fantasy_points(json_file, with_aggregates=False):
     """
     Loads and sorts player fantasy points data from a JSON file.
     
     Args:
         json_file (str): Path to JSON file containing player data
+        with_aggregates (bool or str, optional): Also expose the player's career aggregate
+            stats on every match record, joined lazily; True uses the table of the file's
+            format, a str is the table's path
     
     Returns:
         dict: Sorted player fantasy points data
     """
-    with open(json_file, "r") as file:
-        data = json.load(file)
-        sorted_data = {}
-        for player, matches in data.items():
-            match_list = list(matches.items())
-            match_list_sorted = sorted(
-                match_list,
-                key=lambda x: datetime.datetime.strptime(
-                    re.search(r'(\d{4}-\d{2}-\d{2})', x[0]).group(1),
-                    '%Y-%m-%d'
-                ) if re.search(r'(\d{4}-\d{2}-\d{2})', x[0]) else datetime.datetime.min
-            )
-            sorted_data[player] = match_list_sorted
-        return sorted_data
+    # Store plus the records appended by incremental refreshes
+    data = load_fantasy_points_store(json_file)
+    sorted_data = {}
+    for player, matches in data.items():
+        match_list = list(matches.items())
+        match_list_sorted = sorted(
+            match_list,
+            key=lambda x: datetime.datetime.strptime(
+                re.search(r'(\d{4}-\d{2}-\d{2})', x[0]).group(1),
+                '%Y-%m-%d'
+            ) if re.search(r'(\d{4}-\d{2}-\d{2})', x[0]) else datetime.datetime.min
+        )
+        sorted_data[player] = match_list_sorted
+    return with_aggregate_stats(sorted_data, json_file, with_aggregates)
 
 # Initialize OpenAI client
 load_dotenv()
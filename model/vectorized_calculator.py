@@ -0,0 +1,332 @@
+import numpy as np
+import pandas as pd
+from scoring_rules import RULE_SETS, NAN_DEFAULT_COLUMNS, T20_RULES, ODI_RULES, TEST_RULES
+
+# Vectorized fantasy points scoring. The rule tables in scoring_rules.py are compiled
+# into kernels that take a columnar batch of player-match stats (a DataFrame with the
+# same keys the scalar calculators read) and return arrays. Rules are applied in the
+# same order as the scalar if/elif ladders so the results match them exactly: only a
+# missing stat takes the scalar default (a NaN that is present propagates), and a points
+# value the scalar code computes in int arithmetic is flagged so it can be written as int.
+
+COMPONENTS = ("batting", "bowling", "fielding")
+POINT_COLUMNS = ["total_points", "batting_points", "bowling_points", "fielding_points"]
+# Column flagging the rows whose points the scalar calculators compute as int
+IS_INT_COLUMNS = {key: f"{key}_is_int" for key in POINT_COLUMNS}
+
+
+def _column_default(name):
+    return np.nan if name in NAN_DEFAULT_COLUMNS else 0
+
+
+def _column(batch, name):
+    """
+    Returns a column as float64 and a mask of the rows whose value is a float.
+
+    Missing values (None, or an absent column) take the scalar default; NaN values are
+    kept. A numeric column can't tell a missing value from NaN, so there NaN is treated
+    as missing; player_match_frame builds object columns that keep the difference.
+    For NAN_DEFAULT_COLUMNS the scalar code has no default and raises TypeError on the
+    None; here the row just gets no band bonus, so a batch is never rejected.
+    """
+    default = _column_default(name)
+    default_is_float = isinstance(default, float)
+    if name not in batch:
+        return np.full(len(batch), default, dtype=float), np.full(len(batch), default_is_float)
+    column = batch[name]
+    if column.dtype == object:
+        raw = column.to_numpy()
+        missing = np.fromiter((value is None for value in raw), dtype=bool, count=len(raw))
+        is_float = np.fromiter((isinstance(value, float) for value in raw), dtype=bool, count=len(raw))
+        values = pd.to_numeric(column, errors="coerce").to_numpy(dtype=float)
+    else:
+        values = column.to_numpy(dtype=float)
+        missing = np.isnan(values)
+        is_float = np.full(len(values), column.dtype.kind == "f")
+    return np.where(missing, default, values), np.where(missing, default_is_float, is_float)
+
+
+def _expand(column, innings):
+    """Expands an "{i}" column template over the listed innings."""
+    if "{i}" not in column:
+        return [column]
+    return [column.format(i=i) for i in innings]
+
+
+def _band_mask(values, low, high, closed):
+    mask = ~np.isnan(values)
+    if low is not None:
+        mask &= (values >= low) if closed in ("both", "left") else (values > low)
+    if high is not None:
+        mask &= (values <= high) if closed in ("both", "right") else (values < high)
+    return mask
+
+
+def _compile_per_unit(rule):
+    columns = rule["column"] if isinstance(rule["column"], tuple) else (rule["column"],)
+    points = rule["points"]
+
+    def term(get):
+        total = get(columns[0])
+        for column in columns[1:]:
+            total = total + get(column)
+        return total * points
+    return [term], set(columns)
+
+
+def _compile_bands(rule):
+    bands = rule["bands"]
+    band_points = [band[2] for band in bands]
+    min_column, min_value = rule.get("min", (None, None))
+    columns = _expand(rule["column"], rule.get("innings", ()))
+
+    def make_term(column):
+        def term(get):
+            values = get(column)
+            bonus = np.select([_band_mask(values, low, high, closed) for low, high, _, closed in bands],
+                              band_points, 0)
+            if min_column is not None:
+                bonus = np.where(get(min_column) >= min_value, bonus, 0)
+            return bonus
+        return term
+
+    used = set(columns) | ({min_column} if min_column else set())
+    return [make_term(column) for column in columns], used
+
+
+def _compile_duck(rule):
+    innings = rule["innings"]
+    points = rule["points"]
+    not_played = [f"How Out Inning {i} (Not Played)" for i in innings]
+    not_out = [f"How Out Inning {i} (not out)" for i in innings]
+    used = set(not_played) | set(not_out)
+
+    def dismissed(get, k):
+        return (get(not_played[k]) == 0) & (get(not_out[k]) == 0)
+
+    if rule.get("per_innings"):
+        runs_columns = _expand(rule.get("runs_column", "Innings {i} Runs"), innings)
+        balls_columns = _expand(rule.get("balls_column", "Balls Faced Inning {i}"), innings)
+
+        def make_term(k):
+            def term(get):
+                duck = (get(runs_columns[k]) == 0) & dismissed(get, k) & (get(balls_columns[k]) > 0)
+                return np.where(duck, points, 0)
+            return term
+        return [make_term(k) for k in range(len(innings))], used | set(runs_columns) | set(balls_columns)
+
+    runs_column = rule.get("runs_column", "Total Runs Scored")
+    balls_column = rule.get("balls_column", "Balls Faced")
+
+    def term(get):
+        out_in_any_inning = dismissed(get, 0)
+        for k in range(1, len(innings)):
+            out_in_any_inning = out_in_any_inning | dismissed(get, k)
+        duck = (get(runs_column) == 0) & out_in_any_inning & (get(balls_column) > 0)
+        return np.where(duck, points, 0)
+    return [term], used | {runs_column, balls_column}
+
+
+_RULE_COMPILERS = {
+    "per_unit": _compile_per_unit,
+    "bands": _compile_bands,
+    "duck": _compile_duck,
+}
+
+
+def compile_rule_set(rule_set):
+    """
+    Compiles a declarative rule set into a single vectorized scoring kernel.
+
+    Args:
+        rule_set (dict): Rule table in the layout described in scoring_rules.py
+
+    Returns:
+        function: kernel(batch) -> dict with 'total_points', 'batting_points',
+        'bowling_points' and 'fielding_points' arrays aligned with the batch rows, and
+        for each of them a '<key>_is_int' mask of the rows the scalar calculators compute
+        as int. The kernel exposes the stat columns it reads as `kernel.columns`.
+    """
+    compiled = {}
+    # Columns added into the points (not just compared), which make them float if they are
+    summed_columns = {}
+    columns = set()
+    for component in COMPONENTS:
+        terms = []
+        summed_columns[component] = []
+        for rule in rule_set.get(component, []):
+            if rule["type"] not in _RULE_COMPILERS:
+                raise ValueError(f"Unknown scoring rule type: {rule['type']}")
+            rule_terms, rule_columns = _RULE_COMPILERS[rule["type"]](rule)
+            terms.extend(rule_terms)
+            columns |= rule_columns
+            if rule["type"] == "per_unit":
+                summed_columns[component].extend(
+                    rule["column"] if isinstance(rule["column"], tuple) else (rule["column"],)
+                )
+        compiled[component] = terms
+    appearance_points = rule_set.get("appearance_points", 0)
+
+    def kernel(batch):
+        cache = {}
+
+        def column(name):
+            if name not in cache:
+                cache[name] = _column(batch, name)
+            return cache[name]
+
+        def get(name):
+            return column(name)[0]
+
+        points, is_int = {}, {}
+        for component in COMPONENTS:
+            component_points = np.zeros(len(batch))
+            for term in compiled[component]:
+                component_points += term(get)
+            points[f"{component}_points"] = component_points
+            # Python int arithmetic stays int until a float value is added in
+            component_is_float = np.zeros(len(batch), dtype=bool)
+            for name in summed_columns[component]:
+                component_is_float |= column(name)[1]
+            is_int[f"{component}_points"] = ~component_is_float
+
+        total_points = points["batting_points"] + points["bowling_points"] + points["fielding_points"]
+        # assuming every player is playing
+        total_points += appearance_points
+        is_int["total_points"] = (is_int["batting_points"] & is_int["bowling_points"]
+                                  & is_int["fielding_points"] & isinstance(appearance_points, int))
+        return {
+            "total_points": total_points, **points,
+            **{IS_INT_COLUMNS[key]: mask for key, mask in is_int.items()}
+        }
+
+    kernel.columns = sorted(columns)
+    return kernel
+
+
+calculate_fantasy_points_t20_vectorized = compile_rule_set(T20_RULES)
+calculate_fantasy_points_odi_vectorized = compile_rule_set(ODI_RULES)
+calculate_fantasy_points_test_vectorized = compile_rule_set(TEST_RULES)
+
+FORMAT_SCORERS = {
+    "T20": calculate_fantasy_points_t20_vectorized,
+    "ODI": calculate_fantasy_points_odi_vectorized,
+    "Test": calculate_fantasy_points_test_vectorized,
+}
+
+# Stat columns read by any of the built-in formats
+SCORING_COLUMNS = sorted(set().union(*(scorer.columns for scorer in FORMAT_SCORERS.values())))
+
+
+def player_match_frame(player_data, columns=None):
+    """
+    Flattens {player: {match_id: stats}} into a columnar batch for the vectorized scorers.
+
+    Args:
+        player_data (dict): Interim player match data
+        columns (list): Stat columns to extract (defaults to SCORING_COLUMNS)
+
+    Returns:
+        pd.DataFrame: One row per player-match with 'player', 'match_id' and stat columns;
+        stat columns keep the raw values (object dtype), so ints, floats, NaN and missing
+        values stay distinguishable
+    """
+    columns = SCORING_COLUMNS if columns is None else columns
+    players, match_ids, records = [], [], []
+    for player, matches in player_data.items():
+        for match_id, stats in matches.items():
+            players.append(player)
+            match_ids.append(match_id)
+            records.append(stats)
+
+    frame = {"player": players, "match_id": match_ids}
+    for column in columns:
+        frame[column] = pd.Series([stats.get(column) for stats in records], dtype=object)
+    return pd.DataFrame(frame)
+
+
+def match_format(match_ids, rule_sets=None):
+    """
+    Maps match ids to their scoring format from the id suffix.
+
+    Args:
+        match_ids (array-like): Match identifiers
+        rule_sets (dict): Format name -> rule set (defaults to RULE_SETS)
+
+    Returns:
+        np.ndarray: Format name per match, None for unknown formats
+    """
+    rule_sets = RULE_SETS if rule_sets is None else rule_sets
+    match_ids = pd.Series(match_ids, dtype=object).astype(str)
+    formats = np.full(len(match_ids), None, dtype=object)
+    for format_name, rule_set in rule_sets.items():
+        mask = match_ids.str.endswith(tuple(rule_set["match_suffixes"])).to_numpy()
+        formats[mask & pd.isna(formats)] = format_name
+    return formats
+
+
+def calculate_fantasy_points_vectorized(batch, rule_sets=None):
+    """
+    Scores a mixed-format batch, dispatching each row on its match id suffix.
+
+    Args:
+        batch (pd.DataFrame): Columnar batch with a 'match_id' column, e.g. from player_match_frame
+        rule_sets (dict): Format name -> rule set to score with (defaults to RULE_SETS)
+
+    Returns:
+        pd.DataFrame: 'total_points', 'batting_points', 'bowling_points' and 'fielding_points'
+        aligned with the batch rows (NaN for rows with an unknown format), and the
+        IS_INT_COLUMNS masks
+    """
+    if rule_sets is None:
+        scorers, rule_sets = FORMAT_SCORERS, RULE_SETS
+    else:
+        scorers = {name: compile_rule_set(rule_set) for name, rule_set in rule_sets.items()}
+
+    formats = match_format(batch["match_id"], rule_sets)
+    result = pd.DataFrame(np.nan, index=batch.index, columns=POINT_COLUMNS)
+    for key in POINT_COLUMNS:
+        result[IS_INT_COLUMNS[key]] = False
+    for format_name, scorer in scorers.items():
+        mask = formats == format_name
+        if mask.any():
+            points = scorer(batch[mask])
+            for key, values in points.items():
+                result.loc[mask, key] = values
+    return result
+
+
+def compare_rule_sets(batch, candidate_rule_sets, baseline_rule_sets=None):
+    """
+    Benchmarks candidate rule sets against the current ones on historical data.
+
+    Args:
+        batch (pd.DataFrame): Historical player-match batch, e.g. from player_match_frame
+        candidate_rule_sets (dict): Format name -> candidate rule set
+        baseline_rule_sets (dict): Format name -> rule set to compare against (defaults to RULE_SETS)
+
+    Returns:
+        pd.DataFrame: Per format and points component, the baseline and candidate mean,
+        the mean absolute change and the fraction of player-matches whose points changed
+    """
+    baseline_rule_sets = RULE_SETS if baseline_rule_sets is None else baseline_rule_sets
+    baseline = calculate_fantasy_points_vectorized(batch, baseline_rule_sets)
+    candidate = calculate_fantasy_points_vectorized(batch, candidate_rule_sets)
+    formats = match_format(batch["match_id"], candidate_rule_sets)
+
+    rows = []
+    for format_name in candidate_rule_sets:
+        mask = formats == format_name
+        for key in POINT_COLUMNS:
+            difference = candidate.loc[mask, key] - baseline.loc[mask, key]
+            # Rows left without points (a NaN stat) under both rule sets are unchanged
+            changed = difference.ne(0) & ~(candidate.loc[mask, key].isna() & baseline.loc[mask, key].isna())
+            rows.append({
+                "format": format_name,
+                "component": key,
+                "baseline_mean": baseline.loc[mask, key].mean(),
+                "candidate_mean": candidate.loc[mask, key].mean(),
+                "mean_abs_change": difference.abs().mean(),
+                "changed_fraction": changed.mean() if mask.any() else 0.0
+            })
+    return pd.DataFrame(rows)
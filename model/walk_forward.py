@@ -0,0 +1,187 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from training_data import SHARD_DTYPE, iter_shards, load_manifest
+from points_models import NUM_BOOST_ROUND, quantile_dmatrix, train_points_models
+
+# Walk-forward evaluation of the points models. Rows are partitioned by match date into
+# seasons (calendar years); fold i trains on every match before season i and tests on
+# season i, so no fold ever sees a match from its own future. The train/test matrices of
+# each fold are materialized once as .npy files keyed on the shard data, and the folds are
+# trained in parallel worker processes that memory-map them and stream them to XGBoost
+# a block of rows at a time.
+
+FOLD_CACHE_DIR = "../data/features/walk_forward_cache"
+# Rows of a memory-mapped fold matrix handed to XGBoost at a time
+BLOCK_ROWS = 65536
+
+
+def _shards_digest(shard_dirs):
+    """Digest of the shard manifests, used to invalidate cached fold matrices."""
+    digest = hashlib.sha1()
+    for shard_dir in shard_dirs:
+        manifest_path = os.path.join(shard_dir, "manifest.json")
+        with open(manifest_path, "rb") as file:
+            digest.update(file.read())
+        digest.update(str(os.stat(manifest_path).st_mtime_ns).encode())
+    return digest.hexdigest()[:12]
+
+
+def season_folds(shard_dirs, n_folds=5):
+    """
+    Chooses the test seasons of the walk-forward folds.
+
+    Args:
+        shard_dirs (list): Shard directories
+        n_folds (int): Number of folds (the most recent seasons with earlier data)
+
+    Returns:
+        list: (train_end, test_end) date pairs; a fold trains on dates < train_end and
+        tests on train_end <= date < test_end
+    """
+    years = set()
+    for shard in iter_shards(shard_dirs):
+        years.update(np.unique(shard["dates"].astype("datetime64[Y]").astype(int) + 1970).tolist())
+    seasons = sorted(years)[1:]  # the first season has nothing to train on
+    return [
+        (np.datetime64(f"{year}-01-01"), np.datetime64(f"{year + 1}-01-01"))
+        for year in seasons[-n_folds:]
+    ]
+
+
+def _materialize_fold(shard_dirs, train_end, test_end, fold_dir):
+    """Writes the train/test matrices of one fold, unless they are already cached."""
+    if os.path.exists(os.path.join(fold_dir, "done")):
+        return
+    os.makedirs(fold_dir, exist_ok=True)
+
+    def masks(dates):
+        return {"train": dates < train_end, "test": (dates >= train_end) & (dates < test_end)}
+
+    # First pass sizes the outputs so they can be filled shard by shard without
+    # holding the fold in memory
+    sizes = {"train": 0, "test": 0}
+    n_features = n_targets = 0
+    for shard in iter_shards(shard_dirs):
+        for split, mask in masks(shard["dates"]).items():
+            sizes[split] += int(mask.sum())
+        n_features, n_targets = shard["X"].shape[1], shard["y"].shape[1]
+
+    outputs, filled = {}, {"train": 0, "test": 0}
+    for split, size in sizes.items():
+        outputs[f"X_{split}"] = np.lib.format.open_memmap(
+            os.path.join(fold_dir, f"X_{split}.npy"), mode="w+", dtype=SHARD_DTYPE, shape=(size, n_features))
+        outputs[f"y_{split}"] = np.lib.format.open_memmap(
+            os.path.join(fold_dir, f"y_{split}.npy"), mode="w+", dtype=SHARD_DTYPE, shape=(size, n_targets))
+
+    for shard in iter_shards(shard_dirs):
+        for split, mask in masks(shard["dates"]).items():
+            start, end = filled[split], filled[split] + int(mask.sum())
+            outputs[f"X_{split}"][start:end] = shard["X"][mask]
+            outputs[f"y_{split}"][start:end] = shard["y"][mask]
+            filled[split] = end
+    for array in outputs.values():
+        array.flush()
+    del outputs
+    open(os.path.join(fold_dir, "done"), "w").close()
+
+
+class _MemmapDataIter(xgb.DataIter):
+    """Feeds a memory-mapped matrix to XGBoost a block of rows at a time, so it is never copied whole."""
+
+    def __init__(self, X, block_rows=BLOCK_ROWS):
+        self.X = X
+        self.block_rows = block_rows
+        self._start = 0
+        super().__init__()
+
+    def next(self, input_data):
+        if self._start >= len(self.X):
+            return False
+        input_data(data=np.asarray(self.X[self._start:self._start + self.block_rows]))
+        self._start += self.block_rows
+        return True
+
+    def reset(self):
+        self._start = 0
+
+
+def _train_fold(fold_dir, target_names, params, num_boost_round):
+    """Worker: trains the points models of one fold and returns the test RMSE per target."""
+    X_train = np.load(os.path.join(fold_dir, "X_train.npy"), mmap_mode="r")
+    y_train = np.load(os.path.join(fold_dir, "y_train.npy"), mmap_mode="r")
+    X_test = np.load(os.path.join(fold_dir, "X_test.npy"), mmap_mode="r")
+    y_test = np.load(os.path.join(fold_dir, "y_test.npy"), mmap_mode="r")
+
+    dtrain = quantile_dmatrix(_MemmapDataIter(X_train))
+    dtest = quantile_dmatrix(_MemmapDataIter(X_test), ref=dtrain)
+    _, timings, rmse = train_points_models(
+        dtrain,
+        {target: np.asarray(y_train[:, i]) for i, target in enumerate(target_names)},
+        params=params,
+        num_boost_round=num_boost_round,
+        dvalid=dtest,
+        valid_labels={target: np.asarray(y_test[:, i]) for i, target in enumerate(target_names)},
+    )
+    return len(X_train), len(X_test), rmse, timings
+
+
+def run_walk_forward(shard_dirs, n_folds=5, workers=None, params=None,
+                     num_boost_round=NUM_BOOST_ROUND, cache_dir=FOLD_CACHE_DIR):
+    """
+    Runs walk-forward cross-validation of the batting/bowling/fielding models.
+
+    Args:
+        shard_dirs (str or list): Feature shard directories (see training_data.py)
+        n_folds (int): Number of test seasons
+        workers (int): Worker processes (defaults to one per core, at most n_folds)
+        params (dict): XGBoost parameters on top of POINTS_MODEL_PARAMS
+        num_boost_round (int): Boosting rounds per target
+        cache_dir (str): Where fold matrices are cached
+
+    Returns:
+        pd.DataFrame: One row per fold and target with the season bounds, train/test
+        sizes, RMSE and training wall time
+    """
+    shard_dirs = [shard_dirs] if isinstance(shard_dirs, str) else list(shard_dirs)
+    target_names = load_manifest(shard_dirs[0])["target_names"]
+    folds = season_folds(shard_dirs, n_folds)
+    if not folds:
+        print("Not enough seasons for walk-forward evaluation")
+        return pd.DataFrame()
+
+    digest = _shards_digest(shard_dirs)
+    fold_dirs = []
+    for train_end, test_end in folds:
+        fold_dir = os.path.join(cache_dir, f"{digest}_{train_end}_{test_end}")
+        _materialize_fold(shard_dirs, train_end, test_end, fold_dir)
+        fold_dirs.append(fold_dir)
+
+    workers = workers or min(len(folds), os.cpu_count() or 1)
+    # Split the cores between the workers instead of letting every fold use all of them
+    fold_params = {"nthread": max(1, (os.cpu_count() or 1) // workers), **(params or {})}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_train_fold, fold_dir, target_names, fold_params, num_boost_round)
+            for fold_dir in fold_dirs
+        ]
+        results = [future.result() for future in futures]
+
+    rows = []
+    for fold, ((train_end, test_end), (n_train, n_test, rmse, timings)) in enumerate(zip(folds, results)):
+        for target in target_names:
+            rows.append({
+                "fold": fold,
+                "test_start": str(train_end),
+                "test_end": str(test_end),
+                "n_train": n_train,
+                "n_test": n_test,
+                "target": target,
+                "rmse": rmse.get(target, np.nan),
+                "train_seconds": timings[target],
+            })
+    return pd.DataFrame(rows)
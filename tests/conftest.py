@@ -0,0 +1,37 @@
+import importlib
+import os
+import sys
+import types
+
+import pandas as pd
+import pytest
+
+# The model and preprocessing modules import each other by bare name, as when run from their directories
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ("model", "data_preprocessing"):
+    sys.path.insert(0, os.path.join(ROOT, directory))
+
+
+def calculate_optimal_team(player_info, fantasy_points_data, **kwargs):
+    """Stand-in for pipeline.calculate_optimal_team: picks every player, no covariance."""
+    players = [player for squad in player_info.values() for player in squad]
+    matches = [len(fantasy_points_data.get(player) or ()) for player in players]
+    stats_df = pd.DataFrame({"player": players, "matches": matches})
+    return players, stats_df, None
+
+
+def evaluate_team(best_team, stats_df, cov_matrix):
+    """Stand-in for pipeline.evaluate_team."""
+    return float(len(best_team)), 0.5, 1.0
+
+
+@pytest.fixture
+def solver_pool(monkeypatch):
+    """solver_pool imported against a stand-in pipeline module (the real one needs the solvers)."""
+    pipeline = types.ModuleType("pipeline")
+    pipeline.calculate_optimal_team = calculate_optimal_team
+    pipeline.evaluate_team = evaluate_team
+    monkeypatch.setitem(sys.modules, "pipeline", pipeline)
+    for name in ("solver_pool", "batch_optimization", "materialized_teams"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    return importlib.import_module("solver_pool")
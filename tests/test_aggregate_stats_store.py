@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+from aggregate_stats_store import AggregateStatsStore
+
+# As the aggregate tables are written: json.dump emits NaN and Infinity as bare tokens
+TABLE = '''{
+    "A": {"average": 35.5, "strike_rate": NaN, "economy": Infinity, "best": [1, -Infinity]},
+    "B": {"average": NaN, "nested": {"value": NaN}}
+}'''
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = tmp_path / "t20_aggregate_data.json"
+    path.write_text(TABLE)
+    return AggregateStatsStore({"T20": str(path), "ODI": str(tmp_path / "missing.json")})
+
+
+def test_non_finite_numbers_are_made_valid_json(store):
+    assert store.table("t20") == {
+        "A": {"average": 35.5, "strike_rate": None, "economy": "Infinity", "best": [1, "-Infinity"]},
+        "B": {"average": None, "nested": {"value": None}},
+    }
+    # Strict parsers (like a browser's JSON.parse) accept the responses
+    body = store.players_bytes("T20", ["A", "B", "A", "Unknown"])
+    parsed = json.loads(body, parse_constant=lambda token: pytest.fail(f"{token} in response"))
+    assert list(parsed) == ["A", "B", "Unknown"]
+    assert parsed["A"]["economy"] == "Infinity" and parsed["Unknown"] is None
+
+
+def test_fragments_are_serialized_once(store):
+    first = store.player_bytes("T20", "A")
+    assert store.player_bytes("t20", "A") is first
+    assert json.loads(first)["average"] == 35.5
+
+
+def test_formats_are_case_insensitive_and_loaded_on_first_use(store):
+    assert store.format_name("odi") == "ODI" and store.format_name("Hundred") is None
+    with pytest.raises(KeyError):
+        store.table("Hundred")
+    # The ODI table isn't read until asked for
+    store.table("T20")
+    with pytest.raises(FileNotFoundError):
+        store.table("ODI")
@@ -0,0 +1,109 @@
+import importlib
+from concurrent.futures import Future
+
+import pandas as pd
+import pytest
+
+from fantasy_dataset import DatasetSnapshot
+from solve_cache import SolveCache, problem_key
+
+VERSION = "3b9aca00-aaaaaaaaaaaa"
+PARAMS = {"num_matches": 65, "risk_aversion": 0.1, "solver": "pulp"}
+HISTORY = {
+    "A": (("X-Y-2024-01-01-male-T20", {}), ("X-Y-2024-03-01-male-T20", {}), ("X-Y-2024-05-01-male-T20", {})),
+    "B": (("X-Y-2024-02-01-male-T20", {}),),
+    "C": (("X-Y-2024-04-01-male-T20", {}),),
+}
+
+
+class InlinePool:
+    """SolverPool stand-in that runs solves in the calling thread, or never if `stalled`."""
+
+    def __init__(self, saturated=0, stalled=False):
+        self.saturated = saturated
+        self.stalled = stalled
+        self.submitted = []
+
+    def submit(self, fn, **kwargs):
+        if self.saturated:
+            self.saturated -= 1
+            raise self.PoolSaturated("full")
+        self.submitted.append(kwargs)
+        future = Future()
+        if not self.stalled:
+            future.set_result(fn(**kwargs))
+        return future
+
+
+@pytest.fixture
+def solve_batch(solver_pool):
+    InlinePool.PoolSaturated = solver_pool.PoolSaturated
+    return importlib.import_module("batch_optimization").solve_batch
+
+
+@pytest.fixture
+def snapshot():
+    return DatasetSnapshot(VERSION, {"T20": HISTORY}, {})
+
+
+def _match(name, date, player_info, format_name="T20"):
+    return {"match": name, "format": format_name, "date": date, "player_info": player_info}
+
+
+def test_cached_and_invalid_matches_come_first(solve_batch, snapshot, tmp_path):
+    cache = SolveCache(str(tmp_path))
+    cached = _match("cached", "2024-06-01", {"X": ["A"], "Y": ["B"]})
+    cache.put(problem_key(cached["player_info"], cached["date"], "T20", PARAMS),
+              {"best_team": ["A"], "stats_df": pd.DataFrame({"player": ["A"]}), "cov_matrix": None,
+               "data_version": VERSION})
+    matches = [
+        _match("new", "2024-06-01", {"X": ["A"], "Y": ["C"]}),
+        cached,
+        {"match": "unknown", "error": "No squad"},
+        _match("odi", "2024-06-01", {"X": ["A"]}, "ODI"),
+    ]
+    pool = InlinePool()
+    results = list(solve_batch(matches, pool, snapshot, cache, PARAMS, timeout=5))
+    assert [match["match"] for match, _ in results] == ["cached", "unknown", "odi", "new"]
+    assert results[0][1]["best_team"] == ["A"]
+    assert results[1][1] == {"error": "No squad"} and "error" in results[2][1]
+    assert results[3][1]["best_team"] == ["A", "C"] and len(pool.submitted) == 1
+
+    # The new result was cached
+    pool = InlinePool()
+    assert [match["match"] for match, _ in solve_batch(matches[:1], pool, snapshot, cache, PARAMS, 5)] == ["new"]
+    assert pool.submitted == []
+
+
+def test_history_windows_are_shared_per_date(solve_batch, snapshot, tmp_path):
+    matches = [
+        _match("m1", "2024-04-01", {"X": ["A : Captain"], "Y": ["B"]}),
+        _match("m2", "2024-04-01", {"X": ["A"], "Y": ["C"]}),
+        _match("m3", "2024-06-01", {"X": ["A"], "Y": ["C"]}),
+    ]
+    pool = InlinePool()
+    results = dict((match["match"], result) for match, result in
+                   solve_batch(matches, pool, snapshot, SolveCache(str(tmp_path)), PARAMS, 5))
+    assert sorted(results) == ["m1", "m2", "m3"]
+    first, second, third = (submitted["fantasy_points_data"] for submitted in pool.submitted)
+    # Only matches before the date, and only the squad's players
+    assert first == {"A": HISTORY["A"][:2], "B": HISTORY["B"]}
+    assert second == {"A": HISTORY["A"][:2], "C": ()}
+    assert first["A"] is second["A"]
+    assert third["A"] == HISTORY["A"] and third["C"] == HISTORY["C"]
+    assert all(submitted["data_version"] == VERSION for submitted in pool.submitted)
+
+
+def test_a_saturated_pool_is_retried(solve_batch, snapshot, tmp_path):
+    pool = InlinePool(saturated=2)
+    results = list(solve_batch([_match("m", "2024-06-01", {"X": ["A"]})], pool, snapshot,
+                               SolveCache(str(tmp_path)), PARAMS, 5))
+    assert results[0][1]["best_team"] == ["A"]
+    assert pool.saturated == 0
+
+
+def test_unfinished_solves_time_out(solve_batch, snapshot, tmp_path):
+    pool = InlinePool(stalled=True)
+    matches = [_match("m1", "2024-06-01", {"X": ["A"]}), _match("m2", "2024-06-01", {"X": ["B"]})]
+    results = list(solve_batch(matches, pool, snapshot, SolveCache(str(tmp_path)), PARAMS, 0.1))
+    assert [result for _, result in results] == [{"error": "Team optimization timed out"}] * 2
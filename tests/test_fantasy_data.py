@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from fantasy_data import (AGGREGATE_STATS_PATHS, JoinedMatchStats, aggregate_stats_path,
+                          join_aggregate_stats, match_date, with_aggregate_stats)
+
+AGGREGATES = {"A": {"Career Runs": 900, "total_points": -1}}
+
+
+def test_joined_match_stats_keeps_the_denormalized_layout():
+    record = JoinedMatchStats({"total_points": 40, "venue": "X"}, AGGREGATES["A"])
+    assert list(record) == ["total_points", "venue", "Career Runs"]
+    assert len(record) == 3
+    # The aggregate value wins on a name clash, as in the old records
+    assert record["total_points"] == -1
+    assert record["Career Runs"] == 900
+    assert "venue" in record and "missing" not in record
+    with pytest.raises(KeyError):
+        record["missing"]
+    assert dict(JoinedMatchStats({"venue": "X"}, None)) == {"venue": "X"}
+
+
+def test_join_aggregate_stats_keeps_both_loader_layouts():
+    by_match = join_aggregate_stats({"A": {"m1": {"venue": "X"}}, "B": {"m1": {"venue": "Y"}}}, AGGREGATES)
+    assert by_match["A"]["m1"]["Career Runs"] == 900
+    assert dict(by_match["B"]["m1"]) == {"venue": "Y"}
+
+    pairs = join_aggregate_stats({"A": [("m1", {"venue": "X"})]}, AGGREGATES)
+    (match_key, record), = pairs["A"]
+    assert match_key == "m1" and record["Career Runs"] == 900
+
+
+def test_with_aggregate_stats(tmp_path):
+    data = {"A": {"m1": {"venue": "X"}}}
+    assert with_aggregate_stats(data, "player_fantasy_points_t20.json", False) is data
+
+    table = tmp_path / "aggregates.json"
+    table.write_text(json.dumps(AGGREGATES))
+    joined = with_aggregate_stats(data, "player_fantasy_points_t20.json", str(table))
+    assert joined["A"]["m1"]["Career Runs"] == 900
+
+
+def test_aggregate_stats_path():
+    assert aggregate_stats_path("../data/processed/player_fantasy_points_t20.json") == AGGREGATE_STATS_PATHS["T20"]
+    assert aggregate_stats_path("player_fantasy_points_odi.json") == AGGREGATE_STATS_PATHS["ODI"]
+    assert aggregate_stats_path("player_fantasy_points_test.json") == AGGREGATE_STATS_PATHS["Test"]
+    with pytest.raises(ValueError):
+        aggregate_stats_path("player_fantasy_points.json")
+
+
+def test_match_date():
+    assert match_date("Papua_New_Guinea-Oman-2024-07-10-male-T20") == "2024-07-10"
+    assert match_date("Team_A-Team_B-2023-01-02-female-ODM") == "2023-01-02"
+    # Ids without a date sort first
+    assert match_date("unknown") == ""
+    assert match_date(None) == ""
@@ -0,0 +1,108 @@
+import json
+import os
+import pickle
+
+import pytest
+
+from fantasy_data import delta_path
+from fantasy_dataset import FantasyDataset, dataset_version, version_time
+
+
+def _write(path, data, mtime_ns):
+    with open(path, "w") as file:
+        json.dump(data, file)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def _load(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+@pytest.fixture
+def paths(tmp_path):
+    paths = {"T20": str(tmp_path / "t20.json"), "Test": str(tmp_path / "test.json")}
+    _write(paths["T20"], {"A": {"m1": {"x": 1}}}, 1_000_000_000)
+    _write(paths["Test"], {"B": {"m2": {"x": 2}}}, 2_000_000_000)
+    return paths
+
+
+def test_snapshot_is_read_only_and_versioned_like_the_files(paths):
+    dataset = FantasyDataset(_load, paths, background=False)
+    snapshot = dataset.snapshot()
+    assert snapshot.version == dataset.version == dataset_version(paths)
+    assert version_time(snapshot.version) == 2_000_000_000
+    assert version_time("not a version") is None
+    assert dict(snapshot.get("T20")) == {"A": (("m1", {"x": 1}),)}
+    assert snapshot.get("ODI") is None
+    with pytest.raises(TypeError):
+        snapshot.formats["T20"]["C"] = ()
+
+
+def test_a_changed_file_is_reloaded_into_a_new_snapshot(paths):
+    dataset = FantasyDataset(_load, paths, check_interval=3600, background=False)
+    old = dataset.snapshot()
+    assert not dataset.refresh(force=True)
+
+    _write(paths["T20"], {"A": {"m1": {"x": 1}, "m3": {"x": 3}}}, 3_000_000_000)
+    # The check interval hasn't elapsed
+    assert dataset.snapshot() is old
+    assert dataset.refresh(force=True)
+    new = dataset.snapshot(refresh=False)
+    assert new is not old and new.version == dataset_version(paths)
+    assert version_time(new.version) > version_time(old.version)
+    assert len(new.get("T20")["A"]) == 2
+    # The old snapshot is unchanged
+    assert len(old.get("T20")["A"]) == 1
+
+
+def test_an_append_to_the_delta_log_changes_the_version(paths):
+    dataset = FantasyDataset(_load, paths, background=False)
+    version = dataset.version
+    with open(delta_path(paths["Test"]), "w") as file:
+        file.write("{}\n")
+    os.utime(delta_path(paths["Test"]), ns=(4_000_000_000, 4_000_000_000))
+    assert dataset_version(paths) != version
+    assert version_time(dataset_version(paths)) == 4_000_000_000
+    assert dataset.refresh(force=True)
+    assert dataset.version == dataset_version(paths)
+
+
+def test_a_failed_reload_keeps_the_current_snapshot(paths):
+    calls = []
+
+    def loader(path):
+        calls.append(path)
+        if len(calls) > 2:
+            raise ValueError("corrupt file")
+        return _load(path)
+
+    dataset = FantasyDataset(loader, paths, background=False)
+    snapshot = dataset.snapshot()
+    _write(paths["T20"], {}, 5_000_000_000)
+    assert dataset.refresh(force=True)
+    assert dataset.snapshot(refresh=False) is snapshot
+
+
+def test_a_pickled_handle_loads_its_own_data(paths):
+    dataset = FantasyDataset(_load, paths, background=False)
+    copy = pickle.loads(pickle.dumps(dataset))
+    assert copy.version == dataset.version
+    assert copy.snapshot(refresh=False) is not dataset.snapshot(refresh=False)
+
+
+def test_reload_callbacks_get_the_new_snapshot(paths):
+    dataset = FantasyDataset(_load, paths, background=False)
+    seen = []
+
+    def failing(snapshot):
+        raise RuntimeError("callback failed")
+
+    dataset.on_reload(failing)
+    dataset.on_reload(seen.append)
+    _write(paths["T20"], {}, 6_000_000_000)
+    assert dataset.refresh(force=True)
+    assert seen == [dataset.snapshot(refresh=False)]
+    # Nothing changed, so no reload and no callback
+    assert not dataset.refresh(force=True)
+    assert len(seen) == 1
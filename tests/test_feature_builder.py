@@ -0,0 +1,82 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_builder import (POINTS_LAGS, TARGETS, add_aggregate_features, build_lag_features,
+                             latest_lag_features, matches_to_long_frame)
+from testing import score_players
+
+FIXTURE = os.path.join(os.path.dirname(__file__), os.pardir, "model", "player_match_test_data.json")
+FEATURES = ["total_runs", "wickets", "catches_taken"]
+NUM_PREV = 4
+
+
+@pytest.fixture(scope="module")
+def player_data():
+    with open(FIXTURE) as file:
+        return score_players(json.load(file))
+
+
+def _naive_lags(long_df):
+    """Per-player shift with the oldest match repeated, the loop the vectorized builder replaces."""
+    frames = []
+    for _, group in long_df.groupby("player", sort=False):
+        group = group.reset_index(drop=True)
+        lags = {}
+        for k in range(1, NUM_PREV + 1):
+            for short, target in POINTS_LAGS.items():
+                lags[f"fantasy_{short}_prev_{k}"] = group[target].shift(k).fillna(group[target].iloc[0])
+        for feature in FEATURES:
+            for k in range(1, NUM_PREV + 1):
+                lags[f"{feature}_prev_{k}"] = group[feature].shift(k).fillna(group[feature].iloc[0])
+        frame = pd.DataFrame(lags)
+        for target in TARGETS:
+            frame[target] = group[target]
+        frames.append(frame.iloc[1:])
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_long_frame_is_sorted_by_player_then_date(player_data):
+    long_df = matches_to_long_frame(player_data, FEATURES)
+    assert len(long_df) == sum(map(len, player_data.values()))
+    assert list(pd.unique(long_df["player"])) == list(player_data)
+    for _, group in long_df.groupby("player", sort=False):
+        assert group["date"].is_monotonic_increasing
+
+
+def test_lags_match_the_per_player_loop(player_data):
+    long_df = matches_to_long_frame(player_data, FEATURES)
+    lags = build_lag_features(long_df, FEATURES, NUM_PREV)
+    expected = _naive_lags(long_df)
+    assert list(lags.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(lags, expected, check_dtype=False)
+
+
+def test_latest_lags_match_a_row_appended_after_the_history(player_data):
+    players = list(player_data)[:10]
+    long_df = matches_to_long_frame({player: player_data[player] for player in players}, FEATURES)
+    histories = [[player_data[player][match_id] for match_id in group["match_id"]]
+                 for player, group in long_df.groupby("player", sort=False)]
+    latest = latest_lag_features(histories + [[]], FEATURES, NUM_PREV)
+
+    # Append a dummy next match to every player and take its row
+    next_match = {"match_id": "next", "date": long_df["date"].max() + pd.Timedelta(days=1),
+                  **{column: 0.0 for column in TARGETS + FEATURES}}
+    extended = pd.concat([
+        pd.concat([group, pd.DataFrame([{**next_match, "player": player}])])
+        for player, group in long_df.groupby("player", sort=False)
+    ], ignore_index=True)
+    rows = build_lag_features(extended, FEATURES, NUM_PREV, keep_ids=True)
+    rows = rows[rows["match_id"] == "next"].drop(columns=["player", "match_id", "date"] + TARGETS)
+    np.testing.assert_allclose(latest[:-1], rows.to_numpy(dtype=float))
+    assert np.isnan(latest[-1]).all()
+
+
+def test_aggregate_features_are_joined_per_player():
+    rows = pd.DataFrame({"player": ["A", "B", "A"], "x": [1, 2, 3]})
+    joined = add_aggregate_features(rows, {"A": {"Runs": 10, "Other": 1}}, ["Runs"])
+    assert list(joined.columns) == ["player", "x", "Runs"]
+    assert joined["Runs"].tolist()[::2] == [10, 10] and np.isnan(joined["Runs"][1])
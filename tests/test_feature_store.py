@@ -0,0 +1,112 @@
+import json
+import os
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from fantasy_data import match_date
+from feature_store import FeatureStore, open_or_build_store
+from testing import score_players
+from training_data import iter_shards, load_feature_frame
+
+FIXTURE = os.path.join(os.path.dirname(__file__), os.pardir, "model", "player_match_test_data.json")
+
+
+@pytest.fixture(scope="module")
+def fantasy_points():
+    with open(FIXTURE) as file:
+        return score_players(json.load(file))
+
+
+def _first_part(fantasy_points, keep, skip_middle=False):
+    """Each player's earliest `keep` fraction of matches, optionally without the middle one."""
+    part = {}
+    for player, matches in fantasy_points.items():
+        dated = sorted(matches.items(), key=lambda item: match_date(item[0]))[:int(len(matches) * keep)]
+        if skip_middle and len(dated) > 2:
+            del dated[len(dated) // 2]
+        part[player] = dict(dated)
+    return part
+
+
+@pytest.fixture
+def stores(fantasy_points, tmp_path):
+    """
+    A store built on part of the data then updated with the rest, and one built on all of it.
+
+    The missing middle matches make the update rewrite rows that are already stored.
+    """
+    updated = FeatureStore.build(str(tmp_path / "updated"), _first_part(fantasy_points, 0.6, skip_middle=True),
+                                 {}, "Test", players_per_chunk=30)
+    written = updated.update(fantasy_points, {})
+    rebuilt = FeatureStore.build(str(tmp_path / "rebuilt"), fantasy_points, {}, "Test")
+    return updated, rebuilt, written
+
+
+def test_update_matches_a_full_build(stores):
+    updated, rebuilt, written = stores
+    assert written > 0
+    assert len(updated) == len(rebuilt)
+    assert sorted(updated) == sorted(rebuilt)
+    for player, match_id in rebuilt:
+        np.testing.assert_array_equal(updated.get(player, match_id), rebuilt.get(player, match_id))
+    assert updated.get("Unknown Player", "x") is None
+    assert ("Unknown Player", "x") not in updated
+
+
+def test_replaced_rows_are_masked_out(stores):
+    updated, rebuilt, _ = stores
+    shards = updated.manifest["shards"]
+    assert any(shard.get("live") for shard in shards[:-1])
+    assert not shards[-1].get("live")
+
+    # Every (player, match) is read once, with the values of a full build
+    pairs = Counter()
+    for shard in iter_shards(updated.store_dir, with_ids=True):
+        pairs.update(zip(shard["players"].tolist(), shard["matches"].tolist()))
+    assert set(pairs.values()) == {1} and len(pairs) == len(rebuilt)
+
+    frame = load_feature_frame(updated.store_dir, with_dates=True)
+    expected = load_feature_frame(rebuilt.store_dir, with_dates=True)
+    assert len(frame) == len(expected)
+    np.testing.assert_allclose(np.sort(frame["batting_points"].to_numpy()),
+                               np.sort(expected["batting_points"].to_numpy()))
+
+
+def test_update_without_new_matches_writes_nothing(stores, fantasy_points):
+    updated, _, _ = stores
+    shards = len(updated.manifest["shards"])
+    assert updated.update(fantasy_points, {}) == 0
+    assert len(FeatureStore(updated.store_dir).manifest["shards"]) == shards
+
+
+def test_next_match_features_as_of_a_date(stores, fantasy_points):
+    updated, rebuilt, _ = stores
+    for player, matches in list(fantasy_points.items())[:20]:
+        dates = sorted(match_date(match_id) for match_id in matches)
+        X, has_history = updated.next_match_features([player])
+        expected, _ = rebuilt.next_match_features([player])
+        np.testing.assert_array_equal(X, expected)
+        assert has_history.tolist() == [True]
+
+        # Before the first match there is no history
+        _, has_history = updated.next_match_features([player], dates[0])
+        assert has_history.tolist() == [False]
+
+        # As of a played match's date, the features are those of that match's row
+        as_of = dates[-1]
+        if len(dates) > 1 and dates[-2] < as_of and dates.count(as_of) == 1:
+            last_match = max(matches, key=match_date)
+            X, has_history = updated.next_match_features([player], as_of)
+            assert has_history.tolist() == [True]
+            np.testing.assert_array_equal(X[0], updated.get(player, last_match))
+
+
+def test_open_or_build_store(fantasy_points, tmp_path):
+    store_dir = str(tmp_path / "store")
+    built = open_or_build_store(store_dir, _first_part(fantasy_points, 0.5), {}, "Test")
+    size = len(built)
+    reopened = open_or_build_store(store_dir, fantasy_points, {}, "Test")
+    assert len(reopened) > size
+    assert len(FeatureStore(store_dir)) == len(reopened)
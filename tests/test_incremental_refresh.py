@@ -0,0 +1,132 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import fantasy_data
+from fantasy_data import append_fantasy_points_delta, delta_path, load_fantasy_points_store, match_date
+from testing import process_match_data, process_match_data_incremental, score_players
+
+FIXTURE = os.path.join(os.path.dirname(__file__), os.pardir, "model", "player_match_test_data.json")
+
+
+@pytest.fixture
+def player_data():
+    with open(FIXTURE) as file:
+        return json.load(file)
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return {name: str(tmp_path / name) for name in ("input.json", "store.json", "manifest.json")}
+
+
+def _first_half(player_data):
+    """Each player's earlier matches (the fixture is not in date order)."""
+    return {
+        player: dict(sorted(matches.items(), key=lambda item: match_date(item[0]))[:len(matches) // 2])
+        for player, matches in player_data.items()
+    }
+
+
+def _as_json(fantasy_points):
+    return {player: json.dumps(matches, sort_keys=True) for player, matches in fantasy_points.items()}
+
+
+def _refresh(paths, player_data, **kwargs):
+    with open(paths["input.json"], "w") as file:
+        json.dump(player_data, file)
+    return process_match_data_incremental(paths["input.json"], paths["store.json"], "Test",
+                                          paths["manifest.json"], **kwargs)
+
+
+def test_delta_log_is_applied_on_top_of_the_store(tmp_path):
+    store = str(tmp_path / "store.json")
+    with open(store, "w") as file:
+        json.dump({"A": {"m1": {"total_points": 1}}}, file)
+    append_fantasy_points_delta(store, {"A": {"m2": {"total_points": 2}}, "B": {"m1": {"total_points": 3}}})
+    append_fantasy_points_delta(store, {"A": {"m3": {"total_points": 4}}})
+
+    expected = {"A": {"m1": {"total_points": 1}, "m2": {"total_points": 2}, "m3": {"total_points": 4}},
+                "B": {"m1": {"total_points": 3}}}
+    assert load_fantasy_points_store(store) == expected
+    assert list(load_fantasy_points_store(store)["A"]) == ["m1", "m2", "m3"]
+
+    # A line cut short by an interrupted append is skipped, then dropped by the next append
+    with open(delta_path(store), "a") as file:
+        file.write('{"player": "C", "matches"')
+    assert load_fantasy_points_store(store) == expected
+    append_fantasy_points_delta(store, {"C": {"m1": {"total_points": 5}}})
+    assert load_fantasy_points_store(store) == {**expected, "C": {"m1": {"total_points": 5}}}
+
+
+def test_incremental_refresh_appends_only_new_matches(player_data, paths):
+    with open(paths["input.json"], "w") as file:
+        json.dump(_first_half(player_data), file)
+    process_match_data(paths["input.json"], paths["store.json"])
+    with open(paths["store.json"]) as file:
+        base = file.read()
+
+    new = _refresh(paths, player_data)
+    assert sum(map(len, new.values())) == sum(map(len, player_data.values())) - sum(
+        map(len, _first_half(player_data).values()))
+    # The store itself is untouched; the new records go to its delta log
+    with open(paths["store.json"]) as file:
+        assert file.read() == base
+    assert os.path.exists(delta_path(paths["store.json"]))
+    assert _as_json(load_fantasy_points_store(paths["store.json"])) == _as_json(score_players(player_data))
+
+    # The watermarks record each player's last match date and every match on it
+    with open(paths["manifest.json"]) as file:
+        watermarks = json.load(file)["Test"]
+    for player, matches in player_data.items():
+        last_date = max(map(match_date, matches))
+        assert watermarks[player]["date"] == last_date
+        assert sorted(watermarks[player]["match_ids"]) == sorted(m for m in matches if match_date(m) == last_date)
+
+    assert _refresh(paths, player_data) == {}
+
+
+def test_same_day_match_after_the_watermark_is_new(player_data, paths):
+    player, matches = next(iter(player_data.items()))
+    last_match = max(matches, key=match_date)
+    same_day = last_match.replace("-male-", "-second-male-", 1)
+    _refresh(paths, {player: matches})
+
+    new = _refresh(paths, {player: {**matches, same_day: matches[last_match]}})
+    assert list(new) == [player] and list(new[player]) == [same_day]
+    assert same_day in load_fantasy_points_store(paths["store.json"])[player]
+
+
+def test_missing_store_gets_a_full_run(player_data, paths, tmp_path):
+    scored = _refresh(paths, player_data)
+    full_path = str(tmp_path / "full.json")
+    with open(paths["input.json"], "w") as file:
+        json.dump(player_data, file)
+    process_match_data(paths["input.json"], full_path)
+
+    with open(paths["store.json"]) as store, open(full_path) as full:
+        assert store.read() == full.read()
+    assert not os.path.exists(delta_path(paths["store.json"]))
+    assert _as_json(scored) == _as_json(load_fantasy_points_store(full_path))
+    assert _refresh(paths, player_data) == {}
+
+
+def test_incremental_refresh_updates_the_feature_store(player_data, paths, tmp_path, monkeypatch):
+    from feature_store import FeatureStore
+
+    aggregates = tmp_path / "aggregates.json"
+    aggregates.write_text("{}")
+    monkeypatch.setitem(fantasy_data.AGGREGATE_STATS_PATHS, "Test", str(aggregates))
+
+    store_dir = str(tmp_path / "features")
+    _refresh(paths, _first_half(player_data))
+    FeatureStore.build(store_dir, load_fantasy_points_store(paths["store.json"]), {}, "Test", players_per_chunk=40)
+    _refresh(paths, player_data, feature_store_dir=store_dir)
+
+    updated = FeatureStore(store_dir)
+    rebuilt = FeatureStore.build(str(tmp_path / "rebuilt"), score_players(player_data), {}, "Test")
+    assert len(updated) == len(rebuilt)
+    for player, match_id in rebuilt:
+        np.testing.assert_array_equal(updated.get(player, match_id), rebuilt.get(player, match_id))
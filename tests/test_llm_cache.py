@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+import llm_cache
+from llm_cache import LLMCache, prompt_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now[0])
+    return now
+
+
+def _files(cache):
+    return sorted(os.path.basename(path)[:-5] for path in cache._files())
+
+
+def _age_files(cache, mtimes):
+    # File ages are what prune() goes by
+    for key, mtime in mtimes.items():
+        os.utime(cache._path(key), (mtime, mtime))
+
+
+def test_prompt_key_depends_on_prompt_and_model():
+    key = prompt_key("Analyze A", "model-1")
+    assert key == prompt_key("Analyze A", "model-1")
+    assert key != prompt_key("Analyze A", "model-2") != prompt_key("Analyze B", "model-1")
+
+
+def test_outputs_are_shared_through_the_cache_directory(tmp_path):
+    cache = LLMCache(str(tmp_path))
+    key = prompt_key("Analyze A", "model")
+    assert cache.get(key) is None
+    cache.put(key, "A is in form", "model")
+    assert cache.get(key) == "A is in form"
+    assert os.path.exists(tmp_path / key[:2] / f"{key}.json")
+    assert LLMCache(str(tmp_path)).get(key) == "A is in form"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_outputs_expire_after_the_ttl(tmp_path, clock):
+    cache = LLMCache(str(tmp_path), ttl=60)
+    key = prompt_key("Analyze A", "model")
+    cache.put(key, "A is in form")
+    clock[0] += 59
+    assert cache.get(key) == "A is in form"
+    assert LLMCache(str(tmp_path), ttl=60).get(key) == "A is in form"
+    clock[0] += 1
+    # Expired in memory and on disk
+    assert cache.get(key) is None
+    assert LLMCache(str(tmp_path), ttl=60).get(key) is None
+
+
+def test_memory_lru_is_bounded(tmp_path):
+    cache = LLMCache(str(tmp_path), memory_entries=2)
+    keys = [prompt_key(f"prompt {i}", "model") for i in range(3)]
+    for key in keys:
+        cache.put(key, key)
+    assert list(cache._memory) == keys[1:]
+    # The evicted output is read back from disk
+    assert cache.get(keys[0]) == keys[0]
+    assert list(cache._memory) == [keys[2], keys[0]]
+
+
+def test_the_directory_is_capped_oldest_first(tmp_path, clock):
+    cache = LLMCache(str(tmp_path), max_entries=10, ttl=3600)
+    keys = [prompt_key(f"prompt {i}", "model") for i in range(10)]
+    for key in keys:
+        cache.put(key, key)
+    assert _files(cache) == sorted(keys)
+    _age_files(cache, {key: clock[0] - 3000 + i for i, key in enumerate(keys)})
+
+    # Going over the cap prunes the oldest files to 10% under it
+    extra = prompt_key("prompt 10", "model")
+    cache.put(extra, extra)
+    assert _files(cache) == sorted(keys[2:] + [extra])
+    assert cache._disk_entries == 9
+
+    # Rewriting an existing key doesn't count as a new file
+    cache.put(extra, "rewritten")
+    assert cache._disk_entries == 9
+
+
+def test_expired_files_are_pruned_first(tmp_path, clock):
+    cache = LLMCache(str(tmp_path), max_entries=2, ttl=60)
+    old, new = prompt_key("old", "model"), prompt_key("new", "model")
+    cache.put(old, "old")
+    cache.put(new, "new")
+    _age_files(cache, {old: clock[0] - 61, new: clock[0] - 10})
+    cache.prune()
+    assert _files(cache) == [new]
+
+    # Once the expired file is gone the directory is within the cap
+    newer = prompt_key("newer", "model")
+    cache.put(newer, "newer")
+    assert _files(cache) == sorted([new, newer])
@@ -0,0 +1,124 @@
+import importlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import llm_client
+from llm_cache import LLMCache
+
+BACKOFF = 0.05
+
+
+class StubLLM(BaseHTTPRequestHandler):
+    """
+    Stand-in for the LLM service. The prompt says how to answer:
+    'fail:N ...' answers 503 to the first N attempts, 'slow ...' takes 0.2 s,
+    'bad ...' answers 400; anything else is echoed back.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        prompt = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["input"]
+        server = self.server
+        with server.lock:
+            server.attempts.setdefault(prompt, []).append(time.monotonic())
+            attempt = len(server.attempts[prompt])
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        if prompt.startswith("slow"):
+            time.sleep(0.2)
+        with server.lock:
+            server.active -= 1
+        if prompt.startswith("fail:") and attempt <= int(prompt.split()[0][5:]):
+            status, body = 503, {"error": "busy"}
+        elif prompt.startswith("bad"):
+            status, body = 400, {"error": "bad request"}
+        else:
+            status, body = 200, {"output": f"answer to {prompt}"}
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubLLM)
+    server.lock = threading.Lock()
+    server.attempts = {}
+    server.active = server.max_active = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(server, monkeypatch):
+    """A client configured the way the apps get it: through LLM_URL."""
+    monkeypatch.setenv("LLM_URL", f"http://127.0.0.1:{server.server_address[1]}/predict")
+    module = importlib.reload(llm_client)
+    yield module.LLMClient(backoff=BACKOFF, max_concurrency=4)
+    monkeypatch.undo()
+    importlib.reload(llm_client)
+
+
+def test_the_endpoint_comes_from_the_environment(server, client):
+    assert client.url.endswith(f":{server.server_address[1]}/predict")
+    assert client.complete("hello") == "answer to hello"
+
+
+def test_unavailable_answers_are_retried_with_backoff(server, client):
+    assert client.complete("fail:2 prompt") == "answer to fail:2 prompt"
+    first, second, third = server.attempts["fail:2 prompt"]
+    # Delays are backoff * 2**retry, scaled by a jitter of 0.5-1
+    assert second - first >= BACKOFF * 0.5
+    assert third - second >= BACKOFF * 2 * 0.5
+
+
+def test_errors_after_the_last_retry_or_on_a_client_error(server, client):
+    with pytest.raises(llm_client.LLMError, match="after 4 attempts"):
+        client.complete("fail:9 prompt")
+    assert len(server.attempts["fail:9 prompt"]) == 4
+    # A 400 isn't retried
+    with pytest.raises(llm_client.LLMError, match="Invalid LLM response"):
+        client.complete("bad prompt")
+    assert len(server.attempts["bad prompt"]) == 1
+
+
+def test_complete_many_bounds_the_prompts_in_flight(server, client):
+    prompts = [f"slow {i}" for i in range(8)] + ["fail:9 never"]
+    start = time.monotonic()
+    outputs = client.complete_many(prompts)
+    elapsed = time.monotonic() - start
+    assert outputs[:8] == [f"answer to slow {i}" for i in range(8)]
+    assert isinstance(outputs[8], llm_client.LLMError)
+    assert server.max_active == 4
+    # Two rounds of four concurrent 0.2 s prompts, not eight sequential ones
+    assert 0.4 <= elapsed < 1.2
+
+    server.max_active = 0
+    client.complete_many([f"slow again {i}" for i in range(4)], max_concurrency=2)
+    assert server.max_active == 2
+    assert client.complete_many([]) == []
+
+
+def test_cached_outputs_skip_the_service(server, client, tmp_path):
+    client.cache = LLMCache(str(tmp_path))
+    assert client.complete("cached prompt") == "answer to cached prompt"
+    assert client.complete("cached prompt") == "answer to cached prompt"
+    assert len(server.attempts["cached prompt"]) == 1
+    # The model is part of the key
+    client.model_id = "other model"
+    client.complete("cached prompt")
+    assert len(server.attempts["cached prompt"]) == 2
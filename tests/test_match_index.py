@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from match_index import build_match_index
+
+T20 = {
+    "A": {"X-Y-2024-01-01-male-T20": {"total_points": 50}, "X-Y-2024-02-01-male-T20": {"total_points": 10}},
+    "B": {"X-Y-2024-01-01-male-T20": {"total_points": 30}},
+    "C": {"X-Y-2024-01-01-male-T20": {"total_points": 30}},
+    "D": {"X-Y-2024-01-01-male-T20": {"total_points": 5}},
+}
+# The utils loader layout: {player: [(match, info), ...]}
+ODI = {
+    "A": [("X-Y-2024-03-01-male-ODI", {"total_points": 70})],
+    "E": [("X-Y-2024-03-01-male-ODI", {"total_points": None})],
+}
+
+
+def _top_k_reference(index, match_key, k, candidates):
+    """The DataFrame.nlargest computation the index replaces."""
+    frame = pd.DataFrame({"player": candidates, "points": index.lookup(match_key, candidates)})
+    top = frame.nlargest(k, "points", keep="first")
+    return list(zip(top["player"], top["points"]))
+
+
+@pytest.fixture
+def index():
+    return build_match_index(T20, ODI, None)
+
+
+def test_lookup_scores_missing_players_zero(index):
+    points = index.lookup("X-Y-2024-01-01-male-T20", ["B", "Z", "A"])
+    assert points.tolist() == [30.0, 0.0, 50.0]
+    assert index.lookup("X-Y-2024-03-01-male-ODI", ["E"]).tolist() == [0.0]
+    assert "X-Y-2024-03-01-male-ODI" in index
+    assert len(index) == 3
+
+
+def test_match_top_k_breaks_ties_in_index_order(index):
+    assert index.match_top_k("X-Y-2024-01-01-male-T20", k=3) == [("A", 50.0), ("B", 30.0), ("C", 30.0)]
+    assert index.match_top_k("unknown", k=3) == []
+
+
+def test_match_top_k_with_candidates_matches_nlargest(index):
+    match_key = "X-Y-2024-01-01-male-T20"
+    candidates = ["D", "C", "Z", "B", "A"]
+    result = index.match_top_k(match_key, k=3, candidates=candidates)
+    assert result == _top_k_reference(index, match_key, 3, candidates)
+    assert [player for player, _ in result] == ["A", "C", "B"]
+    # Candidates without a record fill the team at 0 points
+    assert index.match_top_k(match_key, k=6, candidates=candidates)[-1] == ("Z", 0.0)
+
+
+def test_score_selections(index):
+    selections = {
+        "X-Y-2024-01-01-male-T20": ["B", "D"],
+        "X-Y-2024-03-01-male-ODI": ["A"],
+        "unknown": ["A"],
+    }
+    scores = index.score_selections(selections, k=2)
+    assert scores.index.tolist() == list(selections)
+    assert scores["actual_score"].tolist() == [35.0, 70.0, 0.0]
+    assert scores["optimal_score"].tolist() == [80.0, 70.0, 0.0]
+    np.testing.assert_allclose(scores["performance_ratio"], [35 / 80, 1.0, 0.0])
+
+
+def test_score_selections_with_candidates(index):
+    selections = {"X-Y-2024-01-01-male-T20": ["C"], "X-Y-2024-02-01-male-T20": ["A"]}
+    candidates = {"X-Y-2024-01-01-male-T20": ["C", "D", "Z"], "X-Y-2024-02-01-male-T20": ["A", "B"]}
+    scores = index.score_selections(selections, k=2, candidates=candidates)
+    assert scores["optimal_score"].tolist() == [35.0, 10.0]
+    for match_key, players in candidates.items():
+        expected = sum(points for _, points in _top_k_reference(index, match_key, 2, players))
+        assert scores.loc[match_key, "optimal_score"] == expected
+    np.testing.assert_allclose(scores["performance_ratio"], [30 / 35, 1.0])
@@ -0,0 +1,87 @@
+import importlib
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from fantasy_dataset import DatasetSnapshot
+
+OLD, NEW = "3b9aca00-aaaaaaaaaaaa", "77359400-bbbbbbbbbbbb"
+HISTORY = {
+    "A": (("X-Y-2024-01-01-male-T20", {"runs": 10}),),
+    "B": (("X-Y-2024-02-01-male-T20", {"runs": 20}),),
+    "C": (("X-Y-2024-03-01-male-T20", {"runs": 30}),),
+}
+
+
+@pytest.fixture
+def materialized_teams(solver_pool):
+    return importlib.import_module("materialized_teams")
+
+
+def _dataset(version, history):
+    return SimpleNamespace(snapshot=lambda: DatasetSnapshot(version, {"T20": history}, {}))
+
+
+def _match(name, player_info, date="2024-06-01"):
+    return {"match": name, "series": "S", "format": "T20", "date": date, "player_info": player_info}
+
+
+MATCHES = [_match("ab", {"X": ["A"], "Y": ["B"]}), _match("bc", {"X": ["B"], "Y": ["C"]})]
+
+
+def _files(artifact_dir):
+    return {name: os.stat(os.path.join(artifact_dir, name)).st_mtime_ns
+            for name in os.listdir(artifact_dir) if name != "index.json"}
+
+
+def test_only_matches_with_changed_inputs_are_solved_again(materialized_teams, tmp_path):
+    artifact_dir = str(tmp_path)
+    counts = materialized_teams.materialize_teams(_dataset(OLD, HISTORY), MATCHES, artifact_dir, workers=1)
+    assert counts == {"solved": 2, "unchanged": 0, "failed": 0}
+    files = _files(artifact_dir)
+
+    # A new data version with the same history windows reuses every file
+    later = {**HISTORY, "A": HISTORY["A"] + (("X-Y-2024-07-01-male-T20", {"runs": 5}),)}
+    counts = materialized_teams.materialize_teams(_dataset(NEW, later), MATCHES, artifact_dir, workers=1)
+    assert counts == {"solved": 0, "unchanged": 2, "failed": 0}
+    assert _files(artifact_dir) == files
+
+    # A changed match before the date only re-solves the matches of that player
+    changed = {**later, "C": (("X-Y-2024-03-01-male-T20", {"runs": 31}),)}
+    counts = materialized_teams.materialize_teams(_dataset(NEW, changed), MATCHES, artifact_dir, workers=1)
+    assert counts == {"solved": 1, "unchanged": 1, "failed": 0}
+    index = materialized_teams._load_index(artifact_dir)
+    assert index["data_version"] == NEW
+    rewritten = next(entry["file"] for entry in index["matches"].values() if entry["match"] == "bc")
+    new_files = _files(artifact_dir)
+    assert [name for name in files if new_files[name] != files[name]] == [rewritten]
+
+
+def test_matches_that_left_the_schedule_are_removed(materialized_teams, tmp_path):
+    artifact_dir = str(tmp_path)
+    materialized_teams.materialize_teams(_dataset(OLD, HISTORY), MATCHES, artifact_dir, workers=1)
+    counts = materialized_teams.materialize_teams(
+        _dataset(OLD, HISTORY), MATCHES[:1] + [_match("empty", {})], artifact_dir, workers=1)
+    assert counts == {"solved": 0, "unchanged": 1, "failed": 1}
+    assert len(_files(artifact_dir)) == 1
+
+
+def test_teams_are_served_on_the_indexed_data_version_only(materialized_teams, tmp_path):
+    artifact_dir = str(tmp_path)
+    materialized_teams.materialize_teams(_dataset(OLD, HISTORY), MATCHES, artifact_dir, workers=1)
+    teams = materialized_teams.MaterializedTeams(artifact_dir)
+    served = {entry["match"]: result for entry, result in teams.teams()}
+    assert sorted(served) == ["ab", "bc"]
+    assert served["ab"]["best_team"] == ["A", "B"] and served["ab"]["data_version"] == OLD
+    assert served["ab"]["metrics"] == {"team_consistency_score": 2.0, "team_diversity_score": 0.5,
+                                       "form_score": 1.0}
+
+    key = next(iter(materialized_teams._load_index(artifact_dir)["matches"]))
+    assert teams.get(OLD, key) is not None
+    assert teams.get(NEW, key) is None
+    assert teams.get(OLD, "unknown") is None
+
+    # A rebuilt index on new data is picked up
+    materialized_teams.materialize_teams(_dataset(NEW, HISTORY), MATCHES, artifact_dir, workers=1)
+    assert teams.get(NEW, key) is not None and teams.get(OLD, key) is None
@@ -0,0 +1,79 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from model_selection import run_model_selection
+
+
+class RidgeRegressor:
+    """Closed-form ridge regression, a candidate that needs no scikit-learn."""
+
+    def __init__(self, alpha):
+        self.alpha = alpha
+
+    def fit(self, X, y):
+        X = np.column_stack([X, np.ones(len(X))])
+        self.coef_ = np.linalg.solve(X.T @ X + self.alpha * np.eye(X.shape[1]), X.T @ y)
+        return self
+
+    def predict(self, X):
+        return np.column_stack([X, np.ones(len(X))]) @ self.coef_
+
+
+# Workers are forked, so they import this module under the same name
+CANDIDATES = {
+    f"ridge_{alpha}": (f"{__name__}.RidgeRegressor", {"alpha": alpha})
+    for alpha in (0.1, 10.0, 1000.0, 100000.0)
+}
+
+
+def _data(seed):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(300, 4))
+    y = pd.DataFrame({"a": X[:, 0] * 2 + rng.normal(size=300), "b": X[:, 1] ** 2})
+    return X[:200], X[200:], y[:200], y[200:]
+
+
+def _run(cache_dir, seed):
+    return run_model_selection(*_data(seed), candidates=CANDIDATES, rung_fractions=(0.25, 1.0), eta=2,
+                               workers=1, cache_dir=cache_dir)
+
+
+def _cache(cache_dir):
+    with open(os.path.join(cache_dir, "fit_cache.json")) as file:
+        return json.load(file)
+
+
+def test_successive_halving_keeps_the_best_half(tmp_path):
+    leaderboard = _run(str(tmp_path), seed=0)
+    assert len(leaderboard) == 2 * len(CANDIDATES)
+    for _, target_leaderboard in leaderboard.groupby("target"):
+        assert target_leaderboard["status"].value_counts().to_dict() == {"complete": 2, "dominated": 2}
+        complete = target_leaderboard[target_leaderboard["status"] == "complete"]
+        assert (complete["rows"] == 200).all()
+        # Survivors rank first, by RMSE
+        assert target_leaderboard["status"].iloc[:2].tolist() == ["complete", "complete"]
+        assert complete["RMSE"].is_monotonic_increasing
+    assert os.path.exists(tmp_path / "leaderboard.csv")
+
+
+def test_fit_cache_is_reused_and_pruned_to_the_current_data(tmp_path):
+    cache_dir = str(tmp_path)
+    first = _run(cache_dir, seed=0)
+    first_cache = _cache(cache_dir)
+    assert len(first_cache) == 2 * (len(CANDIDATES) + 2)
+    data_hashes = {result["data_hash"] for result in first_cache.values()}
+    assert len(data_hashes) == 1
+
+    # Same data: every fit comes from the cache
+    pd.testing.assert_frame_equal(_run(cache_dir, seed=0), first)
+    assert _cache(cache_dir) == first_cache
+
+    # New data: the old results and data copy are dropped
+    _run(cache_dir, seed=1)
+    second_cache = _cache(cache_dir)
+    assert len(second_cache) == len(first_cache)
+    assert not data_hashes & {result["data_hash"] for result in second_cache.values()}
+    assert len([entry for entry in os.listdir(cache_dir) if entry.startswith("data_")]) == 1
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import optimization_sessions
+from optimization_sessions import SessionStore, decode_matrix, encode_matrix
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(optimization_sessions.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_sessions_expire_after_the_ttl_without_use(clock):
+    store = SessionStore(ttl=10)
+    kept = store.create({"team": 1})
+    dropped = store.create({"team": 2})
+    clock[0] += 8
+    assert store.get(kept) == {"team": 1}
+    # The lookup renewed the first session only
+    clock[0] += 8
+    assert store.get(kept) == {"team": 1}
+    assert store.get(dropped) is None
+    assert len(store) == 1
+    clock[0] += 11
+    assert store.get(kept) is None
+    assert store.get("unknown") is None
+
+
+def test_the_least_recently_used_session_is_evicted(clock):
+    store = SessionStore(max_sessions=2)
+    first = store.create({"team": 1})
+    second = store.create({"team": 2})
+    store.get(first)
+    third = store.create({"team": 3})
+    assert len(store) == 2
+    assert store.get(second) is None
+    assert store.get(first) == {"team": 1} and store.get(third) == {"team": 3}
+    assert len({first, second, third}) == 3 and len(first) == 11
+
+
+def test_matrix_encoding_round_trips_the_requested_players():
+    players = ["A", "B", "C"]
+    cov = pd.DataFrame(np.arange(9, dtype=float).reshape(3, 3) / 7, index=players, columns=players)
+    encoded = encode_matrix(cov, ["C", "Unknown", "A"])
+    assert encoded["players"] == ["C", "A"] and encoded["shape"] == [2, 2]
+    decoded_players, values = decode_matrix(encoded)
+    assert decoded_players == ["C", "A"]
+    np.testing.assert_array_equal(values, cov.loc[["C", "A"], ["C", "A"]].to_numpy(dtype=np.float32))
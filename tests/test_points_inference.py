@@ -0,0 +1,103 @@
+import json
+import os
+
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from fantasy_data import match_date
+from feature_builder import TARGETS
+from feature_store import FeatureStore
+from points_inference import PointsPredictor, export_points_models, load_points_models
+from scoring_rules import RULE_SETS
+from testing import score_players
+from training_data import load_feature_frame
+
+FIXTURE = os.path.join(os.path.dirname(__file__), os.pardir, "model", "player_match_test_data.json")
+AGGREGATES = {}
+
+
+@pytest.fixture(scope="module")
+def fantasy_points():
+    with open(FIXTURE) as file:
+        return score_players(json.load(file))
+
+
+@pytest.fixture(scope="module")
+def store(fantasy_points, tmp_path_factory):
+    return FeatureStore.build(str(tmp_path_factory.mktemp("store")), fantasy_points, AGGREGATES, "Test")
+
+
+@pytest.fixture(scope="module")
+def boosters(store):
+    df = load_feature_frame(store.store_dir).fillna(0)
+    X = df[store.feature_names].to_numpy(dtype=np.float32)
+    return {
+        target: xgb.train({"nthread": 1, "max_depth": 3}, xgb.DMatrix(X, label=df[target]), 5)
+        for target in TARGETS
+    }
+
+
+def _last_matches(fantasy_points, store):
+    """(player, last match) pairs whose match is the player's only one on its date and has a stored row."""
+    pairs = []
+    for player, matches in fantasy_points.items():
+        last = max(matches, key=match_date)
+        if sum(match_date(m) == match_date(last) for m in matches) == 1 and (player, last) in store:
+            pairs.append((player, last))
+    return pairs[:15]
+
+
+def test_squad_features_match_the_training_rows(fantasy_points, store, boosters):
+    predictor = PointsPredictor(boosters, AGGREGATES, "Test")
+    for player, match_id in _last_matches(fantasy_points, store):
+        X, has_history = predictor.squad_features(fantasy_points, [player], match_date(match_id))
+        assert has_history.tolist() == [True]
+        np.testing.assert_array_equal(X[0], np.nan_to_num(store.get(player, match_id), nan=0.0))
+
+
+def test_predict_uses_every_booster_and_the_appearance_points(fantasy_points, store, boosters):
+    predictor = PointsPredictor(boosters, AGGREGATES, "Test")
+    players = [player for player, _ in _last_matches(fantasy_points, store)] + ["Unknown Player"]
+    predictions = predictor.predict(fantasy_points, players)
+    X, _ = predictor.squad_features(fantasy_points, players[:-1])
+
+    assert predictions["player"].tolist() == players
+    for target, booster in boosters.items():
+        np.testing.assert_allclose(predictions[target].iloc[:-1], booster.inplace_predict(X), rtol=1e-6)
+    np.testing.assert_allclose(
+        predictions["total_points"].iloc[:-1],
+        predictions[TARGETS].iloc[:-1].sum(axis=1) + RULE_SETS["Test"]["appearance_points"], rtol=1e-6)
+    # A player without history gets no prediction
+    assert predictions.iloc[-1][TARGETS + ["total_points"]].isna().all()
+
+
+def test_feature_store_lookup_gives_the_same_predictions(fantasy_points, store, boosters):
+    players = [player for player, _ in _last_matches(fantasy_points, store)]
+    computed = PointsPredictor(boosters, AGGREGATES, "Test")
+    looked_up = PointsPredictor(boosters, AGGREGATES, "Test", feature_store=store)
+    for date_of_match in (None, "2024-06-01"):
+        np.testing.assert_allclose(
+            looked_up.predict(fantasy_points, players, date_of_match)[TARGETS].to_numpy(),
+            computed.predict(fantasy_points, players, date_of_match)[TARGETS].to_numpy(), rtol=1e-6)
+
+
+def test_exported_models_load_back_with_their_schema(fantasy_points, store, boosters, tmp_path):
+    model_dir = str(tmp_path / "models")
+    manifest = export_points_models(boosters, model_dir, "Test", store.categories)
+    assert sorted(os.listdir(model_dir)) == sorted(["manifest.json"] + [f"{target}.ubj" for target in TARGETS])
+    assert manifest["feature_names"] == store.feature_names
+
+    loaded = load_points_models(model_dir, AGGREGATES)
+    assert loaded.load_seconds is not None
+    players = [player for player, _ in _last_matches(fantasy_points, store)]
+    original = PointsPredictor(boosters, AGGREGATES, "Test")
+    np.testing.assert_array_equal(loaded.predict(fantasy_points, players)[TARGETS].to_numpy(),
+                                  original.predict(fantasy_points, players)[TARGETS].to_numpy())
+
+
+def test_loading_rejects_a_schema_mismatch(boosters, tmp_path):
+    model_dir = str(tmp_path / "models")
+    export_points_models(boosters, model_dir, "Test", {}, num_prev_matches=3)
+    with pytest.raises(ValueError):
+        load_points_models(model_dir, AGGREGATES)
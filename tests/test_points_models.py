@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from points_models import POINTS_MODEL_PARAMS, quantile_dmatrix, train_points_models
+
+PARAMS = {"nthread": 1}
+
+
+def _data(rows=400, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(rows, 6)).astype(np.float32)
+    X[rng.random(X.shape) < 0.05] = np.nan
+    labels = {
+        "batting_points": np.nan_to_num(X[:, 0]) * 10 + rng.normal(size=rows),
+        "bowling_points": np.nan_to_num(X[:, 1]) ** 2 + rng.normal(size=rows),
+        "fielding_points": (np.nan_to_num(X[:, 2]) > 0) * 4.0,
+    }
+    return X, labels
+
+
+def test_shared_matrix_trains_the_same_models_as_one_matrix_per_target():
+    X, labels = _data()
+    X_valid, valid_labels = _data(100, seed=1)
+    dtrain = quantile_dmatrix(X)
+    dvalid = quantile_dmatrix(X_valid, ref=dtrain)
+    models, timings, rmse = train_points_models(dtrain, labels, params=PARAMS, num_boost_round=10,
+                                                dvalid=dvalid, valid_labels=valid_labels)
+    assert set(models) == set(timings) == set(rmse) == set(labels)
+
+    for target, y in labels.items():
+        separate = xgb.train({**POINTS_MODEL_PARAMS, **PARAMS}, xgb.QuantileDMatrix(X, label=y), 10)
+        np.testing.assert_allclose(models[target].predict(dvalid), separate.predict(dvalid), rtol=1e-6)
+        expected_rmse = np.sqrt(np.mean((models[target].predict(dvalid) - valid_labels[target]) ** 2))
+        assert rmse[target] == pytest.approx(expected_rmse)
+
+
+def test_training_without_validation_reports_no_rmse():
+    X, labels = _data(100)
+    models, _, rmse = train_points_models(quantile_dmatrix(X), labels, params=PARAMS, num_boost_round=2)
+    assert set(models) == set(labels) and rmse == {}
@@ -0,0 +1,82 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def _run_while_blocked(flight, calls, key="k", fn=None):
+    """Starts `calls` concurrent do(key) calls whose computation blocks until released."""
+    release, started = threading.Event(), threading.Event()
+    computed = []
+
+    def compute():
+        computed.append(1)
+        started.set()
+        release.wait(5)
+        if fn is not None:
+            return fn()
+        return "result"
+
+    pool = ThreadPoolExecutor(calls)
+    leader = pool.submit(flight.do, key, compute)
+    started.wait(5)
+    followers = [pool.submit(flight.do, key, compute) for _ in range(calls - 1)]
+    return pool, leader, followers, release, computed
+
+
+def test_concurrent_calls_share_one_computation():
+    flight = SingleFlight()
+    pool, leader, followers, release, computed = _run_while_blocked(flight, 4)
+    # Wait until every follower has joined the computation
+    while flight.stats()["coalesced"] < 3:
+        time.sleep(0.01)
+    release.set()
+    assert leader.result() == ("result", False)
+    assert [future.result() for future in followers] == [("result", True)] * 3
+    pool.shutdown()
+
+    assert computed == [1]
+    stats = flight.stats()
+    assert {key: stats[key] for key in ("calls", "leaders", "coalesced", "in_flight", "max_in_flight")} == {
+        "calls": 4, "leaders": 1, "coalesced": 3, "in_flight": 0, "max_in_flight": 1}
+    assert stats["max_wait_seconds"] >= stats["mean_wait_seconds"] > 0
+
+    # Once done, the next call computes again
+    assert flight.do("k", lambda: "again") == ("again", False)
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == (1, False)
+    assert flight.do("b", lambda: 2) == (2, False)
+    assert flight.stats()["leaders"] == 2
+
+
+def test_an_exception_reaches_every_shared_call():
+    def fail():
+        raise ValueError("solve failed")
+
+    flight = SingleFlight()
+    pool, leader, followers, release, _ = _run_while_blocked(flight, 2, fn=fail)
+    while flight.stats()["coalesced"] < 1:
+        time.sleep(0.01)
+    release.set()
+    for future in [leader] + followers:
+        with pytest.raises(ValueError):
+            future.result()
+    pool.shutdown()
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_a_coalesced_call_can_time_out():
+    flight = SingleFlight()
+    pool, leader, _, release, _ = _run_while_blocked(flight, 1)
+    with pytest.raises(FuturesTimeoutError):
+        flight.do("k", lambda: "unused", timeout=0.05)
+    release.set()
+    assert leader.result() == ("result", False)
+    pool.shutdown()
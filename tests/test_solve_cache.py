@@ -0,0 +1,91 @@
+import os
+
+import pandas as pd
+
+from solve_cache import SolveCache, problem_key
+
+OLD, NEW = "3b9aca00-aaaaaaaaaaaa", "77359400-bbbbbbbbbbbb"
+PARAMS = {"num_matches": 65, "risk_aversion": 0.1, "solver": "pulp"}
+
+
+def _result(data_version, players=("A", "B")):
+    players = list(players)
+    return {
+        "best_team": players,
+        "stats_df": pd.DataFrame({"player": players, "mean": [1.5] * len(players)}),
+        "cov_matrix": pd.DataFrame([[1.0, 0.5], [0.5, 2.0]], index=players, columns=players),
+        "data_version": data_version,
+    }
+
+
+def _assert_same(cached, result):
+    assert cached["best_team"] == result["best_team"]
+    assert cached["data_version"] == result["data_version"]
+    pd.testing.assert_frame_equal(cached["stats_df"], result["stats_df"])
+    pd.testing.assert_frame_equal(cached["cov_matrix"], result["cov_matrix"])
+
+
+def test_problem_key_ignores_order_and_name_suffixes():
+    key = problem_key({"X": ["A", "B : Captain"], "Y": ["C"]}, "2024-01-01", "T20", PARAMS)
+    assert key == problem_key({"Y": ["C"], "X": ["B", "A"]}, "2024-01-01", "T20", dict(reversed(PARAMS.items())))
+    assert key != problem_key({"X": ["A", "B"], "Y": ["C"]}, "2024-01-02", "T20", PARAMS)
+    assert key != problem_key({"X": ["A", "B"], "Y": ["C"]}, "2024-01-01", "T20", {**PARAMS, "solver": "sharpe"})
+
+
+def test_results_are_shared_through_the_cache_directory(tmp_path):
+    cache = SolveCache(str(tmp_path))
+    result = _result(OLD)
+    cache.put("k", result)
+    _assert_same(cache.get(OLD, "k"), result)
+    assert os.path.exists(tmp_path / OLD / "k.json")
+
+    # Another process reads it from disk; a different data version misses
+    other = SolveCache(str(tmp_path))
+    _assert_same(other.get(OLD, "k"), result)
+    assert other.get(NEW, "k") is None
+    assert (other.hits, other.misses) == (1, 1)
+
+    # Results without a team aren't cached
+    cache.put("empty", {**result, "best_team": []})
+    assert cache.get(OLD, "empty") is None
+
+
+def test_memory_lru_is_bounded(tmp_path):
+    cache = SolveCache(str(tmp_path), memory_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, _result(OLD))
+    assert list(cache._memory) == [(OLD, "b"), (OLD, "c")]
+    # The evicted result is still on disk
+    assert cache.get(OLD, "a") is not None
+    assert list(cache._memory) == [(OLD, "c"), (OLD, "a")]
+
+
+def test_a_new_data_version_prunes_older_ones(tmp_path):
+    cache = SolveCache(str(tmp_path))
+    cache.put("k", _result(OLD))
+    os.makedirs(tmp_path / "not-a-version")
+    cache.put("k", _result(NEW))
+    assert sorted(os.listdir(tmp_path)) == [NEW]
+    assert cache.get(OLD, "k") is None
+    assert cache.get(NEW, "k") is not None
+
+    # Pruning to an older version keeps the newer results
+    cache.prune(OLD)
+    assert os.listdir(tmp_path) == [NEW]
+
+
+def test_get_or_solve_solves_once(tmp_path):
+    cache = SolveCache(str(tmp_path))
+    calls = []
+
+    def solve():
+        calls.append(1)
+        result = _result(OLD)
+        del result["data_version"]
+        return result
+
+    first = cache.get_or_solve(OLD, "k", solve)
+    second = cache.get_or_solve(OLD, "k", solve)
+    assert len(calls) == 1
+    assert first["data_version"] == OLD
+    _assert_same(second, first)
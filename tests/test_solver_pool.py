@@ -0,0 +1,105 @@
+import json
+import os
+import time
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+
+import pytest
+
+from fantasy_dataset import FantasyDataset
+
+
+def _write(path, data, mtime_ns):
+    with open(path, "w") as file:
+        json.dump(data, file)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def _load(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    path = str(tmp_path / "test.json")
+    _write(path, {"A": {"m1": {}}, "B": {"m2": {}}}, 1_000_000_000)
+    return FantasyDataset(_load, {"Test": path}, check_interval=0, background=False)
+
+
+@pytest.fixture
+def pool(solver_pool, dataset):
+    pool = solver_pool.SolverPool(dataset, workers=1, max_pending=2, timeout=5)
+    yield pool
+    pool.shutdown()
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def _wait_until_idle(pool, seconds=5):
+    # A future's done callback, which frees its slot, may run just after result() returns
+    deadline = time.monotonic() + seconds
+    while pool.pending and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return pool.pending == 0
+
+
+def _worker_data():
+    import solver_pool
+    return solver_pool._worker_state["snapshot"].version, os.getpid()
+
+
+def test_solves_run_on_the_workers_data(solver_pool, pool, dataset):
+    result = pool.run(solver_pool.solve_best_team, {"X": ["A"], "Y": ["B"]}, "2024-01-01", "Test")
+    assert result["best_team"] == ["A", "B"] and result["data_version"] == dataset.version
+    assert result["stats_df"]["matches"].tolist() == [1, 1]
+    assert "error" in pool.run(solver_pool.solve_best_team, {}, "2024-01-01", "ODI")
+    assert "error" in pool.run(solver_pool.solve_best_team, {}, "2024-01-01", "Test", points_source="model")
+
+
+def test_a_full_queue_is_refused(solver_pool, pool):
+    futures = [pool.submit(_sleep, 0.5) for _ in range(pool.max_pending)]
+    assert pool.pending == 2
+    with pytest.raises(solver_pool.PoolSaturated):
+        pool.submit(_sleep, 0)
+    assert [future.result() for future in futures] == [0.5, 0.5]
+    # The slots are released as the solves finish
+    assert pool.run(_sleep, 0) == 0
+    assert _wait_until_idle(pool)
+
+
+def test_a_slow_solve_times_out(pool):
+    start = time.monotonic()
+    with pytest.raises(FuturesTimeoutError):
+        pool.run(_sleep, 0.5, timeout=0.1)
+    assert time.monotonic() - start < 0.5
+    # The slot is freed once the worker is done with the solve
+    assert _wait_until_idle(pool)
+
+
+def test_workers_are_restarted_by_the_dataset_reload(pool, dataset):
+    version, pid = pool.run(_worker_data)
+    assert version == pool.data_version == dataset.version
+
+    # Requests on unchanged data keep the same workers
+    executor = pool._executor
+    assert pool.run(_worker_data) == (version, pid)
+    assert pool._executor is executor
+
+    _write(dataset.paths["Test"], {"A": {"m1": {}}}, 2_000_000_000)
+    assert dataset.refresh(force=True)
+    # The reload callback swapped the workers before refresh() returned
+    assert pool._executor is not executor and pool.data_version == dataset.version != version
+    new_version, new_pid = pool.run(_worker_data)
+    assert new_version == dataset.version and new_pid != pid
+
+
+def test_a_shut_down_pool_ignores_reloads(solver_pool, dataset):
+    pool = solver_pool.SolverPool(dataset, workers=1)
+    pool.shutdown()
+    executor = pool._executor
+    _write(dataset.paths["Test"], {}, 3_000_000_000)
+    assert dataset.refresh(force=True)
+    assert pool._executor is executor
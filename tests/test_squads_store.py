@@ -0,0 +1,71 @@
+import json
+import os
+
+import pytest
+
+from squads_store import SquadsStore
+
+SQUADS = {
+    "2024-01-05": {"League A": {"m1": {"Format": "T20"}}},
+    "2024-01-20": {"League B": {"m2": {"Format": "ODI"}}},
+    "2024-02-03": {"League A": {"m3": {"Format": "T20"}}},
+    "2024-03-15": {},
+}
+
+
+def _write(path, squads):
+    with open(path, "w") as file:
+        json.dump(squads, file)
+
+
+@pytest.fixture
+def store(tmp_path):
+    source = str(tmp_path / "datewise_squad.json")
+    _write(source, SQUADS)
+    return SquadsStore(source, str(tmp_path / "index"))
+
+
+def test_the_source_is_split_into_month_partitions(store):
+    assert sorted(os.listdir(store.index_dir)) == ["2024-01.json", "2024-02.json", "2024-03.json", "index.json"]
+    assert store.dates == sorted(SQUADS)
+    assert "2024-01-20" in store and "2024-01-21" not in store
+
+
+def test_date_queries(store):
+    assert store.dates_between("2024-01-06", "2024-02-03") == ["2024-01-20", "2024-02-03"]
+    assert store.dates_between(to_date="2024-01-19") == ["2024-01-05"]
+    assert store.dates_between("2024-02-01") == ["2024-02-03", "2024-03-15"]
+    assert store.next_dates("2024-01-20", 2) == ["2024-01-20", "2024-02-03"]
+    assert store.next_dates("2024-04-01", 2) == [] and store.next_dates("2024-01-01", -1) == []
+    assert store.nearest_date("2024-01-10") == "2024-01-05"
+    # A tie goes to the later date
+    assert store.nearest_date("2024-01-27") == "2024-02-03"
+    assert store.nearest_date("2023-01-01") == "2024-01-05"
+    assert store.nearest_date("2030-01-01") == "2024-03-15"
+
+
+def test_responses_are_the_json_of_the_source(store):
+    body, etag = store.leagues_bytes("2024-01-20")
+    assert json.loads(body) == SQUADS["2024-01-20"]
+    body, dates_etag = store.dates_bytes(["2024-01-05", "2024-02-03"])
+    assert json.loads(body) == {date: SQUADS[date] for date in ("2024-01-05", "2024-02-03")}
+    assert list(json.loads(body)) == ["2024-01-05", "2024-02-03"]
+    assert store.dates_bytes(["2024-01-05", "2024-02-03"])[1] == dates_etag
+    assert store.dates_bytes(["2024-02-03", "2024-01-05"])[1] != dates_etag
+    assert store.dates_bytes([])[0] == b"{}"
+
+
+def test_a_changed_source_rebuilds_the_index_and_etags(store):
+    _, etag = store.leagues_bytes("2024-01-05")
+    # Reopening an unchanged source reuses the index on disk
+    index_mtime = os.stat(os.path.join(store.index_dir, "index.json")).st_mtime_ns
+    SquadsStore(store.source_path, store.index_dir)
+    assert os.stat(os.path.join(store.index_dir, "index.json")).st_mtime_ns == index_mtime
+
+    changed = {**SQUADS, "2024-01-05": {"League C": {}}, "2024-04-01": {"League D": {}}}
+    _write(store.source_path, changed)
+    os.utime(store.source_path, ns=(index_mtime + 10**9, index_mtime + 10**9))
+    store.refresh()
+    assert store.dates[-1] == "2024-04-01"
+    body, new_etag = store.leagues_bytes("2024-01-05")
+    assert json.loads(body) == {"League C": {}} and new_etag != etag
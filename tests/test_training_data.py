@@ -0,0 +1,58 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_builder import TARGETS
+from feature_store import FeatureStore
+from points_models import quantile_dmatrix, quantile_dmatrix_from_shards, train_points_models
+from testing import score_players
+from training_data import load_dates, load_feature_frame, load_targets
+
+FIXTURE = os.path.join(os.path.dirname(__file__), os.pardir, "model", "player_match_test_data.json")
+
+
+@pytest.fixture(scope="module")
+def store_dir(tmp_path_factory):
+    with open(FIXTURE) as file:
+        player_data = score_players(json.load(file))
+    store_dir = str(tmp_path_factory.mktemp("features"))
+    FeatureStore.build(store_dir, player_data, {}, "Test", players_per_chunk=40)
+    return store_dir
+
+
+def test_dates_and_targets_follow_the_frame(store_dir):
+    df = load_feature_frame(store_dir, with_dates=True)
+    dates = load_dates(store_dir)
+    assert dates.dtype == np.dtype("datetime64[D]")
+    np.testing.assert_array_equal(dates, df["date"].to_numpy().astype("datetime64[D]"))
+
+    targets = load_targets(store_dir, fill_value=0.0)
+    for target in TARGETS:
+        np.testing.assert_array_equal(targets[target], df[target].fillna(0).to_numpy(dtype=np.float32))
+
+
+def test_training_from_shards_matches_the_in_memory_frame(store_dir):
+    holdout_start = np.datetime64(pd.Series(load_dates(store_dir)).quantile(0.8))
+    df = load_feature_frame(store_dir, with_dates=True).fillna(0)
+    is_test = (df["date"] >= holdout_start).to_numpy()
+    X = df.drop(columns=TARGETS + ["date"]).astype(np.float32)
+    assert 0 < is_test.sum() < len(df)
+
+    dtrain, labels = quantile_dmatrix_from_shards(
+        store_dir, row_filter=lambda shard: shard["dates"] < holdout_start, fill_value=0.0)
+    assert dtrain.num_row() == (~is_test).sum()
+    for target in TARGETS:
+        np.testing.assert_array_equal(labels[target], df.loc[~is_test, target].to_numpy(dtype=np.float32))
+
+    params = {"nthread": 1}
+    from_shards, _, _ = train_points_models(dtrain, labels, params=params, num_boost_round=5)
+    in_memory, _, _ = train_points_models(
+        quantile_dmatrix(X[~is_test]),
+        {target: df.loc[~is_test, target].to_numpy(dtype=np.float32) for target in TARGETS},
+        params=params, num_boost_round=5)
+    dtest = quantile_dmatrix(X[is_test], ref=dtrain)
+    for target in TARGETS:
+        np.testing.assert_allclose(from_shards[target].predict(dtest), in_memory[target].predict(dtest), rtol=1e-6)
@@ -0,0 +1,186 @@
+import copy
+import json
+import math
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from calculator import calculate_fantasy_points_t20
+from calculate_odi import calculate_fantasy_points_odi
+from calculator_test import calculate_fantasy_points_test
+from scoring_rules import RULE_SETS
+from testing import process_all_formats, process_match_data, process_match_data_sharded
+from vectorized_calculator import calculate_fantasy_points_vectorized, compare_rule_sets, player_match_frame
+
+POINT_KEYS = ("total_points", "batting_points", "bowling_points", "fielding_points")
+
+
+def _scalar_points(match_id, stats):
+    """The per-record dispatch of the original (scalar) process_match_data."""
+    if match_id[-3:] == "T20":
+        return calculate_fantasy_points_t20(stats)
+    if match_id[-4:] == "Test" or match_id[-3:] == "MDM":
+        return calculate_fantasy_points_test(stats)
+    if match_id[-3:] == "ODI" or match_id[-3:] == "ODM":
+        return calculate_fantasy_points_odi(stats)
+    return None
+
+
+def _number(rng, low, high, integral):
+    value = rng.randint(low, high)
+    return value if integral else float(value) + rng.choice([0.0, 0.5, 0.25])
+
+
+def _stats(rng):
+    """One player-match as in the interim data: ints, floats, NaN and missing keys."""
+    integral = rng.random() < 0.5
+    stats = {
+        "Total Runs Scored": _number(rng, 0, 140, integral),
+        "Fours": _number(rng, 0, 12, integral),
+        "Sixes": _number(rng, 0, 8, integral),
+        "Balls Faced": _number(rng, 0, 90, integral),
+        "Avg Batting S/R Per Inning": rng.choice([0.0, 45.0, 55.0, 65.0, 100.0, 135.0, 160.0, 200.0]),
+        "Wickets": _number(rng, 0, 6, integral),
+        "Bowled": rng.randint(0, 2),
+        "LBW": rng.randint(0, 1),
+        "Maiden Overs": _number(rng, 0, 2, integral),
+        "Overs Bowled": _number(rng, 0, 10, integral),
+        "Avg Economy Rate per inning": rng.choice([2.0, 3.0, 4.0, 5.5, 6.5, 7.5, 8.5, 10.5, 11.5, 13.0]),
+        "Catches Taken": rng.randint(0, 4),
+        "Stumped Outs Made": rng.randint(0, 1),
+        "Run Outs Made": rng.randint(0, 1),
+        "Venue": "Ground",
+        "Opposition Team": "Other XI",
+    }
+    for i in range(1, 5):
+        stats[f"How Out Inning {i} (Not Played)"] = rng.randint(0, 1)
+        stats[f"How Out Inning {i} (not out)"] = rng.randint(0, 1)
+        stats[f"Innings {i} Runs"] = rng.choice([0, 0, 20, 60, 120])
+        stats[f"Innings {i} Wickets"] = rng.choice([0, 2, 4, 5])
+        stats[f"Balls Faced Inning {i}"] = rng.randint(0, 30)
+    # Keys the scalar code defaults, and NaN it propagates
+    for key in rng.sample(["Fours", "Sixes", "Maiden Overs", "Run Outs Made", "LBW"], 2):
+        del stats[key]
+    if rng.random() < 0.1:
+        stats[rng.choice(["Total Runs Scored", "Wickets", "Catches Taken"])] = float("nan")
+    return stats
+
+
+@pytest.fixture
+def match_data_path(tmp_path):
+    rng = random.Random(7)
+    suffixes = ["male-T20", "male-ODI", "male-ODM", "male-Test", "male-MDM", "male-Hundred"]
+    player_data = {
+        f"Player {p}": {
+            f"A-B-2024-{m % 12 + 1:02d}-{m % 28 + 1:02d}-{rng.choice(suffixes)}": _stats(rng)
+            for m in range(rng.randint(1, 12))
+        }
+        for p in range(40)
+    }
+    path = tmp_path / "player_match_data.json"
+    path.write_text(json.dumps(player_data))
+    return path
+
+
+def _expected_json(match_data_path, written):
+    """The written file with every record's points replaced by the scalar calculators' result."""
+    player_data = json.loads(match_data_path.read_text())
+    expected = {}
+    for player, matches in player_data.items():
+        expected[player] = {}
+        for match_id, stats in matches.items():
+            points = _scalar_points(match_id, stats)
+            if points is None:
+                continue
+            record = written[player][match_id]
+            expected[player][match_id] = {
+                **{key: points[key] for key in POINT_KEYS},
+                **{key: value for key, value in record.items() if key not in POINT_KEYS},
+            }
+    return json.dumps(expected, indent=4)
+
+
+def test_written_json_matches_scalar_calculators(match_data_path, tmp_path):
+    output_path = tmp_path / "fantasy_points.json"
+    process_match_data(str(match_data_path), str(output_path))
+
+    text = output_path.read_text()
+    written = json.loads(text)
+    assert any(isinstance(record["total_points"], int) for matches in written.values() for record in matches.values())
+    assert any(math.isnan(record["total_points"]) for matches in written.values() for record in matches.values())
+    assert text == _expected_json(match_data_path, written)
+
+
+def test_sharded_output_matches_single_pass(match_data_path, tmp_path):
+    single_path = tmp_path / "single.json"
+    sharded_path = tmp_path / "sharded.json"
+    process_match_data(str(match_data_path), str(single_path))
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        process_match_data_sharded(str(match_data_path), str(sharded_path), pool, shard_size=7)
+
+    assert sharded_path.read_text() == single_path.read_text()
+
+
+@pytest.mark.parametrize("match_id, scalar, column", [
+    ("A-B-2024-01-01-male-T20", calculate_fantasy_points_t20, "Avg Batting S/R Per Inning"),
+    ("A-B-2024-01-01-male-Test", calculate_fantasy_points_test, "Innings 1 Runs"),
+])
+def test_none_band_stat_scores_without_bonus(match_id, scalar, column):
+    """Where the scalar calculators raise TypeError on a None, the kernels award no band bonus."""
+    stats = _stats(random.Random(3))
+    stats.update({"Total Runs Scored": 120, "Balls Faced": 60, column: None})
+    with pytest.raises(TypeError):
+        scalar(stats)
+
+    points = calculate_fantasy_points_vectorized(player_match_frame({"P": {match_id: stats}})).iloc[0]
+    expected = scalar({**stats, column: float("nan")})
+    assert {key: points[key] for key in POINT_KEYS} == {key: expected[key] for key in POINT_KEYS}
+
+
+def test_compare_rule_sets_reports_a_changed_rule():
+    rng = random.Random(11)
+
+    def stats():
+        return {key: 0 if isinstance(value, float) and math.isnan(value) else value
+                for key, value in _stats(rng).items()}
+
+    batch = player_match_frame({
+        f"Player {p}": {f"A-B-2024-01-{m + 1:02d}-male-{fmt}": stats() for m, fmt in enumerate(["T20", "ODI"])}
+        for p in range(20)
+    })
+    # Sixes are worth one more point in T20; ODI is unchanged
+    candidate = copy.deepcopy({name: RULE_SETS[name] for name in ("T20", "ODI")})
+    for rule in candidate["T20"]["batting"]:
+        if rule["type"] == "per_unit" and rule["column"] == "Sixes":
+            rule["points"] += 1
+
+    report = compare_rule_sets(batch, candidate).set_index(["format", "component"])
+    assert set(report.index.get_level_values("format")) == {"T20", "ODI"}
+
+    sixes = pd.to_numeric(batch.loc[batch["match_id"].str.endswith("T20"), "Sixes"]).fillna(0)
+    for component in ("total_points", "batting_points"):
+        row = report.loc[("T20", component)]
+        assert row["candidate_mean"] - row["baseline_mean"] == pytest.approx(sixes.mean())
+        assert row["mean_abs_change"] == pytest.approx(sixes.mean())
+        assert row["changed_fraction"] == pytest.approx((sixes != 0).mean())
+    assert report.loc[("T20", "bowling_points"), "changed_fraction"] == 0
+    assert (report.loc["ODI", "changed_fraction"] == 0).all()
+
+
+def test_compare_rule_sets_counts_unscored_rows_as_unchanged():
+    stats = {**_stats(random.Random(5)), "Total Runs Scored": float("nan")}
+    batch = player_match_frame({"P": {"A-B-2024-01-01-male-T20": stats}})
+    report = compare_rule_sets(batch, {"T20": RULE_SETS["T20"]})
+    assert (report["changed_fraction"] == 0).all()
+
+
+def test_process_all_formats_matches_single_pass(match_data_path, tmp_path):
+    jobs = [(str(match_data_path), str(tmp_path / f"sharded_{n}.json")) for n in range(2)]
+    process_all_formats(jobs, workers=1, shard_size=9)
+
+    single_path = tmp_path / "single.json"
+    process_match_data(str(match_data_path), str(single_path))
+    for _, output_path in jobs:
+        assert open(output_path).read() == single_path.read_text()
@@ -0,0 +1,81 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_builder import TARGETS
+from points_models import quantile_dmatrix, train_points_models
+from training_data import write_shard
+from walk_forward import run_walk_forward, season_folds
+
+FEATURES = ["f0", "f1", "f2"]
+PARAMS = {"nthread": 1}
+
+
+@pytest.fixture
+def shard_dir(tmp_path):
+    """Two shards of synthetic rows dated 2020-2023."""
+    rng = np.random.default_rng(0)
+    shard_dir = str(tmp_path / "shards")
+    os.makedirs(shard_dir)
+    shards = []
+    for i in range(2):
+        rows = 300
+        chunk = pd.DataFrame(rng.normal(size=(rows, len(FEATURES))), columns=FEATURES)
+        for j, target in enumerate(TARGETS):
+            chunk[target] = chunk[FEATURES[j]] * 3 + rng.normal(size=rows)
+        chunk["date"] = pd.to_datetime("2020-01-01") + pd.to_timedelta(rng.integers(0, 4 * 365, rows), unit="D")
+        chunk["player"] = [f"P{i}-{r % 7}" for r in range(rows)]
+        chunk["match_id"] = [f"m{r}" for r in range(rows)]
+        shards.append(write_shard(shard_dir, f"{i:05d}", chunk, FEATURES, {}))
+    with open(os.path.join(shard_dir, "manifest.json"), "w") as file:
+        json.dump({"feature_names": FEATURES, "target_names": TARGETS, "categories": {}, "shards": shards}, file)
+    return shard_dir
+
+
+def _load(shard_dir):
+    X, y, dates = [], [], []
+    for name in ("00000", "00001"):
+        X.append(np.load(os.path.join(shard_dir, f"X_{name}.npy")))
+        y.append(np.load(os.path.join(shard_dir, f"y_{name}.npy")))
+        dates.append(np.load(os.path.join(shard_dir, f"dates_{name}.npy")))
+    return np.concatenate(X), np.concatenate(y), np.concatenate(dates)
+
+
+def test_season_folds_test_the_latest_seasons(shard_dir):
+    assert season_folds([shard_dir], n_folds=2) == [
+        (np.datetime64("2022-01-01"), np.datetime64("2023-01-01")),
+        (np.datetime64("2023-01-01"), np.datetime64("2024-01-01")),
+    ]
+    # The first season has nothing to train on
+    assert len(season_folds([shard_dir], n_folds=10)) == 3
+
+
+def test_folds_never_train_on_their_future(shard_dir, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    results = run_walk_forward(shard_dir, n_folds=2, workers=1, params=PARAMS, num_boost_round=5,
+                               cache_dir=cache_dir)
+    assert len(results) == 2 * len(TARGETS)
+
+    X, y, dates = _load(shard_dir)
+    for (train_end, test_end), fold in zip(season_folds([shard_dir], 2), results.groupby("fold")):
+        train = dates < train_end
+        test = (dates >= train_end) & (dates < test_end)
+        fold = fold[1].set_index("target")
+        assert (fold["n_train"] == train.sum()).all() and (fold["n_test"] == test.sum()).all()
+
+        dtrain = quantile_dmatrix(X[train])
+        _, _, rmse = train_points_models(
+            dtrain, {target: y[train, i] for i, target in enumerate(TARGETS)}, params=PARAMS,
+            num_boost_round=5, dvalid=quantile_dmatrix(X[test], ref=dtrain),
+            valid_labels={target: y[test, i] for i, target in enumerate(TARGETS)})
+        for target in TARGETS:
+            assert fold.loc[target, "rmse"] == pytest.approx(rmse[target], rel=1e-5)
+
+    # The fold matrices are cached and reused
+    assert len(os.listdir(cache_dir)) == 2
+    rerun = run_walk_forward(shard_dir, n_folds=2, workers=1, params=PARAMS, num_boost_round=5,
+                             cache_dir=cache_dir)
+    pd.testing.assert_series_equal(rerun["rmse"], results["rmse"])